@@ -0,0 +1,158 @@
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import transaction
+
+UserModel = get_user_model()
+
+USER_CACHE_KEY = "account:user:{}"
+PERMISSIONS_CACHE_KEY = "account:perms:{}:{}"
+PERMISSIONS_VERSION_KEY = "account:perms:version"
+
+
+class EmailBackend(ModelBackend):
+    """
+    Аутентификация по email (или username) и паролю.
+
+    Пользователь для входа загружается одним запросом по индексу email
+    или username и только с полями, нужными для проверки пароля и
+    создания сессии. Устаревший хеш пароля пересчитывается при входе
+    штатным механизмом check_password().
+
+    get_user() кеширует пользователя по первичному ключу, поэтому
+    AuthenticationMiddleware не обращается к базе на каждом запросе.
+    В кеш попадают значения полей без хеша пароля и готовый HMAC для
+    проверки сессии (User.get_session_auth_hash()). Кеш сбрасывается
+    при сохранении и удалении пользователя (см. account.signals) и при
+    UserQuerySet.update(); время жизни задает AUTH_USER_CACHE_TIMEOUT
+    (0 - кеш отключен).
+
+    Набор прав пользователя (свои права и права групп) тоже считается
+    один раз и хранится в кеше как frozenset строк "app_label.codename",
+    поэтому проверки has_perm() в админке и представлениях не ходят в
+    базу. Кеш сбрасывается при изменении групп и прав (см.
+    account.signals); время жизни задает AUTH_PERMISSIONS_CACHE_TIMEOUT
+    (0 - кеш отключен).
+    """
+
+    login_fields = ("id", "email", "username", "password", "is_active", "last_login")
+
+    def login_queryset(self, identifier):
+        """Запрос пользователя для входа по email или username."""
+        if "@" in identifier:
+            lookup = {"email": UserModel.objects.normalize_email(identifier)}
+        else:
+            lookup = {"username": identifier}
+        return UserModel._default_manager.filter(**lookup).only(*self.login_fields)
+
+    def authenticate(self, request, username=None, password=None, email=None, **kwargs):
+        identifier = email or username or kwargs.get(UserModel.USERNAME_FIELD)
+        if not identifier or password is None:
+            return None
+        user = self.login_queryset(identifier).first()
+        if user is None:
+            # Хешируем впустую, чтобы время ответа не выдавало наличие пользователя.
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    def get_user(self, user_id):
+        timeout = settings.AUTH_USER_CACHE_TIMEOUT
+        key = USER_CACHE_KEY.format(user_id)
+        cached = cache.get(key) if timeout else None
+        if cached is not None:
+            user = cached_user(*cached)
+        else:
+            try:
+                user = UserModel._default_manager.get(pk=user_id)
+            except UserModel.DoesNotExist:
+                return None
+            if timeout:
+                fields = user_cache_fields()
+                values = [field.get_prep_value(getattr(user, field.attname)) for field in fields]
+                cache.set(key, (values, user.get_session_auth_hash()), timeout)
+        return user if self.user_can_authenticate(user) else None
+
+    def get_all_permissions(self, user_obj, obj=None):
+        if not user_obj.is_active or user_obj.is_anonymous or obj is not None:
+            return set()
+        if not hasattr(user_obj, "_perm_cache"):
+            timeout = settings.AUTH_PERMISSIONS_CACHE_TIMEOUT
+            key = permissions_cache_key(user_obj.pk) if timeout else None
+            perms = cache.get(key) if timeout else None
+            if perms is None:
+                perms = frozenset(super().get_all_permissions(user_obj))
+                if timeout:
+                    cache.set(key, perms, timeout)
+            user_obj._perm_cache = perms
+        return user_obj._perm_cache
+
+
+def user_cache_fields():
+    """Поля пользователя, которые хранит кеш get_user(): все, кроме пароля."""
+    return [field for field in UserModel._meta.concrete_fields if field.attname != "password"]
+
+
+def cached_user(values, session_auth_hash):
+    """Пользователь из значений кеша get_user(); пароль остается отложенным полем."""
+    fields = [field.attname for field in user_cache_fields()]
+    user = UserModel.from_db(UserModel._default_manager.db, fields, values)
+    user._session_auth_hash = session_auth_hash
+    return user
+
+
+def forget_cached_user(user_id):
+    """Удаляет пользователя из кеша get_user()."""
+    forget_cached_users([user_id])
+
+
+def forget_cached_users(user_ids):
+    """
+    Удаляет пользователей из кеша get_user().
+
+    Ключи удаляются сразу и еще раз после коммита: строку, которую
+    другой запрос успел закешировать до коммита (например, еще активного
+    пользователя или старый HMAC сессии), коммит не переживет.
+    """
+    keys = [USER_CACHE_KEY.format(user_id) for user_id in user_ids]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def permissions_cache_key(user_id):
+    """
+    Ключ кеша прав пользователя.
+
+    В ключ входит общая версия прав: изменение прав группы затрагивает
+    всех ее участников, и вместо поиска их ключей меняется версия.
+    """
+    version = cache.get(PERMISSIONS_VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex[:12]
+        if not cache.add(PERMISSIONS_VERSION_KEY, version, None):
+            version = cache.get(PERMISSIONS_VERSION_KEY, version)
+    return PERMISSIONS_CACHE_KEY.format(version, user_id)
+
+
+def forget_cached_permissions(user_ids=None):
+    """
+    Сбрасывает кеш прав пользователей user_ids или всех (None).
+
+    Сброс выполняется сразу и еще раз после коммита: набор прав, который
+    другой запрос успел посчитать по еще не закоммиченным данным, не
+    переживет коммит.
+    """
+
+    def forget():
+        if user_ids is None:
+            cache.set(PERMISSIONS_VERSION_KEY, uuid.uuid4().hex[:12], None)
+        else:
+            cache.delete_many([permissions_cache_key(user_id) for user_id in user_ids])
+
+    forget()
+    transaction.on_commit(forget)
@@ -1,6 +1,9 @@
 from django import forms
-from django.contrib.auth.forms import UserCreationForm
+from django.contrib.auth.forms import AdminUserCreationForm, AuthenticationForm, UserChangeForm, UserCreationForm
+from django.db.models import Q
+
 from .models import User
+from .names_cache import taken_names
 
 class CustomUserCreationForm(UserCreationForm):
     username = forms.CharField(
@@ -24,16 +27,67 @@ class CustomUserCreationForm(UserCreationForm):
         model = User
         fields = UserCreationForm.Meta.fields + ('email',)
 
-    def clean_email(self):
-        email = self.cleaned_data.get("email")
-        if User.objects.filter(email=email).exists():
-            raise forms.ValidationError("This email is busy")
-        return email
-        
     def clean_username(self):
         username = self.cleaned_data.get("username")
         return username
 
+    def clean(self):
+        cleaned_data = super().clean()
+        email = cleaned_data.get("email")
+        username = cleaned_data.get("username")
+        if email or username:
+            email_taken, username_taken = self.find_taken(email, username)
+            if email_taken:
+                self.add_error("email", "This email is busy")
+            if username_taken:
+                self.add_error(
+                    "username",
+                    self.instance.unique_error_message(User, ["username"]),
+                )
+        return cleaned_data
+
+    @staticmethod
+    def find_taken(email, username):
+        """
+        Проверяет занятость email и username.
+
+        Сначала смотрит в кеш занятых имен. В базу идет, только если
+        какое-то из непустых имен в кеше не нашлось, и спрашивает одним
+        запросом по индексам только про эти имена; найденные совпадения
+        запоминает.
+
+        Returns:
+            tuple[bool, bool]: Занят ли email и занят ли username.
+        """
+        email_taken = bool(email) and ("email", email) in taken_names
+        username_taken = bool(username) and ("username", username) in taken_names
+
+        lookup = Q()
+        if email and not email_taken:
+            lookup |= Q(email=email)
+        if username and not username_taken:
+            lookup |= Q(username=username)
+        if not lookup:
+            return email_taken, username_taken
+
+        for found_email, found_username in User.objects.filter(lookup).values_list("email", "username"):
+            if found_email == email:
+                email_taken = True
+                taken_names.add(("email", email))
+            if found_username == username:
+                username_taken = True
+                taken_names.add(("username", username))
+        return email_taken, username_taken
+
+    def validate_unique(self):
+        # Уникальность email и username уже проверена одним запросом в clean(),
+        # повторные проверки ModelForm по каждому полю не нужны.
+        exclude = self._get_validation_exclusions() | {"email", "username"}
+        try:
+            self.instance.validate_unique(exclude=exclude)
+        except forms.ValidationError as e:
+            self._update_errors(e)
+
     def save(self, commit=True):
         user = super().save(commit=False)
         user.email = self.cleaned_data["email"]
@@ -41,4 +95,64 @@ class CustomUserCreationForm(UserCreationForm):
         
         if commit:
             user.save()
-        return user
\ No newline at end of file
+            taken_names.add(("email", user.email))
+            taken_names.add(("username", user.username))
+        return user
+
+
+class LoginForm(AuthenticationForm):
+    """
+    Форма входа по email и паролю.
+
+    Асинхронное представление проверяет пароль само, в пуле хеширования,
+    и передает результат в форму через authenticated_user; тогда clean()
+    не вызывает синхронный authenticate().
+    """
+
+    username = forms.CharField(
+        widget=forms.EmailInput(attrs={'class': 'account-page__form-input', 'placeholder': ('Your Email'), 'autofocus': True})
+        )
+    password = forms.CharField(
+        strip=False,
+        widget=forms.PasswordInput(attrs={'class': 'account-page__form-input', 'placeholder': ('Password')})
+        )
+
+    def __init__(self, request=None, *args, authenticated_user=None, preauthenticated=False, **kwargs):
+        super().__init__(request, *args, **kwargs)
+        self.preauthenticated = preauthenticated
+        self.user_cache = authenticated_user
+
+    def clean(self):
+        if not self.preauthenticated:
+            return super().clean()
+        if self.user_cache is None:
+            raise self.get_invalid_login_error()
+        self.confirm_login_allowed(self.user_cache)
+        return self.cleaned_data
+
+
+
+class AvatarForm(forms.ModelForm):
+    """Загрузка аватара; WebP-варианты строятся в фоне после сохранения."""
+
+    class Meta:
+        model = User
+        fields = ("avatar",)
+        widgets = {
+            "avatar": forms.ClearableFileInput(attrs={"class": "account-page__form-input", "accept": "image/*"}),
+        }
+
+
+class UserAdminCreationForm(AdminUserCreationForm):
+    """Форма создания пользователя в админке."""
+
+    class Meta(AdminUserCreationForm.Meta):
+        model = User
+        fields = ("email", "username")
+
+
+class UserAdminChangeForm(UserChangeForm):
+    """Форма изменения пользователя в админке."""
+
+    class Meta(UserChangeForm.Meta):
+        model = User
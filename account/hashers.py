@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    PBKDF2-SHA256 с настраиваемым числом итераций.
+
+    Число итераций берется из settings.PASSWORD_PBKDF2_ITERATIONS.
+    Алгоритм тот же, что у стандартного хешера, поэтому старые хеши
+    проверяются как обычно, а при входе пересчитываются под новое число
+    итераций (must_update сравнивает итерации в хеше с текущими).
+    """
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
@@ -0,0 +1,75 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password, verify_password
+
+
+class HashingPoolBusy(Exception):
+    """Очередь пула хеширования заполнена, запрос нужно отклонить."""
+
+
+class HashingPool:
+    """
+    Ограниченный пул потоков для хеширования и проверки паролей.
+
+    Асинхронные представления не должны считать PBKDF2 в цикле событий
+    или в единственном потоке sync_to_async, поэтому хеширование
+    выполняется здесь. hashlib отпускает GIL во время вычисления, так что
+    потоки действительно работают параллельно.
+
+    Количество одновременно принятых задач ограничено max_pending: при
+    переполнении сразу выбрасывается HashingPoolBusy, чтобы сервер отвечал
+    503 вместо бесконечно растущей очереди.
+
+    Args:
+        max_workers (int): Количество потоков.
+        max_pending (int): Максимум задач в работе и в очереди.
+    """
+
+    def __init__(self, max_workers, max_pending):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="hashing"
+                )
+            return self._executor
+
+    async def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HashingPoolBusy
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self._slots.release()
+
+    async def make_password(self, password):
+        """Возвращает хеш пароля для сохранения в базе."""
+        return await self._run(make_password, password)
+
+    async def verify_password(self, password, encoded):
+        """
+        Проверяет пароль.
+
+        Returns:
+            tuple[bool, bool]: Верен ли пароль и нужно ли пересчитать хеш.
+        """
+        return await self._run(verify_password, password, encoded)
+
+
+_workers = getattr(settings, "ACCOUNT_HASHING_WORKERS", None) or os.cpu_count() or 1
+
+hashing_pool = HashingPool(
+    max_workers=_workers,
+    max_pending=getattr(settings, "ACCOUNT_HASHING_MAX_PENDING", None) or _workers * 8,
+)
@@ -0,0 +1,83 @@
+import csv
+import json
+import sys
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+# Колонки источника, которые переносятся в модель пользователя.
+IMPORT_FIELDS = ("email", "username", "password")
+
+
+class Command(BaseCommand):
+    """
+    Потоковый импорт пользователей из CSV или JSONL.
+
+    Файл читается построчно и передается в User.objects.bulk_create_users,
+    поэтому объем памяти не зависит от размера выгрузки.
+
+    Пример:
+        python manage.py import_users users.csv --batch-size 5000
+        cat users.jsonl | python manage.py import_users - --format jsonl
+    """
+
+    help = "Импортирует пользователей из CSV/JSONL файла пачками"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Путь к файлу или '-' для stdin")
+        parser.add_argument(
+            "--format",
+            choices=("csv", "jsonl"),
+            help="Формат файла (по умолчанию определяется по расширению)",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Количество процессов для хеширования паролей",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or ("jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv")
+        if path == "-" and options["format"] is None:
+            raise CommandError("--format is required when reading from stdin")
+
+        stream = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8")
+        try:
+            rows = self.read_csv(stream) if fmt == "csv" else self.read_jsonl(stream)
+            started = time.perf_counter()
+            result = get_user_model().objects.bulk_create_users(
+                rows,
+                batch_size=options["batch_size"],
+                workers=options["workers"],
+            )
+            elapsed = time.perf_counter() - started
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        rate = result.created / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {result.created}, skipped {result.skipped} "
+            f"in {elapsed:.1f}s ({rate:.0f} rows/sec)"
+        ))
+
+    @staticmethod
+    def read_csv(stream):
+        for row in csv.DictReader(stream):
+            yield {field: row.get(field) for field in IMPORT_FIELDS}
+
+    @staticmethod
+    def read_jsonl(stream):
+        for number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as exc:
+                raise CommandError(f"Invalid JSON on line {number}: {exc}") from exc
+            yield {field: row.get(field) for field in IMPORT_FIELDS}
@@ -0,0 +1,53 @@
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore as DatabaseSessionStore
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    """
+    Удаляет просроченные сессии из базы небольшими пачками.
+
+    В отличие от clearsessions, который удаляет все просроченные строки
+    одним DELETE и надолго блокирует таблицу (в SQLite - всю базу), здесь
+    каждая пачка удаляется отдельной короткой транзакцией по индексу
+    expire_date, а между пачками можно сделать паузу, чтобы запросы
+    успевали писать в django_session.
+
+    Пример:
+        python manage.py purge_sessions --batch-size 5000 --sleep 0.05
+    """
+
+    help = "Удаляет просроченные сессии из базы пачками"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--sleep", type=float, default=0.0, help="Пауза между пачками в секундах")
+
+    def handle(self, *args, **options):
+        store = import_module(settings.SESSION_ENGINE).SessionStore
+        if not issubclass(store, DatabaseSessionStore):
+            self.stdout.write(f"{settings.SESSION_ENGINE} does not keep sessions in the database, nothing to purge")
+            return
+
+        model = store.get_model_class()
+        # Граница фиксируется один раз: сессии, истекшие во время работы, останутся до следующего запуска.
+        now = timezone.now()
+        expired = model.objects.filter(expire_date__lt=now)
+        removed = 0
+        started = time.perf_counter()
+        while True:
+            keys = list(expired.order_by("expire_date").values_list("session_key", flat=True)[: options["batch_size"]])
+            if not keys:
+                break
+            removed += expired.filter(session_key__in=keys).delete()[0]
+            if options["verbosity"] >= 2:
+                self.stdout.write(f"  {removed} removed")
+            if options["sleep"]:
+                time.sleep(options["sleep"])
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} expired sessions in {elapsed:.2f} s"))
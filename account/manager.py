@@ -1,4 +1,84 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+
+import django
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import BaseUserManager
+from django.db import transaction
+from django.db.models import Q, QuerySet
+
+
+@dataclass
+class BulkCreateResult:
+    """
+    Итог массового импорта пользователей.
+
+    Attributes:
+        created (int): Количество созданных пользователей.
+        skipped (int): Количество пропущенных записей (дубликаты или
+            записи без email/username).
+    """
+
+    created: int = 0
+    skipped: int = 0
+
+
+def _init_hasher_worker():
+    """
+    Инициализирует Django в дочернем процессе пула хеширования.
+
+    При старте процессов через spawn настройки не наследуются,
+    поэтому приложение нужно поднять заново.
+    """
+    if not apps.ready:
+        django.setup()
+
+
+def _hash_password(password):
+    """Хеширует один пароль (выполняется в процессе пула)."""
+    return make_password(password)
+
+
+class UserQuerySet(QuerySet):
+    """
+    QuerySet пользователей.
+
+    update() минует post_save, поэтому кеш пользователя, кеш прав
+    (account.backends) и версии фрагментов (core.fragments) для
+    затронутых строк сбрасываются здесь.
+    """
+
+    # По сколько пользователей сбрасывается кеш за раз.
+    update_batch_size = 1000
+
+    def update(self, **kwargs):
+        """
+        Обновляет строки одним UPDATE, как обычный QuerySet.update().
+
+        Первичные ключи затронутых строк читаются одним запросом до
+        обновления и нужны только для сброса кешей: кеш пользователей
+        сбрасывается пачками по update_batch_size сразу и после коммита.
+        Строки не блокируются, а annotate() и distinct() выборки работают
+        так же, как без этого переопределения.
+        """
+        from core.fragments import invalidate_pks
+
+        from .backends import forget_cached_permissions, forget_cached_users
+
+        pks = list(self.values_list("pk", flat=True))
+        with transaction.atomic(using=self.db, savepoint=False):
+            updated = super().update(**kwargs)
+            for start in range(0, len(pks), self.update_batch_size):
+                batch = pks[start:start + self.update_batch_size]
+                forget_cached_users(batch)
+                forget_cached_permissions(batch)
+                invalidate_pks(self.model, batch, using=self.db)
+        return updated
+
+    update.alters_data = True
 
 
 class CustemUserManager(BaseUserManager):
@@ -10,6 +90,10 @@ class CustemUserManager(BaseUserManager):
     Наследует от BaseUserManager и переопределяет методы создания
     пользователей для работы с кастомной моделью User.
     """
+
+    def get_queryset(self):
+        return UserQuerySet(self.model, using=self._db)
+
     def create_user(self, email, username, password=None, **extra_fields):
         """
         Создает и сохраняет обычного пользователя с заданным email,
@@ -70,4 +154,100 @@ class CustemUserManager(BaseUserManager):
         if extra_fields.get('is_superuser') is not True:
             raise ValueError('Superuser must have is_superuser=True.')
 
-        return self.create_user(email, username, password, **extra_fields)
\ No newline at end of file
+        return self.create_user(email, username, password, **extra_fields)
+
+    def bulk_create_users(self, rows, batch_size=1000, workers=None):
+        """
+        Массово создает пользователей из итерируемого источника.
+
+        Источник читается потоково пачками по batch_size записей.
+        Для каждой пачки email нормализуется, дубликаты внутри пачки
+        и уже существующие в базе email/username отбрасываются одним
+        запросом, пароли хешируются в пуле процессов, а запись
+        выполняется одним bulk_create в отдельной транзакции.
+
+        Сигналы post_save при этом не отправляются.
+
+        Args:
+            rows (Iterable[dict]): Записи с ключами email, username,
+                password и, опционально, дополнительными полями модели.
+            batch_size (int): Размер пачки для проверки и вставки.
+            workers (int, optional): Количество процессов для хеширования
+                паролей. По умолчанию равно числу ядер; 0 или 1 — хеширование
+                в текущем процессе.
+
+        Returns:
+            BulkCreateResult: Количество созданных и пропущенных записей.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be positive")
+        if workers is None:
+            workers = os.cpu_count() or 1
+
+        result = BulkCreateResult()
+        rows = iter(rows)
+        executor = None
+        if workers > 1:
+            executor = ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_hasher_worker
+            )
+        try:
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                created, skipped = self._bulk_create_batch(batch, executor, workers)
+                result.created += created
+                result.skipped += skipped
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return result
+
+    def _bulk_create_batch(self, batch, executor, workers):
+        """
+        Создает одну пачку пользователей.
+
+        Returns:
+            tuple[int, int]: Количество созданных и пропущенных записей.
+        """
+        unique = {}
+        usernames = set()
+        for row in batch:
+            email = row.get("email")
+            username = row.get("username")
+            if not email or not username:
+                continue
+            email = self.normalize_email(email)
+            if email in unique or username in usernames:
+                continue
+            unique[email] = dict(row, email=email)
+            usernames.add(username)
+
+        # Один запрос по индексам email/username на всю пачку.
+        taken = self.filter(
+            Q(email__in=unique.keys()) | Q(username__in=usernames)
+        ).values_list("email", "username")
+        taken_emails, taken_usernames = set(), set()
+        for email, username in taken:
+            taken_emails.add(email)
+            taken_usernames.add(username)
+
+        fresh = [
+            row for email, row in unique.items()
+            if email not in taken_emails and row["username"] not in taken_usernames
+        ]
+        passwords = [row.pop("password", None) for row in fresh]
+        if executor is not None:
+            chunksize = max(1, len(passwords) // (workers * 4))
+            hashed = list(executor.map(_hash_password, passwords, chunksize=chunksize))
+        else:
+            hashed = [_hash_password(password) for password in passwords]
+
+        users = [
+            self.model(password=password, **row)
+            for row, password in zip(fresh, hashed)
+        ]
+        with transaction.atomic(using=self.db):
+            self.bulk_create(users)
+        return len(users), len(batch) - len(users)
@@ -1,7 +1,10 @@
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.db import models
+from django.db.models import Q
 from django.utils import timezone
 
+from core.images import validate_upload_size
+
 from .manager import CustemUserManager
 
 
@@ -20,6 +23,9 @@ class User(AbstractBaseUser, PermissionsMixin):
         is_staff (BooleanField): Определяет доступ к админ-панели.
         is_active (BooleanField): Определяет активность аккаунта.
         created (DateTimeField): Дата и время создания аккаунта.
+        avatar (ImageField): Аватар пользователя.
+        avatar_variants (JSONField): Построенные WebP-варианты аватара
+            (см. core.images.refresh_variants).
 
     Meta:
         USERNAME_FIELD: Поле, используемое для аутентификации (email).
@@ -37,16 +43,64 @@ class User(AbstractBaseUser, PermissionsMixin):
     is_staff = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
     created = models.DateTimeField(default=timezone.now)
+    avatar = models.ImageField(upload_to="avatars/%Y/%m/", blank=True, validators=[validate_upload_size])
+    avatar_variants = models.JSONField(default=dict, blank=True, editable=False)
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["username"]
 
     objects = CustemUserManager()
 
+    # Поля с именами, занятость которых кешируется в names_cache.
+    NAME_FIELDS = ("email", "username")
+
+    # (email, username), с которыми пользователь загружен или сохранен;
+    # по ним сохранение находит прежние имена без запроса к базе.
+    # None - значение неизвестно (поле было отложено).
+    _loaded_names = None
+
     class Meta:
         indexes = [
             models.Index(fields=['email'], name='idx_email'),
             models.Index(fields=['username'], name='idx_username'),
+            # Список пользователей в админке: сортировка и фильтр по дате
+            # регистрации. Неактивных пользователей и сотрудников мало,
+            # поэтому для фильтров по ним хватает маленьких частичных
+            # индексов; противоположные значения фильтров читают
+            # idx_user_created, где подходит почти каждая строка.
+            models.Index(fields=['created', 'id'], name='idx_user_created'),
+            models.Index(fields=['created', 'id'], name='idx_user_inactive', condition=Q(is_active=False)),
+            models.Index(fields=['created', 'id'], name='idx_user_staff', condition=Q(is_staff=True)),
         ]
 
     def __str__(self):
         return self.username
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        user = super().from_db(db, field_names, values)
+        user.remember_names()
+        return user
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self.remember_names(fields)
+
+    def remember_names(self, fields=None):
+        """Запоминает текущие значения email и username (из fields или всех) как сохраненные в базе."""
+        loaded = dict(zip(self.NAME_FIELDS, self._loaded_names or (None, None)))
+        for name in self.NAME_FIELDS:
+            if fields is None or name in fields:
+                loaded[name] = self.__dict__.get(name)
+        self._loaded_names = tuple(loaded[name] for name in self.NAME_FIELDS)
+
+    def get_session_auth_hash(self):
+        """
+        HMAC пароля для проверки сессии.
+
+        Пользователь из кеша EmailBackend.get_user() загружен без хеша
+        пароля и с уже посчитанным HMAC. Если пароль загружен или изменен
+        (set_password()), HMAC считается заново.
+        """
+        if "password" in self.get_deferred_fields() and hasattr(self, "_session_auth_hash"):
+            return self._session_auth_hash
+        return super().get_session_auth_hash()
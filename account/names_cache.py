@@ -0,0 +1,59 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+class TakenNamesCache:
+    """
+    Ограниченный LRU-кеш с TTL для занятых email и username.
+
+    Хранит только положительные ответы («имя занято»), поэтому устаревшая
+    запись может лишь ненадолго отклонить имя, освободившееся после
+    удаления пользователя. Уникальные индексы в базе остаются последней
+    проверкой при INSERT.
+
+    Кеш живет в памяти процесса и потокобезопасен.
+    """
+
+    def __init__(self, maxsize=10000, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            expires = self._data.get(key)
+            if expires is None:
+                return False
+            if expires < time.monotonic():
+                del self._data[key]
+                return False
+            self._data.move_to_end(key)
+            return True
+
+    def add(self, key):
+        with self._lock:
+            self._data[key] = time.monotonic() + self.ttl
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+taken_names = TakenNamesCache(
+    maxsize=getattr(settings, "ACCOUNT_TAKEN_NAMES_CACHE_SIZE", 10000),
+    ttl=getattr(settings, "ACCOUNT_TAKEN_NAMES_CACHE_TTL", 300),
+)
@@ -0,0 +1,127 @@
+from django.contrib.auth.models import Group, Permission
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.fragments import bump, track_fragments
+from core.images import track_image_variants, variants_built
+
+from .backends import forget_cached_permissions, forget_cached_user
+from .models import User
+from .names_cache import taken_names
+from .tasks import send_welcome_email, track_signup
+
+
+@receiver(post_delete, sender=User)
+def forget_taken_names(sender, instance, **kwargs):
+    """Освобождает email и username удаленного пользователя в кеше."""
+    taken_names.discard(("email", instance.email))
+    taken_names.discard(("username", instance.username))
+
+
+@receiver(pre_save, sender=User)
+def remember_renamed_names(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Запоминает прежние email и username, если сохранение их меняет.
+
+    Прежние значения берутся из User._loaded_names; база читается, только
+    если они неизвестны (поле было отложено при загрузке).
+    """
+    instance._renamed_names = ()
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    fields = [name for name in sender.NAME_FIELDS if update_fields is None or name in update_fields]
+    if not fields:
+        return
+    old = dict(zip(sender.NAME_FIELDS, instance._loaded_names or (None, None)))
+    if any(old[name] is None for name in fields):
+        row = sender._base_manager.filter(pk=instance.pk).values_list(*sender.NAME_FIELDS).first()
+        if row is None:
+            return
+        old = dict(zip(sender.NAME_FIELDS, row))
+    instance._renamed_names = tuple(
+        (name, old[name]) for name in fields if old[name] != getattr(instance, name)
+    )
+
+
+@receiver(post_save, sender=User)
+def forget_renamed_names(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Освобождает в кеше прежние email и username после их изменения."""
+    for key in getattr(instance, "_renamed_names", ()):
+        taken_names.discard(key)
+    instance._renamed_names = ()
+    if not raw:
+        instance.remember_names(update_fields)
+
+
+@receiver(post_save, sender=User)
+def enqueue_signup_tasks(sender, instance, created, raw=False, **kwargs):
+    """
+    Ставит в очередь работу после регистрации вместо выполнения в запросе.
+
+    Задачи пишутся в той же транзакции, что и пользователь; ключи
+    идемпотентности не дают отправить письмо дважды.
+    """
+    if not created or raw:
+        return
+    send_welcome_email.enqueue(instance.pk, key=f"welcome-email:{instance.pk}")
+    track_signup.enqueue(instance.pk, instance.created.isoformat(), key=f"signup-event:{instance.pk}")
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """
+    Сбрасывает кеш get_user() и кеш прав при изменении или удалении
+    пользователя: набор прав зависит от is_superuser и is_active, а pk
+    удаленного пользователя может достаться новому.
+    """
+    forget_cached_user(instance.pk)
+    forget_cached_permissions([instance.pk])
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def invalidate_user_permissions(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Сбрасывает кеш прав пользователя при изменении его групп или прав.
+
+    Со стороны группы или права (group.user_set.add(...)) затронуты
+    пользователи из pk_set; clear() с этой стороны не сообщает, кого он
+    затронул, поэтому сбрасываются права всех.
+    """
+    if not action.startswith("post_"):
+        return
+    if not reverse:
+        forget_cached_permissions([instance.pk])
+    elif pk_set is not None:
+        forget_cached_permissions(pk_set)
+    else:
+        forget_cached_permissions()
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Permission)
+def invalidate_all_permissions(sender, **kwargs):
+    """
+    Сбрасывает кеш прав всех пользователей при изменении прав групп.
+
+    Такие изменения редки, а участников группы пришлось бы искать
+    отдельным запросом, поэтому меняется общая версия прав.
+    """
+    if kwargs.get("action", "post_").startswith("post_"):
+        forget_cached_permissions()
+
+
+@receiver(variants_built, sender=User)
+def forget_user_with_new_variants(sender, pk, **kwargs):
+    """
+    Сбрасывает кеш get_user() и фрагменты пользователя, когда фоновый
+    пул записал варианты аватара (запись идет через update(), без post_save).
+    """
+    forget_cached_user(pk)
+    bump(User, pk)
+
+
+track_image_variants(User, "avatar", "avatar_variants")
+track_fragments(User)
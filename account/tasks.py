@@ -0,0 +1,31 @@
+import json
+import logging
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import send_mail
+from django.template.loader import render_to_string
+
+from core.tasks import task
+
+analytics = logging.getLogger("analytics")
+
+
+@task(max_attempts=8)
+def send_welcome_email(user_id):
+    """Отправляет письмо после регистрации; SMTP может отвечать секундами."""
+    user = get_user_model().objects.filter(pk=user_id, is_active=True).only("username", "email").first()
+    if user is None:
+        return
+    send_mail(
+        "Welcome to Blog Gomer Lisa",
+        render_to_string("account/email/welcome.txt", {"user": user}),
+        settings.DEFAULT_FROM_EMAIL,
+        [user.email],
+    )
+
+
+@task()
+def track_signup(user_id, created_at):
+    """Пишет событие регистрации в журнал аналитики (логгер analytics)."""
+    analytics.info(json.dumps({"event": "signup", "user_id": user_id, "at": created_at}))
@@ -1,4 +1,23 @@
-from django.test import TestCase
+import csv
+import os
+import shutil
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest import mock
+
+from django.contrib import admin
+from django.contrib.auth.models import AnonymousUser, Group, Permission
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.core.exceptions import ValidationError
@@ -6,7 +25,26 @@ from django.views.generic import TemplateView
 from django.contrib.auth import authenticate, login, logout
 
 
+from core.cache import view_cache_hits, view_cache_misses
+from core.images import variant_pool
+from core.models import Task
+from core.proxies import get_client_ip
+from core.testing import QueryBudget, create_users, make_image
+
+from .backends import EmailBackend
 from .forms import CustomUserCreationForm
+from .hashing import HashingPool, HashingPoolBusy
+from .manager import UserQuerySet
+from .names_cache import taken_names
+from .tasks import track_signup
+from .throttle import (
+    CacheCounterStore,
+    SharedMemoryCounterStore,
+    SlidingWindowLimiter,
+    throttle_requests,
+    throttle_store_full,
+)
+from .views import AsyncLoginView, AsyncRegisterView
 
 class ModelTests(TestCase):
     """Тесты для модели пользователя"""
@@ -148,6 +186,8 @@ class LoginLogoutTest(TestCase):
         self.assertContains(response, "<form")
         self.assertContains(response, "username")
         self.assertContains(response, "password")
+        self.assertContains(response, '<button type="submit" class="account-page__button">Log in</button>', html=True)
+        self.assertNotContains(response, '<button type="submit" class="account-page__button">Sign up</button>', html=True)
 
     def test_successful_login(self):
         """тест: Успешный вход с корректными данными"""
@@ -155,7 +195,7 @@ class LoginLogoutTest(TestCase):
             "username": "testuser",
             "password": "ComplexPass123!"
         }
-        response = self.client.post(reverse("account:login", data))
+        response = self.client.post(reverse("account:login"), data)
         self.assertEqual(response.status_code, 302)
         user = authenticate(username='testuser', password='ComplexPass123!')
         self.assertIsNotNone(user)
@@ -177,4 +217,945 @@ class LoginLogoutTest(TestCase):
         self.client.login(username='testuser', password='ComplexPass123!')
         response = self.client.get(reverse('account:logout'))
         self.assertEqual(response.status_code, 302)  # Редирект после выхода
-        self.assertFalse('_auth_user_id' in self.client.session)
\ No newline at end of file
+        self.assertFalse('_auth_user_id' in self.client.session)
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class BulkCreateUsersTests(TestCase):
+    """Тесты массового импорта пользователей"""
+
+    def setUp(self):
+        self.User = get_user_model()
+
+    def test_bulk_create_users_normalizes_and_hashes(self):
+        """Тест: email нормализуется, пароль хешируется"""
+        result = self.User.objects.bulk_create_users(
+            [{"email": "bulk@EXAMPLE.COM", "username": "bulk", "password": "pass12345"}],
+            workers=0,
+        )
+        self.assertEqual(result.created, 1)
+        user = self.User.objects.get(username="bulk")
+        self.assertEqual(user.email, "bulk@example.com")
+        self.assertTrue(user.check_password("pass12345"))
+
+    def test_bulk_create_users_skips_duplicates(self):
+        """Тест: дубликаты в пачке и в базе пропускаются"""
+        self.User.objects.create_user(email="old@example.com", username="old", password="x")
+        rows = [
+            {"email": "old@example.com", "username": "new1", "password": "x"},
+            {"email": "new2@example.com", "username": "old", "password": "x"},
+            {"email": "new3@example.com", "username": "new3", "password": "x"},
+            {"email": "new3@example.com", "username": "new4", "password": "x"},
+            {"email": "", "username": "new5", "password": "x"},
+        ]
+        result = self.User.objects.bulk_create_users(rows, batch_size=2, workers=0)
+        self.assertEqual((result.created, result.skipped), (1, 4))
+        self.assertEqual(self.User.objects.count(), 2)
+
+    def test_import_users_command_reads_csv(self):
+        """Тест: команда import_users импортирует CSV"""
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as f:
+            f.write("email,username,password,legacy_id\n")
+            f.write("csv1@example.com,csv1,pass1,10\n")
+            f.write("csv2@example.com,csv2,pass2,11\n")
+        self.addCleanup(os.remove, f.name)
+
+        call_command("import_users", f.name, workers=0, stdout=StringIO())
+        self.assertEqual(self.User.objects.filter(username__startswith="csv").count(), 2)
+
+
+class UniquenessValidationTests(TestCase):
+    """Тесты проверки занятости email и username при регистрации"""
+
+    def setUp(self):
+        taken_names.clear()
+        self.addCleanup(taken_names.clear)
+        self.data = {
+            "email": "fresh@example.com",
+            "username": "fresh",
+            "password1": "ComplexPass123!",
+            "password2": "ComplexPass123!",
+        }
+
+    def test_free_names_checked_in_one_query(self):
+        """Тест: email и username проверяются одним запросом"""
+        form = CustomUserCreationForm(self.data)
+        with self.assertNumQueries(1):
+            self.assertTrue(form.is_valid())
+
+    def test_taken_names_reported(self):
+        """Тест: занятые email и username дают ошибки полей"""
+        get_user_model().objects.create_user(
+            email="fresh@example.com", username="fresh", password="x"
+        )
+        form = CustomUserCreationForm(self.data)
+        self.assertFalse(form.is_valid())
+        self.assertIn("email", form.errors)
+        self.assertIn("username", form.errors)
+
+    def test_repeat_collision_served_from_cache(self):
+        """Тест: повторная коллизия по обоим именам не обращается к базе"""
+        get_user_model().objects.create_user(
+            email="fresh@example.com", username="fresh", password="x"
+        )
+        self.assertFalse(CustomUserCreationForm(self.data).is_valid())
+        form = CustomUserCreationForm(self.data)
+        with self.assertNumQueries(0):
+            self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors["email"], ["This email is busy"])
+        self.assertIn("username", form.errors)
+
+    def test_partial_cache_hit_queries_missing_name(self):
+        """Тест: при промахе кеша по одному имени в базе проверяется только оно"""
+        get_user_model().objects.create_user(
+            email="other@example.com", username="fresh", password="x"
+        )
+        taken_names.add(("email", "fresh@example.com"))
+        with CaptureQueriesContext(connection) as queries:
+            email_taken, username_taken = CustomUserCreationForm.find_taken("fresh@example.com", "fresh")
+        self.assertEqual((email_taken, username_taken), (True, True))
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("fresh@example.com", queries[0]["sql"])
+        self.assertIn(("username", "fresh"), taken_names)
+
+    def test_deleted_user_frees_names(self):
+        """Тест: удаление пользователя освобождает имена в кеше"""
+        user = get_user_model().objects.create_user(
+            email="fresh@example.com", username="fresh", password="x"
+        )
+        self.assertFalse(CustomUserCreationForm(self.data).is_valid())
+        user.delete()
+        self.assertTrue(CustomUserCreationForm(self.data).is_valid())
+
+    def test_renamed_user_frees_old_names(self):
+        """Тест: смена email и username освобождает прежние имена в кеше"""
+        user = get_user_model().objects.create_user(
+            email="fresh@example.com", username="fresh", password="x"
+        )
+        self.assertFalse(CustomUserCreationForm(self.data).is_valid())
+        user.email = "renamed@example.com"
+        user.username = "renamed"
+        user.save()
+        self.assertNotIn(("email", "fresh@example.com"), taken_names)
+        self.assertNotIn(("username", "fresh"), taken_names)
+        self.assertTrue(CustomUserCreationForm(self.data).is_valid())
+
+    def test_full_save_does_not_read_old_names(self):
+        """Тест: полное сохранение загруженного пользователя не читает прежние имена из базы"""
+        get_user_model().objects.create_user(email="fresh@example.com", username="fresh", password="x")
+        user = get_user_model().objects.get(email="fresh@example.com")
+        user.set_password("other")
+        with self.assertNumQueries(1):
+            user.save()
+
+        self.assertFalse(CustomUserCreationForm(self.data).is_valid())
+        user.username = "renamed"
+        with self.assertNumQueries(1):
+            user.save()
+        self.assertNotIn(("username", "fresh"), taken_names)
+        user.username = "renamed-again"
+        user.save()
+        self.assertNotIn(("username", "renamed"), taken_names)
+
+    def test_save_without_names_skips_lookup(self):
+        """Тест: сохранение без email и username не читает прежние имена"""
+        user = get_user_model().objects.create_user(
+            email="fresh@example.com", username="fresh", password="x"
+        )
+        with self.assertNumQueries(1):
+            user.save(update_fields=["is_active"])
+
+
+@override_settings(VIEW_CACHE_TIMEOUT=60)
+class IndexPageCacheTests(TestCase):
+    """Тесты кеширования главной страницы"""
+
+    def setUp(self):
+        cache.clear()
+        view_cache_hits.reset()
+        view_cache_misses.reset()
+
+    def test_anonymous_response_cached(self):
+        """Тест: повторный анонимный запрос отдается из кеша"""
+        first = self.client.get(reverse("account:index"))
+        second = self.client.get(reverse("account:index"))
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(view_cache_misses.value(view="account:index"), 1)
+        self.assertEqual(view_cache_hits.value(view="account:index"), 1)
+        self.assertIn("Cookie", second["Vary"])
+
+    def test_authenticated_request_bypasses_cache(self):
+        """Тест: запросы с сессией не используют кеш"""
+        user = get_user_model().objects.create_user(
+            email="cached@example.com", username="cached", password="x"
+        )
+        self.client.force_login(user)
+        self.client.get(reverse("account:index"))
+        self.client.get(reverse("account:index"))
+        self.assertEqual(view_cache_hits.value(view="account:index"), 0)
+        self.assertEqual(view_cache_misses.value(view="account:index"), 0)
+
+    @override_settings(VIEW_CACHE_TIMEOUT=0)
+    def test_zero_timeout_disables_cache(self):
+        """Тест: нулевой таймаут отключает кеш"""
+        self.client.get(reverse("account:index"))
+        self.client.get(reverse("account:index"))
+        self.assertEqual(view_cache_hits.value(view="account:index"), 0)
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class AsyncViewsTests(TestCase):
+    """Тесты асинхронных представлений регистрации и входа"""
+
+    def setUp(self):
+        taken_names.clear()
+        self.addCleanup(taken_names.clear)
+
+    def make_request(self, path, data):
+        request = AsyncRequestFactory().post(path, data)
+        request.session = SessionStore()
+        request.user = AnonymousUser()
+        return request
+
+    async def test_async_register_creates_and_logs_in_user(self):
+        """Тест: асинхронная регистрация создает пользователя и входит"""
+        request = self.make_request("/register/", {
+            "email": "async@example.com",
+            "username": "async",
+            "password1": "ComplexPass123!",
+            "password2": "ComplexPass123!",
+        })
+        response = await AsyncRegisterView.as_view()(request)
+        self.assertEqual(response.status_code, 302)
+        user = await get_user_model().objects.aget(email="async@example.com")
+        self.assertTrue(user.check_password("ComplexPass123!"))
+        self.assertEqual(request.session["_auth_user_id"], str(user.pk))
+
+    async def test_async_register_rolls_back_without_signup_tasks(self):
+        """Тест: если задачи регистрации не поставились, пользователь не сохраняется"""
+        request = self.make_request("/register/", {
+            "email": "async@example.com",
+            "username": "async",
+            "password1": "ComplexPass123!",
+            "password2": "ComplexPass123!",
+        })
+        with mock.patch.object(track_signup, "enqueue", side_effect=DatabaseError("queue is down")):
+            with self.assertRaises(DatabaseError):
+                await AsyncRegisterView.as_view()(request)
+        self.assertFalse(await get_user_model().objects.filter(email="async@example.com").aexists())
+        self.assertFalse(await Task.objects.aexists())
+
+    async def test_async_login(self):
+        """Тест: асинхронный вход с верным и неверным паролем"""
+        await get_user_model().objects.acreate(
+            email="async@example.com", username="async",
+            password=await HashingPool(1, 1).make_password("ComplexPass123!"),
+        )
+        request = self.make_request("/login/", {"username": "async@example.com", "password": "wrong"})
+        response = await AsyncLoginView.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "error")
+
+        request = self.make_request("/login/", {"username": "async@example.com", "password": "ComplexPass123!"})
+        response = await AsyncLoginView.as_view()(request)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("_auth_user_id", request.session)
+
+    async def test_async_login_follows_safe_next(self):
+        """Тест: асинхронный вход переходит по next из адреса формы, внешние адреса игнорируются"""
+        await get_user_model().objects.acreate(
+            email="async@example.com", username="async",
+            password=await HashingPool(1, 1).make_password("ComplexPass123!"),
+        )
+        data = {"username": "async@example.com", "password": "ComplexPass123!"}
+        cases = [
+            ("/login/?next=/account/avatar/", "/account/avatar/"),
+            ("/login/?next=https://evil.example.com/", reverse("blog:index")),
+            ("/login/", reverse("blog:index")),
+        ]
+        for path, expected in cases:
+            with self.subTest(path=path):
+                response = await AsyncLoginView.as_view()(self.make_request(path, data))
+                self.assertEqual(response.status_code, 302)
+                self.assertEqual(response.url, expected)
+
+    async def test_hashing_pool_rejects_when_full(self):
+        """Тест: переполненный пул хеширования отклоняет задачи"""
+        with self.assertRaises(HashingPoolBusy):
+            await HashingPool(max_workers=1, max_pending=0).make_password("x")
+
+
+@override_settings(
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+    AUTH_USER_CACHE_TIMEOUT=60,
+)
+class EmailBackendTests(TestCase):
+    """Тесты бэкенда аутентификации по email"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            email="backend@example.com", username="backend", password="ComplexPass123!"
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_authenticate_by_email_in_one_query(self):
+        """Тест: вход по email выполняет один запрос"""
+        with self.assertNumQueries(1):
+            user = authenticate(username="backend@EXAMPLE.com", password="ComplexPass123!")
+        self.assertEqual(user, self.user)
+
+    def test_authenticate_by_username(self):
+        """Тест: вход по username"""
+        self.assertEqual(authenticate(username="backend", password="ComplexPass123!"), self.user)
+        self.assertIsNone(authenticate(username="backend", password="wrong"))
+
+    @override_settings(
+        PASSWORD_HASHERS=["account.hashers.TunedPBKDF2PasswordHasher"],
+        PASSWORD_PBKDF2_ITERATIONS=10,
+    )
+    def test_outdated_hash_rehashed_on_login(self):
+        """Тест: устаревший хеш пересчитывается при входе"""
+        self.user.set_password("ComplexPass123!")
+        self.user.save()
+        with self.settings(PASSWORD_PBKDF2_ITERATIONS=20):
+            authenticate(username="backend", password="ComplexPass123!")
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$20$"))
+
+    def test_get_user_cached_until_user_saved(self):
+        """Тест: get_user берется из кеша до изменения пользователя"""
+        backend = EmailBackend()
+        backend.get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(backend.get_user(self.user.pk), self.user)
+
+        self.user.username = "renamed"
+        self.user.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(backend.get_user(self.user.pk).username, "renamed")
+
+    def test_authenticated_request_does_not_query_user(self):
+        """Тест: повторный запрос не загружает пользователя из базы"""
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("account:index"))
+        self.assertTrue(response.wsgi_request.user.is_authenticated)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("account:index"))
+            self.assertTrue(response.wsgi_request.user.is_authenticated)
+        self.assertFalse(any("account_user" in q["sql"] for q in queries.captured_queries))
+
+    def test_cached_user_has_no_password_hash(self):
+        """Тест: в кеше нет хеша пароля, а сессия пользователя из кеша проверяется"""
+        backend = EmailBackend()
+        backend.get_user(self.user.pk)
+        values, session_hash = cache.get(f"account:user:{self.user.pk}")
+        self.assertNotIn(self.user.password, values)
+
+        user = backend.get_user(self.user.pk)
+        self.assertIn("password", user.get_deferred_fields())
+        self.assertEqual(user.get_session_auth_hash(), self.user.get_session_auth_hash())
+        user.set_password("NewPass123!")
+        self.assertNotEqual(user.get_session_auth_hash(), session_hash)
+
+    def test_cached_user_forgotten_again_on_commit(self):
+        """Тест: пользователь, закешированный до коммита изменения, удаляется из кеша после коммита"""
+        backend = EmailBackend()
+        key = f"account:user:{self.user.pk}"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+            # Параллельный запрос успел прочитать строку до коммита.
+            cache.set(key, "stale")
+        self.assertIsNone(cache.get(key))
+        self.assertIsNone(backend.get_user(self.user.pk))
+
+    def test_queryset_update_invalidates_cached_user(self):
+        """Тест: QuerySet.update() сбрасывает кеш пользователя"""
+        backend = EmailBackend()
+        backend.get_user(self.user.pk)
+        get_user_model().objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertIsNone(backend.get_user(self.user.pk))
+
+    def test_queryset_update_in_batches(self):
+        """Тест: update() - один UPDATE без блокировок, кеш затронутых пользователей сбрасывается пачками"""
+        User = get_user_model()
+        users = create_users([f"batch{n}" for n in range(5)])
+        backend = EmailBackend()
+        for user in [self.user, *users]:
+            backend.get_user(user.pk)
+
+        with mock.patch.object(UserQuerySet, "update_batch_size", 2), self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                updated = User.objects.filter(username__startswith="batch", is_active=True).update(is_active=False)
+        self.assertEqual(updated, 5)
+        statements = [query["sql"] for query in queries]
+        self.assertEqual(len([sql for sql in statements if sql.startswith("UPDATE")]), 1)
+        self.assertFalse(any("FOR UPDATE" in sql for sql in statements))
+        self.assertFalse(User.objects.filter(username__startswith="batch", is_active=True).exists())
+        for user in users:
+            self.assertIsNone(cache.get(f"account:user:{user.pk}"))
+        self.assertIsNotNone(cache.get(f"account:user:{self.user.pk}"))
+
+    @override_settings(AUTH_USER_CACHE_TIMEOUT=0)
+    def test_user_cache_can_be_disabled(self):
+        """Тест: с AUTH_USER_CACHE_TIMEOUT = 0 пользователь всегда читается из базы"""
+        backend = EmailBackend()
+        backend.get_user(self.user.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(backend.get_user(self.user.pk), self.user)
+
+
+class ThrottleTests(TestCase):
+    """Тесты ограничения частоты запросов"""
+
+    def setUp(self):
+        cache.clear()
+        throttle_requests.reset()
+
+    def test_sliding_window_limiter(self):
+        """Тест: лимит учитывает часть предыдущего окна"""
+        limiter = SlidingWindowLimiter("test", limit=2, window=60)
+        self.assertTrue(limiter.hit("a", now=600))
+        self.assertTrue(limiter.hit("a", now=610))
+        self.assertFalse(limiter.hit("a", now=620))
+        self.assertTrue(limiter.hit("b", now=620))
+        # Через половину следующего окна от предыдущего остается 2 * 0.5 = 1.
+        self.assertTrue(limiter.hit("a", now=690))
+        self.assertFalse(limiter.hit("a", now=690))
+
+    def test_shared_memory_store(self):
+        """Тест: счетчики в общей памяти ведут себя так же и ограничены по размеру"""
+        with tempfile.TemporaryDirectory() as tmp:
+            store = SharedMemoryCounterStore(os.path.join(tmp, "throttle"), slots=8)
+            limiter = SlidingWindowLimiter("test", limit=2, window=60, store=store)
+            self.assertTrue(limiter.hit("a", now=600))
+            self.assertTrue(limiter.hit("a", now=610))
+            self.assertFalse(limiter.hit("a", now=620))
+            self.assertTrue(limiter.hit("a", now=690))
+            self.assertFalse(limiter.hit("a", now=690))
+            for n in range(20):
+                limiter.hit(f"ip{n}", now=700)
+            self.assertEqual(os.path.getsize(store.path), store.SLOT.size * 8)
+
+    def test_cache_store_concurrent_hits(self):
+        """Тест: параллельные запросы не проходят лимит все сразу при медленном кеше"""
+        limiter = SlidingWindowLimiter("test", limit=5, window=60, store=CacheCounterStore())
+        add = LocMemCache.add
+        results = []
+
+        def slow_add(self, *args, **kwargs):
+            time.sleep(0.01)
+            return add(self, *args, **kwargs)
+
+        def attempt():
+            results.append(limiter.hit("victim@example.com", now=600))
+
+        with mock.patch.object(LocMemCache, "add", slow_add):
+            threads = [threading.Thread(target=attempt) for _ in range(30)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(results.count(True), 5)
+
+    def test_shared_memory_store_windows_get_own_slots(self):
+        """Тест: окна одного вызова не делят слот в общей памяти"""
+        with tempfile.TemporaryDirectory() as tmp:
+            store = SharedMemoryCounterStore(os.path.join(tmp, "throttle"), slots=2)
+            ip = SlidingWindowLimiter("login:ip", limit=3, window=60, store=store)
+            email = SlidingWindowLimiter("login:email", limit=100, window=60, store=store)
+            allowed = [
+                store.hit([ip.counters("10.0.0.1", 600), email.counters(f"u{n}@example.com", 600)]) is None
+                for n in range(5)
+            ]
+            self.assertEqual(allowed, [True, True, True, False, False])
+
+    def test_shared_memory_store_full_table_blocks(self):
+        """Тест: если окну не хватило слота, запрос отклоняется и учитывается в метрике"""
+        throttle_store_full.reset()
+        with tempfile.TemporaryDirectory() as tmp:
+            store = SharedMemoryCounterStore(os.path.join(tmp, "throttle"), slots=1)
+            ip = SlidingWindowLimiter("login:ip", limit=100, window=60, store=store)
+            email = SlidingWindowLimiter("login:email", limit=100, window=60, store=store)
+            self.assertEqual(store.hit([ip.counters("10.0.0.1", 600), email.counters("a@example.com", 600)]), 1)
+            self.assertEqual(throttle_store_full.value(), 1)
+
+    @override_settings(ACCOUNT_THROTTLE_RATES={"login": {"email": "2/m"}})
+    def test_login_blocked_before_authentication(self):
+        """Тест: превышение лимита дает 429 без проверки пароля"""
+        data = {"username": "victim@example.com", "password": "guess"}
+        for _ in range(2):
+            self.assertEqual(self.client.post(reverse("account:login"), data).status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client.post(reverse("account:login"), data)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(throttle_requests.value(scope="login", result="allowed"), 2)
+        self.assertEqual(throttle_requests.value(scope="login", result="blocked"), 1)
+
+    @override_settings(ACCOUNT_THROTTLE_RATES={"register": {"ip": "0/h"}})
+    async def test_async_view_blocked(self):
+        """Тест: асинхронное представление тоже ограничивается"""
+        request = AsyncRequestFactory().post("/register/", {})
+        response = await AsyncRegisterView.as_view()(request)
+        self.assertEqual(response.status_code, 429)
+
+    @override_settings(ACCOUNT_THROTTLE_RATES={"register": {"ip": "0/h"}})
+    async def test_async_view_checks_throttle_off_event_loop(self):
+        """Тест: в асинхронном представлении хранилище счетчиков не вызывается в цикле событий"""
+        loop_thread = threading.current_thread()
+        threads = []
+        check_throttle = AsyncRegisterView.check_throttle
+
+        def record(view, request):
+            threads.append(threading.current_thread())
+            return check_throttle(view, request)
+
+        request = AsyncRequestFactory().post("/register/", {})
+        with mock.patch.object(AsyncRegisterView, "check_throttle", record):
+            response = await AsyncRegisterView.as_view()(request)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], loop_thread)
+
+    @override_settings(ACCOUNT_THROTTLE_RATES={"login": {"ip": "3/m", "email": "1/m"}})
+    def test_blocked_request_does_not_spend_other_limits(self):
+        """Тест: запрос, отклоненный по email, не расходует лимит по IP"""
+        url = reverse("account:login")
+        self.assertEqual(self.client.post(url, {"username": "a@example.com"}).status_code, 200)
+        for _ in range(3):
+            self.assertEqual(self.client.post(url, {"username": "a@example.com"}).status_code, 429)
+        self.assertEqual(self.client.post(url, {"username": "b@example.com"}).status_code, 200)
+        self.assertEqual(self.client.post(url, {"username": "c@example.com"}).status_code, 200)
+        self.assertEqual(self.client.post(url, {"username": "d@example.com"}).status_code, 429)
+
+    @override_settings(
+        THROTTLE_TRUSTED_PROXIES=["127.0.0.1", "10.0.0.0/8"],
+        ACCOUNT_THROTTLE_RATES={"register": {"ip": "1/h"}},
+    )
+    def test_client_ip_behind_trusted_proxy(self):
+        """Тест: за доверенным прокси лимит по IP считается по адресу клиента из X-Forwarded-For"""
+        factory = RequestFactory()
+        cases = [
+            ("127.0.0.1", "", "127.0.0.1"),
+            ("127.0.0.1", "203.0.113.5", "203.0.113.5"),
+            # Левые адреса подставляет клиент, правые - доверенные прокси.
+            ("127.0.0.1", "1.1.1.1, 203.0.113.5, 10.0.0.2", "203.0.113.5"),
+            ("198.51.100.7", "203.0.113.5", "198.51.100.7"),
+        ]
+        for remote_addr, forwarded, expected in cases:
+            with self.subTest(remote_addr=remote_addr, forwarded=forwarded):
+                request = factory.get("/", REMOTE_ADDR=remote_addr, HTTP_X_FORWARDED_FOR=forwarded)
+                self.assertEqual(get_client_ip(request), expected)
+
+        url = reverse("account:register")
+        self.assertNotEqual(self.client.post(url, {}, HTTP_X_FORWARDED_FOR="203.0.113.5").status_code, 429)
+        self.assertEqual(self.client.post(url, {}, HTTP_X_FORWARDED_FOR="203.0.113.5").status_code, 429)
+        self.assertNotEqual(self.client.post(url, {}, HTTP_X_FORWARDED_FOR="203.0.113.6").status_code, 429)
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class QueryBudgetTests(TestCase):
+    """Тесты бюджета SQL-запросов представлений"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, = create_users(["admin"], is_staff=True, is_superuser=True)
+
+    def setUp(self):
+        cache.clear()
+        taken_names.clear()
+
+    def test_anonymous_pages(self):
+        """Тест: страницы для анонимов не обращаются к базе"""
+        for name in ("account:index", "account:register", "account:login"):
+            with self.subTest(name=name), QueryBudget(self, 0):
+                self.client.get(reverse(name))
+
+    @override_settings(TASKS_EAGER=False)
+    def test_register(self):
+        """Тест: регистрация укладывается в бюджет (включая постановку двух фоновых задач)"""
+        data = {
+            "email": "new@example.com",
+            "username": "newuser",
+            "password1": "ComplexPass123!",
+            "password2": "ComplexPass123!",
+        }
+        with QueryBudget(self, 14):
+            response = self.client.post(reverse("account:register"), data)
+        self.assertEqual(response.status_code, 302)
+
+    def test_login_and_logout(self):
+        """Тест: вход и выход укладываются в бюджет"""
+        data = {"username": "admin@example.com", "password": "ComplexPass123!"}
+        with QueryBudget(self, 9):
+            response = self.client.post(reverse("account:login"), data)
+        self.assertEqual(response.status_code, 302)
+        with QueryBudget(self, 4):
+            self.client.post(reverse("account:logout"))
+
+    def test_admin_index(self):
+        """Тест: главная страница админки укладывается в бюджет"""
+        self.client.force_login(self.user)
+        with QueryBudget(self, 3):
+            response = self.client.get(reverse("admin:index"))
+        self.assertEqual(response.status_code, 200)
+
+    def test_budget_exceeded_fails(self):
+        """Тест: превышение бюджета проваливает тест со списком запросов"""
+        with self.assertRaisesMessage(AssertionError, "2 queries executed, budget is 1"):
+            with QueryBudget(self, 1):
+                list(get_user_model().objects.all())
+                list(get_user_model().objects.all())
+
+
+class AvatarUploadTests(TransactionTestCase):
+    """Тесты загрузки аватара (варианты пишет поток пула, поэтому без общей транзакции)"""
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        media = override_settings(MEDIA_ROOT=root, FILE_UPLOAD_TEMP_DIR=root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", username="user", password="ComplexPass123!"
+        )
+        self.client.force_login(self.user)
+
+    def test_upload_builds_variants_after_commit(self):
+        """Тест: после коммита фоновый пул строит WebP-варианты и записывает их ширины"""
+        response = self.client.post(reverse("account:avatar"), {"avatar": make_image(800, 600)})
+        self.assertRedirects(response, reverse("account:avatar"))
+        variant_pool.join()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.avatar_variants, {"source": self.user.avatar.name, "widths": [320, 640, 800]})
+        response = self.client.get(reverse("account:avatar"))
+        self.assertContains(response, "320w")
+
+    def test_upload_saves_only_avatar(self):
+        """Тест: загрузка аватара не перезаписывает остальные поля устаревшим пользователем из кеша"""
+        self.client.get(reverse("account:avatar"))
+        get_user_model().objects.filter(pk=self.user.pk).update(is_staff=True, username="renamed")
+        with mock.patch("django.contrib.auth.get_user", return_value=self.user):
+            response = self.client.post(reverse("account:avatar"), {"avatar": make_image(400, 300)})
+        self.assertRedirects(response, reverse("account:avatar"), fetch_redirect_response=False)
+        variant_pool.join()
+
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.avatar)
+        self.assertTrue(self.user.is_staff)
+        self.assertEqual(self.user.username, "renamed")
+        self.assertEqual(self.user.avatar_variants["source"], self.user.avatar.name)
+
+    @override_settings(MEDIA_MAX_UPLOAD_SIZE=1024)
+    def test_too_large_upload_rejected(self):
+        """Тест: файл больше MEDIA_MAX_UPLOAD_SIZE отклоняется"""
+        response = self.client.post(reverse("account:avatar"), {"avatar": make_image(800, 600, format="BMP")})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context["form"].is_valid())
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.avatar)
+
+    def test_login_required(self):
+        """Тест: анонимного пользователя отправляют на вход"""
+        self.client.logout()
+        response = self.client.get(reverse("account:avatar"))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse("account:login"), response.url)
+
+
+class SessionEngineTests(TestCase):
+    """Тесты хранилищ сессий и очистки просроченных сессий"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, = create_users(["user"])
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(SESSION_ENGINE="django.contrib.sessions.backends.cached_db", AUTH_USER_CACHE_TIMEOUT=60)
+    def test_cached_db_skips_session_table(self):
+        """Тест: с cached_db повторный запрос с сессией не обращается к базе"""
+        self.client.force_login(self.user)
+        self.client.get(reverse("account:avatar"))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("account:avatar"))
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(SESSION_ENGINE="django.contrib.sessions.backends.signed_cookies")
+    def test_signed_cookies_login(self):
+        """Тест: с signed_cookies вход не создает строк в django_session"""
+        response = self.client.post(
+            reverse("account:login"), {"username": "user@example.com", "password": "ComplexPass123!"}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Session.objects.exists())
+        self.assertEqual(self.client.get(reverse("account:avatar")).status_code, 200)
+
+        out = StringIO()
+        call_command("purge_sessions", stdout=out)
+        self.assertIn("nothing to purge", out.getvalue())
+
+    def test_purge_sessions_in_batches(self):
+        """Тест: purge_sessions удаляет только просроченные сессии, пачками"""
+        for n in range(7):
+            session = SessionStore()
+            session["n"] = n
+            session.set_expiry(-60 if n < 5 else 3600)
+            session.create()
+
+        out = StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command("purge_sessions", "--batch-size", "2", stdout=out)
+
+        self.assertIn("Removed 5 expired sessions", out.getvalue())
+        self.assertEqual(Session.objects.count(), 2)
+        deletes = [query for query in queries if query["sql"].startswith("DELETE")]
+        self.assertEqual(len(deletes), 3)
+
+
+class SignupTasksTests(TestCase):
+    """Тесты фоновых задач после регистрации"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_signup_enqueues_tasks(self):
+        """Тест: создание пользователя ставит письмо и событие аналитики, по одному разу"""
+        with self.assertLogs("analytics", "INFO") as logs:
+            user = get_user_model().objects.create_user(
+                email="new@example.com", username="newuser", password="ComplexPass123!"
+            )
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["new@example.com"])
+        self.assertIn('"event": "signup"', logs.output[0])
+        self.assertEqual(
+            set(Task.objects.values_list("key", "status")),
+            {(f"welcome-email:{user.pk}", "done"), (f"signup-event:{user.pk}", "done")},
+        )
+
+        user.username = "renamed"
+        user.save()
+        self.assertEqual(len(mail.outbox), 1)
+
+    @override_settings(TASKS_EAGER=False)
+    def test_signup_does_not_run_tasks_inline(self):
+        """Тест: без TASKS_EAGER регистрация только ставит задачи в очередь"""
+        response = self.client.post(reverse("account:register"), {
+            "email": "queued@example.com",
+            "username": "queued",
+            "password1": "ComplexPass123!",
+            "password2": "ComplexPass123!",
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(Task.objects.filter(status=Task.Status.QUEUED).count(), 2)
+
+
+class UserAdminTests(TestCase):
+    """Тесты списка пользователей в админке"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin, = create_users(["admin"], is_staff=True, is_superuser=True)
+        create_users(["alice", "malice"])
+        create_users(["bob"], is_active=False)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+        self.url = reverse("admin:account_user_changelist")
+
+    def changelist_usernames(self, response):
+        return sorted(user.username for user in response.context["cl"].result_list)
+
+    def test_changelist_count_is_cached(self):
+        """Тест: на SQLite список не выполняет COUNT(*) повторно, пока счет в кеше"""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["cl"].result_count, 4)
+        self.assertIsNone(response.context["cl"].full_result_count)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.context["cl"].result_count, 4)
+        self.assertFalse([q for q in queries if "COUNT(" in q["sql"]])
+
+    def test_search_by_prefix(self):
+        """Тест: поиск находит пользователей по началу email или имени, но не по середине"""
+        response = self.client.get(self.url, {"q": "ali"})
+        self.assertEqual(self.changelist_usernames(response), ["alice"])
+        response = self.client.get(self.url, {"q": "malice@"})
+        self.assertEqual(self.changelist_usernames(response), ["malice"])
+        response = self.client.get(self.url, {"q": "example"})
+        self.assertEqual(self.changelist_usernames(response), [])
+
+    def test_search_and_filters_use_indexes(self):
+        """Тест: поиск читает idx_email/idx_username, фильтры - свои индексы"""
+        model_admin = admin.site._registry[get_user_model()]
+        listing = get_user_model().objects.order_by("-created", "-pk")
+
+        searched, may_have_duplicates = model_admin.get_search_results(None, listing, "ali")
+        plan = searched.explain()
+        self.assertFalse(may_have_duplicates)
+        self.assertIn("idx_email", plan)
+        self.assertIn("idx_username", plan)
+        self.assertIn("idx_user_inactive", listing.filter(is_active=False).explain())
+        self.assertIn("idx_user_created", listing.filter(is_active=True).explain())
+        self.assertIn("idx_user_staff", listing.filter(is_staff=True).explain())
+        self.assertIn("idx_user_created", listing.filter(created__gte=self.admin.created).explain())
+
+    def test_filters(self):
+        """Тест: фильтры по активности и статусу сотрудника"""
+        response = self.client.get(self.url, {"is_active__exact": "0"})
+        self.assertEqual(self.changelist_usernames(response), ["bob"])
+        response = self.client.get(self.url, {"is_staff__exact": "1"})
+        self.assertEqual(self.changelist_usernames(response), ["admin"])
+
+    def test_export_csv_streams_rows(self):
+        """Тест: выгрузка в CSV отдается потоком со всеми выбранными пользователями"""
+        User = get_user_model()
+        selected = list(User.objects.filter(is_active=True).values_list("pk", flat=True))
+        response = self.client.post(self.url, {
+            "action": "export_csv",
+            "_selected_action": selected,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn("attachment;", response["Content-Disposition"])
+
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "id,email,username,is_active,is_staff,created,last_login")
+        self.assertEqual(
+            [line.split(",")[2] for line in lines[1:]],
+            list(User.objects.filter(pk__in=selected).order_by("pk").values_list("username", flat=True)),
+        )
+
+    def test_export_csv_escapes_formulas(self):
+        """Тест: значения, похожие на формулы, выгружаются как текст"""
+        users = create_users(["=HYPERLINK(1)", "+cmd", "-x", "@sum", "\tt", "plain"])
+        response = self.client.post(self.url, {
+            "action": "export_csv",
+            "_selected_action": [user.pk for user in users],
+        })
+        rows = list(csv.reader(StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual(
+            [row[2] for row in rows[1:]],
+            ["'=HYPERLINK(1)", "'+cmd", "'-x", "'@sum", "'\tt", "plain"],
+        )
+        self.assertEqual(rows[1][1], "'=HYPERLINK(1)@example.com")
+
+    def test_add_user(self):
+        """Тест: создание пользователя через админку"""
+        response = self.client.post(reverse("admin:account_user_add"), {
+            "email": "new@example.com",
+            "username": "newbie",
+            "usable_password": "true",
+            "password1": "ComplexPass123!",
+            "password2": "ComplexPass123!",
+        })
+        self.assertEqual(response.status_code, 302)
+        user = get_user_model().objects.get(email="new@example.com")
+        self.assertTrue(user.check_password("ComplexPass123!"))
+        response = self.client.get(reverse("admin:account_user_change", args=[user.pk]))
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(AUTH_PERMISSIONS_CACHE_TIMEOUT=300)
+class PermissionCacheTests(TestCase):
+    """Тесты кеша прав пользователя"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, = create_users(["editor"], is_staff=True)
+        cls.group = Group.objects.create(name="editors")
+        cls.view_post = Permission.objects.get(codename="view_post", content_type__app_label="blog")
+        cls.change_post = Permission.objects.get(codename="change_post", content_type__app_label="blog")
+        cls.group.permissions.add(cls.view_post)
+
+    def setUp(self):
+        cache.clear()
+
+    def fresh_user(self):
+        return get_user_model().objects.get(pk=self.user.pk)
+
+    def permission_queries(self, queries):
+        return [q for q in queries.captured_queries if "auth_permission" in q["sql"]]
+
+    def test_permissions_cached_between_requests(self):
+        """Тест: повторная проверка прав на новом объекте пользователя не ходит в базу"""
+        self.user.groups.add(self.group)
+        self.assertTrue(self.fresh_user().has_perm("blog.view_post"))
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertTrue(user.has_perm("blog.view_post"))
+            self.assertFalse(user.has_perm("blog.change_post"))
+            self.assertTrue(user.has_module_perms("blog"))
+
+    def test_group_membership_change_invalidates(self):
+        """Тест: добавление в группу и исключение из нее сбрасывают кеш"""
+        self.assertFalse(self.fresh_user().has_perm("blog.view_post"))
+        self.user.groups.add(self.group)
+        self.assertTrue(self.fresh_user().has_perm("blog.view_post"))
+        self.group.user_set.remove(self.user)
+        self.assertFalse(self.fresh_user().has_perm("blog.view_post"))
+        self.group.user_set.add(self.user)
+        self.assertTrue(self.fresh_user().has_perm("blog.view_post"))
+        self.group.user_set.clear()
+        self.assertFalse(self.fresh_user().has_perm("blog.view_post"))
+
+    def test_permission_changes_invalidate(self):
+        """Тест: изменение прав пользователя и прав группы сбрасывают кеш"""
+        self.user.groups.add(self.group)
+        self.assertFalse(self.fresh_user().has_perm("blog.change_post"))
+        self.user.user_permissions.add(self.change_post)
+        self.assertTrue(self.fresh_user().has_perm("blog.change_post"))
+        self.user.user_permissions.remove(self.change_post)
+        self.group.permissions.add(self.change_post)
+        self.assertTrue(self.fresh_user().has_perm("blog.change_post"))
+        self.group.delete()
+        self.assertFalse(self.fresh_user().has_perm("blog.view_post"))
+
+    @override_settings(AUTH_PERMISSIONS_CACHE_TIMEOUT=0)
+    def test_permission_cache_can_be_disabled(self):
+        """Тест: с AUTH_PERMISSIONS_CACHE_TIMEOUT = 0 права всегда читаются из базы"""
+        self.user.groups.add(self.group)
+        self.assertTrue(self.fresh_user().has_perm("blog.view_post"))
+        user = self.fresh_user()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(user.has_perm("blog.view_post"))
+        self.assertTrue(self.permission_queries(queries))
+
+    def test_superuser_demotion_invalidates(self):
+        """Тест: снятие статуса суперпользователя сразу отнимает его права"""
+        user = self.fresh_user()
+        user.is_superuser = True
+        user.save()
+        self.assertIn("account.delete_user", self.fresh_user().get_all_permissions())
+        self.assertTrue(self.fresh_user().has_perm("account.delete_user"))
+
+        user.is_superuser = False
+        user.save()
+        self.assertFalse(self.fresh_user().has_perm("account.delete_user"))
+        self.assertNotIn("account.delete_user", self.fresh_user().get_all_permissions())
+
+    def test_admin_pages_skip_permission_queries_on_warm_cache(self):
+        """Тест: страницы админки без запросов прав, пока права в кеше"""
+        self.user.groups.add(self.group)
+        self.client.force_login(self.user)
+        url = reverse("admin:blog_post_changelist")
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertTrue(self.permission_queries(queries))
+
+        for url in (url, reverse("admin:index")):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(url).status_code, 200)
+            self.assertEqual(self.permission_queries(queries), [])
@@ -0,0 +1,319 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+from core.metrics import counter
+from core.proxies import get_client_ip
+
+throttle_requests = counter(
+    "account_throttle_requests_total", "Запросы к account, пропущенные и отклоненные ограничителем"
+)
+throttle_store_full = counter(
+    "account_throttle_store_full_total", "Запросы, отклоненные из-за нехватки слотов в общей памяти ограничителя"
+)
+
+RATE_PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate):
+    """Разбирает частоту вида '10/m' в пару (лимит, окно в секундах)."""
+    limit, period = rate.split("/")
+    return int(limit), RATE_PERIODS[period[0]]
+
+
+class CacheCounterStore:
+    """
+    Счетчики окон в кеше Django.
+
+    Счетчики общие для воркеров, если общий сам кеш; атомарность
+    увеличения гарантирует только redis (INCR), поэтому для нескольких
+    процессов без redis используйте SharedMemoryCounterStore.
+    """
+
+    def __init__(self, cache_alias="default"):
+        self.cache_alias = cache_alias
+
+    def hit(self, windows):
+        """
+        Увеличивает счетчики всех окон и проверяет лимиты по новым значениям.
+
+        Решение принимается по значению, которое вернул incr(), а не по
+        прочитанному заранее, иначе параллельные запросы проходят проверку
+        все сразу. Если какое-то окно превышено, счетчики этого запроса
+        уменьшаются обратно.
+
+        Args:
+            windows (list): Кортежи (текущий ключ, предыдущий ключ,
+                вес предыдущего окна, лимит, TTL).
+
+        Returns:
+            int | None: Индекс первого превышенного окна или None.
+        """
+        cache = caches[self.cache_alias]
+        previous = cache.get_many([window[1] for window in windows])
+        blocked, counted = None, []
+        for index, (current_key, previous_key, previous_weight, limit, timeout) in enumerate(windows):
+            # add() атомарно создает счетчик, touch() возвращает ему TTL,
+            # который incr() в файловом кеше сбрасывает на значение по умолчанию.
+            cache.add(current_key, 0, timeout)
+            current = cache.incr(current_key)
+            cache.touch(current_key, timeout)
+            counted.append(current_key)
+            if current + previous.get(previous_key, 0) * previous_weight > limit:
+                blocked = index
+                break
+        if blocked is not None:
+            for current_key in counted:
+                try:
+                    cache.decr(current_key)
+                except ValueError:
+                    # Счетчик успел истечь - уменьшать нечего.
+                    pass
+        return blocked
+
+
+class SharedMemoryCounterStore:
+    """
+    Счетчики окон в файле, отображенном в память, общем для процессов хоста.
+
+    Файл - это хеш-таблица фиксированного размера с открытой адресацией:
+    слот хранит 8-байтовый хеш ключа, время истечения и значение счетчика.
+    Каждая проверка берет flock на файл, смотрит не больше PROBES слотов
+    и увеличивает счетчик, то есть выполняется за O(1). Истекшие слоты
+    переиспользуются; если свободных нет, вытесняется слот, который истекает
+    раньше всех, так что память ограничена размером таблицы. Если слота
+    не нашлось совсем (все просмотренные слоты заняты окнами того же
+    запроса), запрос отклоняется и учитывается в
+    account_throttle_store_full_total.
+
+    Args:
+        path (str): Путь к файлу (лучше в /dev/shm).
+        slots (int): Количество слотов в таблице.
+    """
+
+    SLOT = struct.Struct("<QdI4x")
+    PROBES = 16
+
+    def __init__(self, path, slots=65536):
+        self.path = path
+        self.slots = slots
+        self._pid = None
+        self._fd = None
+        self._map = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        # После fork() дескриптор и отображение открываются заново.
+        if self._pid != os.getpid():
+            size = self.SLOT.size * self.slots
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            self._fd, self._map, self._pid = fd, mmap.mmap(fd, size), os.getpid()
+        return self._map
+
+    @staticmethod
+    def _hash(key):
+        # Ноль зарезервирован под пустой слот.
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+
+    def _find(self, table, key_hash, now, taken=()):
+        """
+        Возвращает (смещение слота, текущее значение) для ключа.
+
+        Слоты из taken уже отданы другим окнам того же вызова и не
+        рассматриваются ни как свой слот, ни как свободный.
+        """
+        start = key_hash % self.slots
+        victim, victim_expires = None, None
+        for probe in range(self.PROBES):
+            offset = ((start + probe) % self.slots) * self.SLOT.size
+            if offset in taken:
+                continue
+            slot_hash, expires, count = self.SLOT.unpack_from(table, offset)
+            if slot_hash == key_hash and expires > now:
+                return offset, count
+            if victim is None or expires < victim_expires:
+                victim, victim_expires = offset, expires
+        return victim, 0
+
+    def hit(self, windows):
+        """Как CacheCounterStore.hit(), но под одной блокировкой файла."""
+        now = time.time()
+        with self._lock:
+            table = self._open()
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                updates, taken = [], set()
+                for index, (current_key, previous_key, previous_weight, limit, timeout) in enumerate(windows):
+                    current_hash = self._hash(current_key)
+                    _offset, previous = self._find(table, self._hash(previous_key), now)
+                    offset, current = self._find(table, current_hash, now, taken)
+                    if offset is None:
+                        # Все слоты окрестности заняты окнами этого же вызова:
+                        # счетчик негде вести, и запрос отклоняется, а не
+                        # пропускается без учета.
+                        throttle_store_full.inc()
+                        return index
+                    if current + previous * previous_weight >= limit:
+                        return index
+                    taken.add(offset)
+                    updates.append((offset, current_hash, current, timeout))
+                for offset, current_hash, current, timeout in updates:
+                    expires = now + timeout
+                    if current:
+                        _hash, expires, _count = self.SLOT.unpack_from(table, offset)
+                    self.SLOT.pack_into(table, offset, current_hash, expires, current + 1)
+                return None
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+
+class SlidingWindowLimiter:
+    """
+    Ограничитель частоты со скользящим окном.
+
+    Хранит по два счетчика на ключ: для текущего и предыдущего
+    фиксированного окна. Число запросов за последние window секунд
+    оценивается как текущий счетчик плюс часть предыдущего,
+    пропорциональная еще не прошедшей доле окна. Проверка и увеличение
+    счетчика выполняются хранилищем за O(1), счетчики истекают через
+    два окна.
+
+    Args:
+        scope (str): Имя группы ограничений, например 'login'.
+        limit (int): Допустимое число запросов за окно.
+        window (int): Длина окна в секундах.
+        store: Хранилище счетчиков (см. get_counter_store()).
+    """
+
+    def __init__(self, scope, limit, window, store=None):
+        self.scope = scope
+        self.limit = limit
+        self.window = window
+        self.store = store or get_counter_store()
+
+    def _key(self, ident, index):
+        digest = hashlib.md5(ident.encode(), usedforsecurity=False).hexdigest()
+        return f"throttle:{self.scope}:{digest}:{index}"
+
+    def counters(self, ident, now=None):
+        """Аргумент для store.hit(): ключи текущего и предыдущего окна, вес, лимит, TTL."""
+        now = time.time() if now is None else now
+        index, offset = divmod(now, self.window)
+        index = int(index)
+        return (
+            self._key(ident, index),
+            self._key(ident, index - 1),
+            1 - offset / self.window,
+            self.limit,
+            self.window * 2,
+        )
+
+    def hit(self, ident, now=None):
+        """
+        Учитывает запрос и сообщает, укладывается ли он в лимит.
+
+        Отклоненные запросы не увеличивают счетчик.
+
+        Returns:
+            bool: True, если запрос разрешен.
+        """
+        return self.store.hit([self.counters(ident, now)]) is None
+
+
+_stores = {}
+
+
+def get_counter_store():
+    """Хранилище счетчиков по settings.ACCOUNT_THROTTLE_STORE (одно на процесс)."""
+    kind = settings.ACCOUNT_THROTTLE_STORE
+    if kind not in _stores:
+        if kind == "shared":
+            _stores[kind] = SharedMemoryCounterStore(settings.ACCOUNT_THROTTLE_SHM_PATH)
+        else:
+            _stores[kind] = CacheCounterStore(settings.ACCOUNT_THROTTLE_CACHE)
+    return _stores[kind]
+
+
+def throttled_response(retry_after):
+    response = HttpResponse("Too many requests, try again later", status=429)
+    response["Retry-After"] = str(retry_after)
+    return response
+
+
+class ThrottleMixin:
+    """
+    Ограничивает частоту POST-запросов к представлению по IP и по email.
+
+    Проверка выполняется в dispatch(), до валидации формы и хеширования
+    пароля; у асинхронных представлений - в потоке, через sync_to_async.
+    Лимиты берутся из settings.ACCOUNT_THROTTLE_RATES[throttle_scope],
+    IP клиента - из core.proxies.get_client_ip().
+
+    Attributes:
+        throttle_scope (str): Ключ в ACCOUNT_THROTTLE_RATES.
+        throttle_email_field (str): Поле POST с email или логином.
+    """
+
+    throttle_scope = None
+    throttle_email_field = "email"
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method == "POST":
+            if self.view_is_async:
+                return self.async_dispatch(request, *args, **kwargs)
+            retry_after = self.check_throttle(request)
+            if retry_after is not None:
+                return throttled_response(retry_after)
+        return super().dispatch(request, *args, **kwargs)
+
+    async def async_dispatch(self, request, *args, **kwargs):
+        # Хранилище счетчиков блокирует поток (flock, сетевой кеш),
+        # поэтому проверка уходит из цикла событий в поток.
+        retry_after = await sync_to_async(self.check_throttle)(request)
+        if retry_after is not None:
+            return throttled_response(retry_after)
+        return await super().dispatch(request, *args, **kwargs)
+
+    def get_throttle_idents(self, request):
+        """Пары (вид ключа, значение), по которым считаются запросы."""
+        idents = [("ip", get_client_ip(request))]
+        email = request.POST.get(self.throttle_email_field, "").strip().lower()
+        if email:
+            idents.append(("email", email))
+        return idents
+
+    def check_throttle(self, request):
+        """
+        Возвращает Retry-After в секундах, если лимит превышен, иначе None.
+
+        Хранилище возвращает счетчики отклоненного запроса, так что запрос,
+        отклоненный по email, не расходует лимит IP, и наоборот.
+        """
+        rates = settings.ACCOUNT_THROTTLE_RATES.get(self.throttle_scope, {})
+        store = get_counter_store()
+        windows, counters = [], []
+        for kind, ident in self.get_throttle_idents(request):
+            rate = rates.get(kind)
+            if not rate:
+                continue
+            limit, window = parse_rate(rate)
+            limiter = SlidingWindowLimiter(f"{self.throttle_scope}:{kind}", limit, window, store)
+            windows.append(window)
+            counters.append(limiter.counters(ident))
+        blocked = store.hit(counters) if counters else None
+        if blocked is not None:
+            throttle_requests.inc(scope=self.throttle_scope, result="blocked")
+            return windows[blocked]
+        throttle_requests.inc(scope=self.throttle_scope, result="allowed")
+        return None
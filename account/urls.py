@@ -1,11 +1,28 @@
+from django.conf import settings
 from django.urls import path
-from .views import IndexPageView,  LoginView, RegisterView
+from .views import (
+    AsyncLoginView,
+    AsyncRegisterView,
+    AvatarView,
+    IndexPageView,
+    LoginView,
+    LogoutView,
+    RegisterView,
+)
 
 app_name = 'account'
 
+# Под ASGI регистрация и вход работают асинхронно
+if settings.ACCOUNT_ASYNC_VIEWS:
+    register_view, login_view = AsyncRegisterView, AsyncLoginView
+else:
+    register_view, login_view = RegisterView, LoginView
+
 urlpatterns = [
     path('', IndexPageView.as_view(), name='index'),
-    path('register/', RegisterView.as_view(), name='register'),
-    path('login/', LoginView, name='login'),
+    path('register/', register_view.as_view(), name='register'),
+    path('login/', login_view.as_view(), name='login'),
+    path('logout/', LogoutView.as_view(), name='logout'),
+    path('avatar/', AvatarView.as_view(), name='avatar'),
 
 ]
@@ -1,12 +1,24 @@
+from asgiref.sync import sync_to_async
 from django.views.generic.base import TemplateView
 from django.shortcuts import render, redirect
 from django.views import View
 from django.urls import reverse_lazy
-from django.contrib.auth import login
+from django.contrib.auth import REDIRECT_FIELD_NAME, alogin, login, logout
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth import views as auth_views
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.utils.http import url_has_allowed_host_and_scheme
 
-from .forms import CustomUserCreationForm
+from core.cache import AnonymousCacheMixin
 
-class IndexPageView(TemplateView):
+from .backends import EmailBackend
+from .forms import AvatarForm, CustomUserCreationForm, LoginForm
+from .hashing import HashingPoolBusy, hashing_pool
+from .names_cache import taken_names
+from .throttle import ThrottleMixin
+
+class IndexPageView(AnonymousCacheMixin, TemplateView):
     template_name = "account/index.html"
 
     def get_context_data(self, **kwargs):
@@ -15,7 +27,8 @@ class IndexPageView(TemplateView):
         return context
 
 
-class RegisterView(View):
+class RegisterView(ThrottleMixin, View):
+    throttle_scope = "register"
     template_name = "account/register.html"
     form_class = CustomUserCreationForm
     success_url = reverse_lazy("blog:index")
@@ -26,16 +39,191 @@ class RegisterView(View):
     
     def post(self, request):
         form = self.form_class(request.POST)
-        print(request.POST)
 
         if form.is_valid():
-            user = form.save()
+            try:
+                with transaction.atomic():
+                    user = form.save()
+            except IntegrityError:
+                # Имя успели занять между проверкой формы и INSERT.
+                form.add_error(None, "This email or username is busy")
+                return render(request, self.template_name, {"form": form})
             login(request, user)
             return redirect(self.success_url)
         else:
-            print(form.errors)
             return render(request, self.template_name, {"form": form})
 
-class LoginView():
-    pass
+class LoginView(ThrottleMixin, auth_views.LoginView):
+    """Вход по email (или username) и паролю через EmailBackend."""
+
+    throttle_scope = "login"
+    throttle_email_field = "username"
+    template_name = "account/login.html"
+    form_class = LoginForm
+    next_page = reverse_lazy("blog:index")
+
+
+class LogoutView(View):
+    """Выход из аккаунта с переходом на главную страницу."""
+
+    success_url = reverse_lazy("account:index")
+
+    def get(self, request):
+        logout(request)
+        return redirect(self.success_url)
+
+    def post(self, request):
+        return self.get(request)
+
+
+class AvatarView(LoginRequiredMixin, View):
+    """
+    Загрузка аватара текущего пользователя.
+
+    Файл приходит на диск по частям (TemporaryFileUploadHandler) и
+    переносится в MEDIA_ROOT без чтения в память; уменьшенные копии
+    строит фоновый пул, а не запрос.
+    """
+
+    template_name = "account/avatar.html"
+    form_class = AvatarForm
+    success_url = reverse_lazy("account:avatar")
+
+    def get(self, request):
+        return render(request, self.template_name, {"form": self.form_class(instance=request.user)})
+
+    def post(self, request):
+        form = self.form_class(request.POST, request.FILES, instance=request.user)
+        if not form.is_valid():
+            return render(request, self.template_name, {"form": form})
+        # request.user может быть взят из кеша get_user() и отставать от
+        # базы: записывается только аватар, чтобы не вернуть старые
+        # значения остальных полей (пароль, is_active, is_staff).
+        user = form.save(commit=False)
+        user.save(update_fields=["avatar"])
+        return redirect(self.success_url)
+
+
+def busy_response():
+    """Ответ при переполненном пуле хеширования."""
+    response = HttpResponse("Server is busy, try again later", status=503)
+    response["Retry-After"] = "1"
+    return response
+
+
+class AsyncRegisterView(ThrottleMixin, View):
+    """
+    Асинхронная регистрация.
+
+    Проверка формы выполняется через sync_to_async, пароль хешируется
+    в ограниченном пуле hashing_pool, пользователь сохраняется через
+    асинхронный ORM. Поток воркера не блокируется на время PBKDF2.
+    """
+
+    throttle_scope = "register"
+    template_name = "account/register.html"
+    form_class = CustomUserCreationForm
+    success_url = reverse_lazy("blog:index")
+
+    async def get(self, request):
+        form = self.form_class()
+        return await sync_to_async(render)(request, self.template_name, {"form": form})
+
+    async def post(self, request):
+        form = self.form_class(request.POST)
+        if not await sync_to_async(form.is_valid)():
+            return await sync_to_async(render)(request, self.template_name, {"form": form})
+
+        # construct_instance() уже перенес email и username в form.instance.
+        user = form.instance
+        try:
+            user.password = await hashing_pool.make_password(form.cleaned_data["password1"])
+        except HashingPoolBusy:
+            return busy_response()
+        try:
+            await sync_to_async(self.save_user)(user)
+        except IntegrityError:
+            form.add_error(None, "This email or username is busy")
+            return await sync_to_async(render)(request, self.template_name, {"form": form})
+        taken_names.add(("email", user.email))
+        taken_names.add(("username", user.username))
+
+        await alogin(request, user)
+        return redirect(self.success_url)
+
+    @staticmethod
+    def save_user(user):
+        """
+        Сохраняет пользователя в одной транзакции с задачами регистрации,
+        которые ставит post_save, как RegisterView.
+        """
+        with transaction.atomic():
+            user.save()
+
+
+class AsyncLoginView(ThrottleMixin, View):
+    """
+    Асинхронный вход по email и паролю.
+
+    Пользователь ищется тем же запросом, что и в EmailBackend, но через
+    асинхронный ORM; пароль проверяется в пуле hashing_pool. Если хеш
+    устарел, он пересчитывается и сохраняется там же. После входа, как
+    и LoginView, переходит по безопасному адресу из параметра next.
+    """
+
+    throttle_scope = "login"
+    throttle_email_field = "username"
+    template_name = "account/login.html"
+    form_class = LoginForm
+    success_url = reverse_lazy("blog:index")
+    redirect_field_name = REDIRECT_FIELD_NAME
+
+    async def get(self, request):
+        form = self.form_class(request)
+        return await sync_to_async(render)(request, self.template_name, {"form": form})
+
+    async def post(self, request):
+        try:
+            user = await self.authenticate(
+                request.POST.get("username", ""), request.POST.get("password", "")
+            )
+        except HashingPoolBusy:
+            return busy_response()
+
+        form = self.form_class(
+            request, data=request.POST, authenticated_user=user, preauthenticated=True
+        )
+        if not form.is_valid():
+            return await sync_to_async(render)(request, self.template_name, {"form": form})
+        await alogin(request, form.get_user(), backend="account.backends.EmailBackend")
+        return redirect(self.get_success_url(request))
+
+    def get_success_url(self, request):
+        """Адрес из next (POST или GET), если он ведет на этот сайт, иначе success_url."""
+        url = request.POST.get(self.redirect_field_name, request.GET.get(self.redirect_field_name))
+        if url and url_has_allowed_host_and_scheme(
+            url, allowed_hosts={request.get_host()}, require_https=request.is_secure()
+        ):
+            return url
+        return self.success_url
+
+    async def authenticate(self, identifier, password):
+        """
+        Возвращает активного пользователя с таким email (или username)
+        и паролем или None.
+        """
+        if not identifier or not password:
+            return None
+        user = await EmailBackend().login_queryset(identifier).afirst()
+        if user is None:
+            # Хешируем впустую, чтобы время ответа не выдавало наличие email.
+            await hashing_pool.make_password(password)
+            return None
+        is_correct, must_update = await hashing_pool.verify_password(password, user.password)
+        if not is_correct or not user.is_active:
+            return None
+        if must_update:
+            user.password = await hashing_pool.make_password(password)
+            await user.asave(update_fields=["password"])
+        return user
 
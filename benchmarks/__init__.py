@@ -0,0 +1,8 @@
+"""
+Бенчмарки проекта.
+
+Каждый модуль запускается отдельно из корня репозитория, например:
+    python -m benchmarks.bench_import_users --rows 5000
+
+Бенчмарки работают на временной тестовой базе и не трогают db.sqlite3.
+"""
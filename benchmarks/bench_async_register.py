@@ -0,0 +1,88 @@
+"""
+Задержка регистрации при параллельных запросах: синхронное
+представление под WSGI против асинхронного под ASGI.
+
+Запуск:
+    python -m benchmarks.bench_async_register --concurrency 50 --concurrency 200
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.utils import percentile, setup_django, test_database
+
+_ids = itertools.count()
+
+
+def signup_data():
+    n = next(_ids)
+    return {
+        "email": f"user{n}@example.com",
+        "username": f"user{n}",
+        "password1": "ComplexPass123!",
+        "password2": "ComplexPass123!",
+    }
+
+
+def run_sync(concurrency):
+    from django.test import Client
+
+    def signup(_):
+        started = time.perf_counter()
+        response = Client().post("/register/", signup_data())
+        return time.perf_counter() - started, response.status_code
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(signup, range(concurrency)))
+
+
+async def run_async(concurrency):
+    from django.test import AsyncClient
+
+    async def signup():
+        started = time.perf_counter()
+        response = await AsyncClient().post("/register/", signup_data())
+        return time.perf_counter() - started, response.status_code
+
+    return await asyncio.gather(*(signup() for _ in range(concurrency)))
+
+
+def report(name, concurrency, results):
+    latencies = [seconds * 1000 for seconds, _status in results]
+    rejected = sum(1 for _seconds, status in results if status == 503)
+    errors = sum(1 for _seconds, status in results if status not in (302, 503))
+    print(
+        f"{name:<6} c={concurrency:<4} p50={percentile(latencies, 50):8.1f} ms"
+        f"  p99={percentile(latencies, 99):8.1f} ms  rejected={rejected}  errors={errors}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, action="append")
+    parser.add_argument(
+        "--max-pending",
+        type=int,
+        default=None,
+        help="Размер очереди пула хеширования (по умолчанию из настроек)",
+    )
+    args = parser.parse_args()
+    levels = args.concurrency or [50, 200]
+
+    if args.max_pending:
+        os.environ["ACCOUNT_HASHING_MAX_PENDING"] = str(args.max_pending)
+    setup_django()
+    from django.test.utils import override_settings
+
+    with test_database(file_backed=True):
+        for concurrency in levels:
+            report("sync", concurrency, run_sync(concurrency))
+            with override_settings(ROOT_URLCONF="benchmarks.urls_async"):
+                report("async", concurrency, asyncio.run(run_async(concurrency)))
+
+
+if __name__ == "__main__":
+    main()
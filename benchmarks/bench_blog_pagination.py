@@ -0,0 +1,98 @@
+"""
+Время ответа ленты блога на разной глубине архива: keyset-пагинация
+BlogIndexView против OFFSET.
+
+Во временную базу записывается --posts опубликованных записей, затем
+для каждой страницы из --page замеряется медиана --repeat запросов.
+
+Запуск:
+    python -m benchmarks.bench_blog_pagination --posts 1000000 --page 1 --page 100 --page 10000
+"""
+import argparse
+import statistics
+from datetime import timedelta
+
+from benchmarks.utils import setup_django, test_database, timer
+
+
+def seed(posts, batch_size=10000):
+    from django.contrib.auth import get_user_model
+    from django.db import transaction
+    from django.utils import timezone
+
+    from blog.models import Post
+
+    authors = [
+        get_user_model().objects.create_user(email=f"author{n}@example.com", username=f"author{n}")
+        for n in range(10)
+    ]
+    start = timezone.now()
+    with timer() as elapsed:
+        for offset in range(0, posts, batch_size):
+            with transaction.atomic():
+                Post.objects.bulk_create(
+                    Post(
+                        author=authors[n % len(authors)],
+                        title=f"Post {n}",
+                        body="text",
+                        is_published=True,
+                        # По несколько записей в секунду: проверяются и одинаковые даты.
+                        published_at=start - timedelta(seconds=n // 3),
+                    )
+                    for n in range(offset, min(offset + batch_size, posts))
+                )
+    print(f"seeded {posts} posts in {elapsed.seconds:.1f} s")
+
+
+def median_ms(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        with timer() as elapsed:
+            func()
+        samples.append(elapsed.seconds * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--posts", type=int, default=1_000_000)
+    parser.add_argument("--page", type=int, action="append")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    pages = args.page or [1, 10, 100, 1000, 10000]
+
+    setup_django()
+    from django.test import Client
+    from django.test.utils import override_settings
+    from django.urls import reverse
+
+    from blog.views import BlogIndexView
+    from core.pagination import KeysetPaginator
+
+    with test_database(file_backed=True), override_settings(VIEW_CACHE_TIMEOUT=0):
+        seed(args.posts)
+        client = Client()
+        url = reverse("blog:index")
+        queryset = BlogIndexView().get_queryset().order_by("-published_at", "-id")
+        per_page = BlogIndexView.paginate_by
+        paginator = KeysetPaginator(queryset, per_page, "published_at")
+
+        for page in pages:
+            offset = (page - 1) * per_page
+            if offset >= args.posts:
+                continue
+            cursor = None
+            if offset:
+                # Курсор страницы берется по последней записи предыдущей страницы.
+                cursor = paginator.encode_cursor(queryset[offset - 1], "next")
+            keyset = median_ms(lambda: client.get(url, {"cursor": cursor} if cursor else {}), args.repeat)
+            offset_ms = median_ms(lambda: list(queryset[offset:offset + per_page]), args.repeat)
+            keyset_query = median_ms(lambda: list(paginator.page(cursor)), args.repeat)
+            print(
+                f"page {page:>6}: view (keyset) {keyset:7.2f} ms"
+                f"  query keyset {keyset_query:7.2f} ms  query OFFSET {offset_ms:7.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
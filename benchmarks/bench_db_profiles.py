@@ -0,0 +1,104 @@
+"""
+Параллельные регистрации через RegisterView для разных профилей базы
+(DB_PROFILE): число записей в секунду и ошибки ожидания блокировки.
+
+Каждый профиль запускается в отдельном процессе, так как DATABASES
+читаются при загрузке настроек. Внутри профиля создается временная
+база (для SQLite - файл), затем --workers процессов одновременно
+регистрируют по --signups пользователей.
+
+Запуск:
+    python -m benchmarks.bench_db_profiles --profile sqlite --profile sqlite-wal
+    DB_PROFILE=postgres POSTGRES_HOST=... python -m benchmarks.bench_db_profiles --profile postgres
+"""
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.utils import setup_django, test_database
+
+MD5_HASHER = "django.contrib.auth.hashers.MD5PasswordHasher"
+
+
+def signup_worker(args):
+    """Регистрирует пользователей одного воркера; возвращает счетчики."""
+    worker, signups = args
+    from django.db import OperationalError, connections
+    from django.test import Client
+    from django.test.utils import override_settings
+
+    created = locked = failed = 0
+    with override_settings(ACCOUNT_THROTTLE_RATES={}, PASSWORD_HASHERS=[MD5_HASHER]):
+        client = Client()
+        for n in range(signups):
+            data = {
+                "email": f"w{worker}u{n}@example.com",
+                "username": f"w{worker}u{n}",
+                "password1": "ComplexPass123!",
+                "password2": "ComplexPass123!",
+            }
+            try:
+                response = client.post("/register/", data)
+            except OperationalError as exc:
+                if "locked" not in str(exc):
+                    raise
+                locked += 1
+                continue
+            finally:
+                client.cookies.clear()
+            if response.status_code == 302:
+                created += 1
+            else:
+                failed += 1
+    connections.close_all()
+    return created, locked, failed
+
+
+def run_profile(workers, signups):
+    """Выполняется в дочернем процессе с уже выставленным DB_PROFILE."""
+    setup_django()
+    from django.db import connections
+
+    with test_database(file_backed=True) as connection:
+        # Дочерние процессы открывают свои соединения к той же базе.
+        connections.close_all()
+        started = time.perf_counter()
+        with multiprocessing.get_context("fork").Pool(workers) as pool:
+            results = pool.map(signup_worker, [(worker, signups) for worker in range(workers)])
+        seconds = time.perf_counter() - started
+        created, locked, failed = (sum(column) for column in zip(*results))
+        print(
+            f"{os.environ['DB_PROFILE']:<11} {connection.vendor:<10} workers={workers:<3}"
+            f" writes/s={created / seconds:8.1f}  created={created}"
+            f"  lock_errors={locked}  other_errors={failed}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--profile", action="append", choices=["sqlite", "sqlite-wal", "postgres"])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--signups", type=int, default=100, help="Регистраций на воркер")
+    parser.add_argument("--run-profile", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_profile:
+        run_profile(args.workers, args.signups)
+        return
+
+    for profile in args.profile or ["sqlite", "sqlite-wal"]:
+        subprocess.run(
+            [
+                sys.executable, "-m", "benchmarks.bench_db_profiles", "--run-profile",
+                "--workers", str(args.workers), "--signups", str(args.signups),
+            ],
+            env={**os.environ, "DB_PROFILE": profile},
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Страницы блога для вошедших пользователей: без кеша фрагментов и с ним.
+
+Кеш страниц для них не работает, поэтому каждая страница рисуется
+заново; кешируются только общие части - шапка пользователя и боковая
+колонка. Во время прогона часть пользователей меняет профиль, а автор
+публикует записи, чтобы попадания считались с честным сбросом. В конце
+выводится доля попаданий по фрагментам.
+
+Запуск:
+    python -m benchmarks.bench_fragments --requests 2000 --users 20
+"""
+import argparse
+import random
+
+from benchmarks.utils import setup_django, test_database, timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--writes", type=float, default=0.01, help="Доля запросов, перед которыми меняются данные")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.core.cache import cache
+    from django.test import Client
+    from django.test.utils import override_settings
+    from django.urls import reverse
+
+    from blog.models import Post
+    from core.fragments import fragment_cache_hits, fragment_cache_misses, hit_rates
+
+    with test_database():
+        User = get_user_model()
+        users = [
+            User.objects.create_user(email=f"user{n}@example.com", username=f"user{n}", password="x")
+            for n in range(args.users)
+        ]
+        for n in range(50):
+            Post.objects.create(author=users[0], title=f"Post {n}", body="text " * 200, is_published=True)
+        posts = list(Post.objects.values_list("pk", flat=True))
+        clients = []
+        for user in users:
+            client = Client()
+            client.force_login(user)
+            clients.append(client)
+        urls = [reverse("blog:index")] + [reverse("blog:post", args=[pk]) for pk in posts]
+
+        for label, timeout in (("no fragment cache", 0), ("fragment cache", 600)):
+            cache.clear()
+            fragment_cache_hits.reset()
+            fragment_cache_misses.reset()
+            rng = random.Random(22)
+            with override_settings(FRAGMENT_CACHE_TIMEOUT=timeout), timer() as t:
+                for n in range(args.requests):
+                    if rng.random() < args.writes:
+                        if rng.random() < 0.5:
+                            rng.choice(users).save()
+                        else:
+                            Post.objects.create(author=users[0], title=f"New {n}", body="text", is_published=True)
+                    response = rng.choice(clients).get(rng.choice(urls))
+                    assert response.status_code == 200, response.status_code
+            rates = ", ".join(
+                f"{name} {rate:.0%} ({hits}/{hits + misses})" for name, (hits, misses, rate) in sorted(hit_rates().items())
+            )
+            print(f"{label:<18} {args.requests / t.seconds:7.1f} req/s  {rates or '-'}")
+
+
+if __name__ == "__main__":
+    main()
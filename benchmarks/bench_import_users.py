@@ -0,0 +1,62 @@
+"""
+Сравнение массового импорта пользователей с поштучным create_user.
+
+Запуск:
+    python -m benchmarks.bench_import_users --rows 2000 --workers 4
+"""
+import argparse
+
+from benchmarks.utils import setup_django, test_database, timer
+
+
+def make_rows(count, prefix):
+    for i in range(count):
+        yield {
+            "email": f"{prefix}{i}@Example.COM",
+            "username": f"{prefix}{i}",
+            "password": f"secret-{i}",
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--md5",
+        action="store_true",
+        help="Хешировать MD5, чтобы замерить только путь записи в базу",
+    )
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.test.utils import override_settings
+
+    hashers = override_settings(
+        PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"]
+    ) if args.md5 else override_settings()
+
+    User = get_user_model()
+    with test_database(), hashers:
+        with timer() as single:
+            for row in make_rows(args.rows, "single"):
+                User.objects.create_user(**row)
+
+        with timer() as bulk:
+            result = User.objects.bulk_create_users(
+                make_rows(args.rows, "bulk"),
+                batch_size=args.batch_size,
+                workers=args.workers,
+            )
+
+    single_rate = args.rows / single.seconds
+    bulk_rate = result.created / bulk.seconds
+    print(f"create_user:       {args.rows} rows in {single.seconds:.2f}s ({single_rate:.0f} rows/sec)")
+    print(f"bulk_create_users: {result.created} rows in {bulk.seconds:.2f}s ({bulk_rate:.0f} rows/sec)")
+    print(f"speedup: x{bulk_rate / single_rate:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Скорость входа для разных хешеров и накладные расходы аутентификации
+на запрос с кешем get_user() и без него.
+
+Запуск:
+    python -m benchmarks.bench_login --logins 10 --requests 500
+"""
+import argparse
+
+from benchmarks.utils import setup_django, test_database, timer
+
+HASHERS = {
+    "pbkdf2 (Django default, 1M)": ["django.contrib.auth.hashers.PBKDF2PasswordHasher"],
+    "pbkdf2 (tuned)": ["account.hashers.TunedPBKDF2PasswordHasher"],
+    "scrypt": ["django.contrib.auth.hashers.ScryptPasswordHasher"],
+}
+
+
+def bench_logins(count):
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+    from django.test.utils import override_settings
+
+    User = get_user_model()
+    for name, hashers in HASHERS.items():
+        with override_settings(PASSWORD_HASHERS=hashers):
+            User.objects.all().delete()
+            User.objects.create_user(email="bench@example.com", username="bench", password="ComplexPass123!")
+            client = Client()
+            with timer() as t:
+                for _ in range(count):
+                    response = client.post("/login/", {"username": "bench@example.com", "password": "ComplexPass123!"})
+                    assert response.status_code == 302, response.status_code
+        print(f"login  {name:<28} {count / t.seconds:6.1f} logins/sec")
+
+
+def bench_auth_overhead(count):
+    from django.contrib.auth import get_user_model
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext, override_settings
+
+    User = get_user_model()
+    with override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"]):
+        user = User.objects.create_user(email="auth@example.com", username="auth", password="x")
+    client = Client()
+    client.force_login(user)
+
+    for name, clear in (("without user cache", True), ("with user cache", False)):
+        with CaptureQueriesContext(connection) as queries, timer() as t:
+            for _ in range(count):
+                if clear:
+                    cache.clear()
+                response = client.get("/register/")
+                assert response.wsgi_request.user.is_authenticated
+        print(
+            f"auth   {name:<28} {t.seconds / count * 1000:6.2f} ms/request"
+            f"  {len(queries) / count:.1f} queries/request"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        bench_logins(args.logins)
+        bench_auth_overhead(args.requests)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Проверки прав на страницах админки: без кеша прав и с ним.
+
+Сотрудник без прав суперпользователя состоит в --groups группах с
+правами на модели блога и открывает список записей, список тегов и
+главную страницу админки. Для каждого режима выводятся запросы к
+таблицам прав на страницу и пропускная способность.
+
+Запуск:
+    python -m benchmarks.bench_permissions --requests 300
+"""
+import argparse
+
+from benchmarks.utils import setup_django, test_database, timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--groups", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.models import Group, Permission
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext, override_settings
+
+    with test_database():
+        user = get_user_model().objects.create_user(
+            email="editor@example.com", username="editor", password="x", is_staff=True
+        )
+        perms = list(Permission.objects.filter(content_type__app_label="blog"))
+        for n in range(args.groups):
+            group = Group.objects.create(name=f"group {n}")
+            group.permissions.set(perms[n::args.groups])
+            user.groups.add(group)
+        client = Client()
+        client.force_login(user)
+        urls = ["/admin/", "/admin/blog/post/", "/admin/blog/tag/"]
+
+        for label, timeout in (("no permission cache", 0), ("permission cache", 300)):
+            cache.clear()
+            with override_settings(AUTH_PERMISSIONS_CACHE_TIMEOUT=timeout):
+                for url in urls:
+                    client.get(url)
+                with CaptureQueriesContext(connection) as queries, timer() as t:
+                    for n in range(args.requests):
+                        response = client.get(urls[n % len(urls)])
+                        assert response.status_code == 200, response.status_code
+            perm_queries = sum("auth_permission" in q["sql"] for q in queries.captured_queries)
+            print(
+                f"{label:<20} {perm_queries / args.requests:5.2f} permission q/req"
+                f"  {len(queries) / args.requests:5.2f} q/req  {args.requests / t.seconds:7.1f} req/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Задержка поиска по записям блога: полнотекстовый индекс текущей базы
+(FTS5 / tsvector) против LIKE-поиска через icontains.
+
+Во временную базу записывается --posts записей со случайным текстом из
+словаря с распределением Ципфа (частые и редкие слова), индекс строится
+командой rebuild_search_index, затем для каждого запроса замеряется
+медиана --repeat поисков первой страницы.
+
+Запуск:
+    python -m benchmarks.bench_search --posts 1000000
+"""
+import argparse
+import itertools
+import random
+import statistics
+from io import StringIO
+
+from benchmarks.utils import setup_django, test_database, timer
+
+VOCABULARY = [f"word{n}" for n in range(20000)]
+CUM_WEIGHTS = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(VOCABULARY))))
+
+
+def seed(posts, words_per_post=40, batch_size=5000):
+    from django.contrib.auth import get_user_model
+    from django.db import transaction
+    from django.utils import timezone
+
+    from blog.models import Post
+
+    rng = random.Random(42)
+    author = get_user_model().objects.create_user(email="author@example.com", username="author")
+    now = timezone.now()
+    with timer() as elapsed:
+        for offset in range(0, posts, batch_size):
+            with transaction.atomic():
+                bodies = [
+                    " ".join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=words_per_post))
+                    for _ in range(offset, min(offset + batch_size, posts))
+                ]
+                # Текст из одних слов: Markdown не меняет его, и поисковый
+                # текст совпадает с исходником без рендеринга.
+                Post.objects.bulk_create(
+                    Post(
+                        author=author,
+                        title=" ".join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=5)),
+                        body=body,
+                        body_text=body,
+                        is_published=True,
+                        published_at=now,
+                    )
+                    for body in bodies
+                )
+    print(f"seeded {posts} posts in {elapsed.seconds:.1f} s")
+
+
+def median_ms(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        with timer() as elapsed:
+            func()
+        samples.append(elapsed.seconds * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--posts", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--query",
+        action="append",
+        help="Запрос для замера (по умолчанию частое, среднее, редкое, отсутствующее слово и пара слов)",
+    )
+    args = parser.parse_args()
+    queries = args.query or ["word1", "word300", "word15000", "word2 word40", "missing"]
+
+    setup_django()
+    from django.core.management import call_command
+
+    from blog.search import LikeSearchBackend, get_search_backend
+
+    with test_database(file_backed=True):
+        seed(args.posts)
+        with timer() as elapsed:
+            call_command("rebuild_search_index", "--chunk-size", "2000", stdout=StringIO())
+        print(f"rebuild_search_index: {elapsed.seconds:.1f} s")
+
+        indexed, like = get_search_backend(), LikeSearchBackend()
+        print(f"backend: {type(indexed).__name__}")
+        for query in queries:
+            found = len(indexed.search(query))
+            indexed_ms = median_ms(lambda: indexed.search(query), args.repeat)
+            like_ms = median_ms(lambda: like.search(query), args.repeat)
+            print(
+                f"{query!r:<16} results={found:<3} index {indexed_ms:9.2f} ms"
+                f"  LIKE {like_ms:9.2f} ms  x{like_ms / indexed_ms:7.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Хранилища сессий (SESSION_ENGINE): SQL-запросы на запрос и пропускная
+способность для авторизованных просмотров страницы и для регистраций.
+
+Для каждого хранилища --users пользователей входят в систему, затем
+каждый делает --views просмотров --url; регистрация создает сессию
+через login(). Запросы проходят через весь стек middleware.
+
+Запуск:
+    python -m benchmarks.bench_sessions --users 50 --views 40
+"""
+import argparse
+
+from benchmarks.utils import setup_django, test_database, timer
+
+ENGINES = {
+    "db": "django.contrib.sessions.backends.db",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}
+MD5_HASHER = "django.contrib.auth.hashers.MD5PasswordHasher"
+
+
+def page_views(users, url, views):
+    """Возвращает (запросов к базе на просмотр, просмотров в секунду)."""
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    clients = []
+    for user in users:
+        client = Client()
+        client.force_login(user)
+        client.get(url)  # прогрев кеша сессии и пользователя
+        clients.append(client)
+
+    with CaptureQueriesContext(connection) as queries, timer() as t:
+        for _ in range(views):
+            for client in clients:
+                response = client.get(url)
+                assert response.status_code == 200, response.status_code
+    total = views * len(clients)
+    return len(queries) / total, total / t.seconds
+
+
+def signups(prefix, count):
+    """Возвращает (запросов к базе на регистрацию, регистраций в секунду)."""
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    client = Client()
+    with CaptureQueriesContext(connection) as queries, timer() as t:
+        for n in range(count):
+            response = client.post("/register/", {
+                "email": f"{prefix}{n}@example.com",
+                "username": f"{prefix}{n}",
+                "password1": "ComplexPass123!",
+                "password2": "ComplexPass123!",
+            })
+            assert response.status_code == 302, response.status_code
+            client.cookies.clear()
+    return len(queries) / count, count / t.seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--engine", action="append", choices=list(ENGINES))
+    parser.add_argument("--url", default="/avatar/")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--views", type=int, default=40, help="Просмотров на пользователя")
+    parser.add_argument("--signups", type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.core.cache import cache
+    from django.test.utils import override_settings
+
+    with test_database(), override_settings(ACCOUNT_THROTTLE_RATES={}, PASSWORD_HASHERS=[MD5_HASHER]):
+        users = [
+            get_user_model().objects.create_user(
+                email=f"user{n}@example.com", username=f"user{n}", password="ComplexPass123!"
+            )
+            for n in range(args.users)
+        ]
+        print(f"{'engine':<15} {'views q/req':>11} {'views/s':>9} {'signup q/req':>13} {'signups/s':>10}")
+        for name in args.engine or list(ENGINES):
+            cache.clear()
+            with override_settings(SESSION_ENGINE=ENGINES[name]):
+                view_queries, view_rate = page_views(users, args.url, args.views)
+                signup_queries, signup_rate = signups(name, args.signups)
+            print(f"{name:<15} {view_queries:>11.2f} {view_rate:>9.0f} {signup_queries:>13.2f} {signup_rate:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
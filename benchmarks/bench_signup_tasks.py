@@ -0,0 +1,80 @@
+"""
+Время ответа регистрации, когда побочные эффекты медленные: письмо
+отправляется через SMTP с задержкой --smtp-delay.
+
+Сравниваются выполнение задач прямо в запросе (TASKS_EAGER) и постановка
+в очередь core_task; во втором случае письма отправляет run_worker.
+
+Запуск:
+    python -m benchmarks.bench_signup_tasks --signups 50 --smtp-delay 0.2
+"""
+import argparse
+import statistics
+import time
+
+from django.core.mail.backends.locmem import EmailBackend
+
+from benchmarks.utils import percentile, setup_django, test_database, timer
+
+MD5_HASHER = "django.contrib.auth.hashers.MD5PasswordHasher"
+SMTP_DELAY = 0.2
+
+
+class SlowEmailBackend(EmailBackend):
+    """Почта с задержкой сетевого SMTP."""
+
+    def send_messages(self, messages):
+        time.sleep(SMTP_DELAY)
+        return super().send_messages(messages)
+
+
+def signup_latencies(prefix, count):
+    from django.test import Client
+
+    client = Client()
+    latencies = []
+    for n in range(count):
+        with timer() as t:
+            response = client.post("/register/", {
+                "email": f"{prefix}{n}@example.com",
+                "username": f"{prefix}{n}",
+                "password1": "ComplexPass123!",
+                "password2": "ComplexPass123!",
+            })
+        assert response.status_code == 302, response.status_code
+        client.cookies.clear()
+        latencies.append(t.seconds * 1000)
+    return latencies
+
+
+def main():
+    global SMTP_DELAY
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--signups", type=int, default=50)
+    parser.add_argument("--smtp-delay", type=float, default=0.2)
+    args = parser.parse_args()
+    SMTP_DELAY = args.smtp_delay
+
+    setup_django()
+    from django.core.management import call_command
+    from django.test.utils import override_settings
+
+    with test_database(), override_settings(
+        ACCOUNT_THROTTLE_RATES={},
+        PASSWORD_HASHERS=[MD5_HASHER],
+        EMAIL_BACKEND="benchmarks.bench_signup_tasks.SlowEmailBackend",
+    ):
+        for mode, eager in (("inline", True), ("queued", False)):
+            with override_settings(TASKS_EAGER=eager):
+                latencies = signup_latencies(mode, args.signups)
+            print(
+                f"{mode:<7} signup p50={statistics.median(latencies):7.1f} ms"
+                f"  p95={percentile(latencies, 95):7.1f} ms"
+            )
+        with timer() as t:
+            call_command("run_worker", "--once", "--concurrency", "1", verbosity=0)
+        print(f"run_worker drained the queue in {t.seconds:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
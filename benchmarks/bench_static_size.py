@@ -0,0 +1,138 @@
+"""
+Отчет о суммарном объеме статики на страницу до и после сборки.
+
+Учитываются CSS и картинки из HTML, картинки из CSS и шрифты тех
+семейств, которые реально используются в правилах (браузер скачивает
+только первый поддерживаемый источник из src). После сборки берется
+размер .br-копии, если она есть.
+
+Запуск:
+    python -m benchmarks.bench_static_size --url / --url /register/
+"""
+import argparse
+import os
+import posixpath
+import re
+import tempfile
+
+from benchmarks.utils import setup_django, test_database
+
+LINK_RE = re.compile(r"""(?:href|src)="([^"]+)\"""")
+FONT_FACE_RE = re.compile(r"@font-face\s*{([^}]*)}", re.S)
+FAMILY_RE = re.compile(r"font-family\s*:\s*([^;}]+)")
+URL_RE = re.compile(r"""url\(\s*['"]?([^'")]+)['"]?\s*\)""")
+
+
+def page_assets(html, static_url, built):
+    """Возвращает пути статических файлов, которые загрузит страница."""
+
+    def read(name):
+        with open(asset_path(name, built), encoding="utf-8") as f:
+            return f.read()
+
+    names = [
+        url[len(static_url):] for url in LINK_RE.findall(html) if url.startswith(static_url)
+    ]
+    stylesheets = [read(name) for name in names if name.endswith(".css")]
+    used_families = {
+        family.strip().strip("'\"")
+        for css in stylesheets
+        for declaration in FAMILY_RE.findall(FONT_FACE_RE.sub("", css))
+        for family in declaration.split(",")
+    }
+
+    assets = list(names)
+    for name, css in zip([n for n in names if n.endswith(".css")], stylesheets):
+        base = posixpath.dirname(name)
+        for face in FONT_FACE_RE.findall(css):
+            family = FAMILY_RE.search(face).group(1).strip().strip("'\"")
+            urls = URL_RE.findall(face)
+            if family in used_families and urls:
+                assets.append(posixpath.normpath(posixpath.join(base, urls[0])))
+        for ref in URL_RE.findall(FONT_FACE_RE.sub("", css)):
+            if not ref.startswith(("data:", "http", "/")):
+                assets.append(posixpath.normpath(posixpath.join(base, ref)))
+    return list(dict.fromkeys(assets))
+
+
+def asset_path(name, built):
+    from django.contrib.staticfiles import finders
+    from django.contrib.staticfiles.storage import staticfiles_storage
+
+    if not built:
+        return finders.find(name)
+    try:
+        name = staticfiles_storage.stored_name(name)
+    except ValueError:
+        pass  # имя уже хешировано
+    return staticfiles_storage.path(name)
+
+
+def size(name, built):
+    path = asset_path(name, built)
+    if built and os.path.exists(path + ".br"):
+        path += ".br"
+    return os.path.getsize(path)
+
+
+def totals(assets, built):
+    """Суммирует размеры по типам файлов."""
+    result = dict.fromkeys(("css", "font", "image", "total"), 0)
+    # Хешированное и исходное имя могут указывать на один файл.
+    unique = {asset_path(name, built): name for name in assets}
+    for name in unique.values():
+        if name.endswith(".css"):
+            kind = "css"
+        elif name.endswith((".ttf", ".woff2", ".woff", ".otf")):
+            kind = "font"
+        else:
+            kind = "image"
+        value = size(name, built)
+        result[kind] += value
+        result["total"] += value
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", action="append", default=None)
+    args = parser.parse_args()
+    urls = args.url or ["/", "/register/"]
+
+    setup_django()
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.test import Client
+    from django.test.utils import override_settings
+
+    storages = dict(settings.STORAGES, staticfiles={
+        "BACKEND": "core.storage.OptimizedManifestStaticFilesStorage",
+    })
+    with test_database(), tempfile.TemporaryDirectory() as static_root:
+        report = {}
+        with override_settings(STATIC_PIPELINE=False, VIEW_CACHE_TIMEOUT=0):
+            for url in urls:
+                html = Client().get(url).content.decode()
+                assets = page_assets(html, settings.STATIC_URL, built=False)
+                report[url] = [totals(assets, False), None]
+
+        with override_settings(
+            STATIC_PIPELINE=True, STATIC_ROOT=static_root, STORAGES=storages, VIEW_CACHE_TIMEOUT=0
+        ):
+            call_command("collectstatic", interactive=False, verbosity=0)
+            for url in urls:
+                html = Client().get(url).content.decode()
+                assets = page_assets(html, settings.STATIC_URL, built=True)
+                report[url][1] = totals(assets, True)
+
+    for url, (before, after) in report.items():
+        print(url)
+        for kind in ("css", "font", "image", "total"):
+            print(
+                f"  {kind:<6} before: {before[kind] / 1024:8.1f} KB"
+                f"  after: {after[kind] / 1024:8.1f} KB"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Страницы тегов и облако тегов: денормализованные связи и счетчики против
+JOIN и GROUP BY по связям на каждый запрос.
+
+Во временную базу записывается --posts записей и --links связей с
+--tags тегами. Популярность тегов неравномерна: у первых тегов тысячи
+записей, у последних - единицы. Для каждого замера берется медиана
+--repeat запросов.
+
+Запуск:
+    python -m benchmarks.bench_tags --posts 1000000 --links 100000
+"""
+import argparse
+import random
+from io import StringIO
+
+from benchmarks.bench_blog_pagination import median_ms, seed
+from benchmarks.utils import setup_django, test_database, timer
+
+
+def seed_tags(tags, links, batch_size=10000):
+    from django.db import transaction
+
+    from blog.models import Post, PostTag, Tag
+
+    rng = random.Random(21)
+    Tag.objects.bulk_create(Tag(name=f"Tag {n}", slug=f"tag-{n}") for n in range(tags))
+    tag_ids = list(Tag.objects.order_by("id").values_list("id", flat=True))
+    last_post = Post.objects.order_by("-id").values_list("id", flat=True).first()
+    first_post = Post.objects.order_by("id").values_list("id", flat=True).first()
+
+    pairs = set()
+    while len(pairs) < links:
+        # Степенное распределение: малые номера тегов встречаются чаще.
+        pairs.add((rng.randint(first_post, last_post), tag_ids[int(len(tag_ids) * rng.random() ** 3)]))
+    pairs = sorted(pairs)
+    with timer() as elapsed:
+        for offset in range(0, len(pairs), batch_size):
+            with transaction.atomic():
+                PostTag.objects.bulk_create(
+                    PostTag(post_id=post_id, tag_id=tag_id) for post_id, tag_id in pairs[offset:offset + batch_size]
+                )
+    print(f"seeded {links} tag links in {elapsed.seconds:.1f} s")
+    return tag_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--posts", type=int, default=1_000_000)
+    parser.add_argument("--links", type=int, default=100_000)
+    parser.add_argument("--tags", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.cache import cache
+    from django.core.management import call_command
+    from django.db.models import Count, Q
+    from django.test import Client
+    from django.test.utils import override_settings
+    from django.urls import reverse
+
+    from blog.models import Post, Tag
+    from blog.tags import tag_cloud
+
+    with test_database(file_backed=True), override_settings(VIEW_CACHE_TIMEOUT=0):
+        seed(args.posts)
+        tag_ids = seed_tags(args.tags, args.links)
+        # bulk_create минует модели: состояние публикации и счетчики
+        # заполняет команда пересчета (заодно замеряется ее время).
+        with timer() as elapsed:
+            call_command("rebuild_tag_counts", "--chunk-size", "20000", stdout=StringIO())
+        print(f"rebuild_tag_counts: {elapsed.seconds:.2f} s")
+
+        client = Client()
+        for label, tag in (("hot", Tag.objects.get(pk=tag_ids[0])), ("rare", Tag.objects.get(pk=tag_ids[-1]))):
+            url = reverse("blog:tag", args=[tag.slug])
+            first = client.get(url).context["page"]
+            cursor = first.next_cursor
+            deep = first
+            # Глубокая страница: курсор после 20 страниц (или последней).
+            for _ in range(20):
+                if not deep.has_next:
+                    break
+                cursor = deep.next_cursor
+                deep = client.get(url, {"cursor": cursor}).context["page"]
+
+            joined = Post.objects.published().filter(tags=tag).order_by("-published_at", "-id")
+            view_first = median_ms(lambda: client.get(url), args.repeat)
+            view_deep = median_ms(lambda: client.get(url, {"cursor": cursor} if cursor else {}), args.repeat)
+            join_first = median_ms(lambda: list(joined[:20]), args.repeat)
+            join_deep = median_ms(lambda: list(joined[400:420]), args.repeat)
+            print(
+                f"tag page {label:<4} ({tag.post_count:>6} posts): view first {view_first:7.2f} ms"
+                f"  deep {view_deep:7.2f} ms | JOIN first {join_first:7.2f} ms  OFFSET 400 {join_deep:7.2f} ms"
+            )
+
+        grouped = median_ms(
+            lambda: list(
+                Tag.objects.annotate(n=Count("post_tags", filter=Q(post_tags__post__is_published=True)))
+                .filter(n__gt=0)
+                .order_by("-n", "name")
+                .values("name", "slug", "n")[:50]
+            ),
+            args.repeat,
+        )
+        counted = median_ms(
+            lambda: list(Tag.objects.filter(post_count__gt=0).order_by("-post_count", "name").values("name")[:50]),
+            args.repeat,
+        )
+        tag_cloud()
+        cached = median_ms(tag_cloud, args.repeat)
+        cache.clear()
+        print(
+            f"tag cloud: GROUP BY {grouped:7.2f} ms  post_count index {counted:7.2f} ms  cached {cached:7.3f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
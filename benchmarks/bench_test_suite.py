@@ -0,0 +1,60 @@
+"""
+Время прогона тестов: рабочие настройки против быстрого профиля.
+
+Каждый вариант запускает manage.py test в отдельном процессе и выводит
+общее время (включая создание тестовой базы), число тестов и результат:
+
+- settings: рабочие настройки (PBKDF2, база по DB_PROFILE), один процесс;
+- settings_test: быстрый профиль (MD5, SQLite в памяти), один процесс;
+- settings_test parallel: быстрый профиль, по процессу на ядро.
+
+Запуск:
+    python -m benchmarks.bench_test_suite
+    python -m benchmarks.bench_test_suite account
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks.utils import timer
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+PROFILES = {
+    "settings": ["--settings", "blog_gomer_lisa.settings", "--parallel", "1"],
+    "settings_test": ["--settings", "blog_gomer_lisa.settings_test", "--parallel", "1"],
+    "settings_test parallel": ["--settings", "blog_gomer_lisa.settings_test", "--parallel", "auto"],
+}
+
+
+def run(labels, options):
+    """Возвращает (секунды, строка "Ran N tests", последняя строка вывода)."""
+    env = {key: value for key, value in os.environ.items() if key != "DJANGO_SETTINGS_MODULE"}
+    with timer() as t:
+        result = subprocess.run(
+            [sys.executable, "manage.py", "test", *options, *labels],
+            cwd=BASE_DIR, env=env, capture_output=True, text=True,
+        )
+    output = result.stderr.strip()
+    ran = re.search(r"^Ran \d+ tests?", output, re.MULTILINE)
+    status = next((line for line in reversed(output.splitlines()) if line.startswith(("OK", "FAILED"))), "ERROR")
+    return t.seconds, ran.group(0) if ran else "-", status
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("labels", nargs="*", help="Метки тестов, как у manage.py test")
+    parser.add_argument("--profile", action="append", choices=list(PROFILES))
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPU")
+    for name in args.profile or list(PROFILES):
+        seconds, ran, status = run(args.labels, PROFILES[name])
+        print(f"{name:<24} {seconds:7.1f} s  {ran:<14} {status}")
+
+
+if __name__ == "__main__":
+    main()
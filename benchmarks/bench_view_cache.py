@@ -0,0 +1,54 @@
+"""
+Нагрузочный тест главной страницы с кешем представлений и без него.
+
+Запросы проходят через весь стек middleware тестового клиента (WSGI).
+
+Запуск:
+    python -m benchmarks.bench_view_cache --requests 2000 --threads 4
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.utils import setup_django, test_database, timer
+
+
+def run(url, requests, threads):
+    from django.test import Client
+
+    def worker(count):
+        client = Client()
+        for _ in range(count):
+            response = client.get(url)
+            assert response.status_code == 200, response.status_code
+
+    per_thread = [requests // threads] * threads
+    with timer() as t, ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(worker, per_thread))
+    return sum(per_thread) / t.seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", default="/")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.cache import cache
+    from django.test.utils import override_settings
+
+    with test_database():
+        with override_settings(VIEW_CACHE_TIMEOUT=0):
+            before = run(args.url, args.requests, args.threads)
+        cache.clear()
+        with override_settings(VIEW_CACHE_TIMEOUT=60):
+            after = run(args.url, args.requests, args.threads)
+
+    print(f"{args.url} without view cache: {before:.0f} req/sec")
+    print(f"{args.url} with view cache:    {after:.0f} req/sec")
+    print(f"speedup: x{after / before:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Счетчик просмотров записей: UPDATE на каждый просмотр против отложенной
+пакетной записи (core.counters.WriteBehindCounter).
+
+Потоки запрашивают страницы --posts записей через весь стек middleware;
+кеш представлений включен, поэтому запись счетчика - основная работа
+с базой. База - временный файл SQLite (профиль из DB_PROFILE), так что
+запись из разных потоков конкурирует за блокировку, как в продакшене.
+
+Запуск:
+    python -m benchmarks.bench_view_counters --requests 4000 --threads 4
+    DB_PROFILE=sqlite-wal python -m benchmarks.bench_view_counters
+"""
+import argparse
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.utils import setup_django, test_database, timer
+
+
+def run(urls, requests, threads):
+    """Возвращает (запросов в секунду, ошибок блокировки)."""
+    from django.db import OperationalError, connections
+    from django.test import Client
+
+    def worker(count):
+        client = Client()
+        rng = random.Random(count)
+        locked = 0
+        for _ in range(count):
+            try:
+                response = client.get(rng.choice(urls))
+                assert response.status_code == 200, response.status_code
+            except OperationalError as exc:
+                if "locked" not in str(exc):
+                    raise
+                locked += 1
+        connections.close_all()
+        return locked
+
+    per_thread = [requests // threads] * threads
+    with timer() as t, ThreadPoolExecutor(max_workers=threads) as pool:
+        locked = sum(pool.map(worker, per_thread))
+    return sum(per_thread) / t.seconds, locked
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--posts", type=int, default=20, help="Число горячих записей")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.db.models import Sum
+    from django.test.utils import override_settings
+    from django.urls import reverse
+
+    from blog.models import Post, post_views
+
+    with test_database(file_backed=True), override_settings(VIEW_CACHE_TIMEOUT=60):
+        author = get_user_model().objects.create_user(
+            email="author@example.com", username="author", password="ComplexPass123!"
+        )
+        posts = [
+            Post.objects.create(author=author, title=f"Post {n}", body="text", is_published=True)
+            for n in range(args.posts)
+        ]
+        urls = [reverse("blog:post", args=[post.pk]) for post in posts]
+
+        for mode, interval in (("per-hit UPDATE", 0), ("write-behind", 1)):
+            Post.objects.update(views=0)
+            with override_settings(COUNTERS_FLUSH_INTERVAL=interval):
+                rate, locked = run(urls, args.requests, args.threads)
+                post_views.flush()
+            stored = Post.objects.aggregate(total=Sum("views"))["total"]
+            print(
+                f"{mode:<15} {rate:8.0f} req/s  lock_errors={locked:<4}"
+                f" views stored={stored} of {args.requests - locked}"
+            )
+
+
+if __name__ == "__main__":
+    main()
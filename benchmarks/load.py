@@ -0,0 +1,457 @@
+"""
+Нагрузочный прогон основных страниц проекта через WSGI- и ASGI-приложения.
+
+Запросы передаются напрямую в blog_gomer_lisa.wsgi.application и
+blog_gomer_lisa.asgi.application, без сети и без тестового клиента:
+замеряется весь стек Django - middleware, сессии, CSRF, ограничитель
+частоты, представления, шаблоны и база.
+
+Точка входа - команда manage.py bench (core/management/commands/bench.py).
+"""
+import asyncio
+import itertools
+import json
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import timedelta
+from io import BytesIO
+from urllib.parse import urlencode
+
+from benchmarks.utils import percentile, timer
+
+PASSWORD = "ComplexPass123!"
+
+WORDS = (
+    "django python cache index query template session signal worker feed "
+    "sitemap comment thread image upload counter latency profile metric"
+).split()
+
+# Сценарии по имени; заполняется декоратором scenario().
+scenarios = {}
+
+_ids = itertools.count()
+
+
+@dataclass
+class Request:
+    """Запрос сценария: метод, путь, данные формы и cookies."""
+
+    method: str
+    path: str
+    query: str = ""
+    form: dict = None
+    cookies: dict = field(default_factory=dict)
+
+    @property
+    def body(self):
+        return urlencode(self.form).encode() if self.form is not None else b""
+
+    def headers(self):
+        """Заголовки запроса: (имя в нижнем регистре, значение)."""
+        from django.conf import settings
+
+        headers = [("host", "testserver")]
+        cookies = dict(self.cookies)
+        if self.method == "POST":
+            # Секрет CSRF в cookie и в заголовке: так отправляет форму браузер.
+            token = f"{next(_ids):032d}"
+            cookies[settings.CSRF_COOKIE_NAME] = token
+            headers += [("content-type", "application/x-www-form-urlencoded"), ("x-csrftoken", token)]
+        if cookies:
+            headers.append(("cookie", "; ".join(f"{name}={value}" for name, value in cookies.items())))
+        return headers
+
+
+@dataclass
+class Scenario:
+    """
+    Сценарий нагрузки на один адрес.
+
+    Attributes:
+        name (str): Имя сценария в отчете.
+        build (Callable[[Fixtures], Request]): Строит очередной запрос.
+        expect (int): Ожидаемый код ответа; остальные считаются ошибками.
+    """
+
+    name: str
+    build: object
+    expect: int = 200
+
+
+def scenario(name, expect=200):
+    """Декоратор, регистрирующий функцию построения запроса как сценарий."""
+
+    def decorator(build):
+        scenarios[name] = Scenario(name, build, expect)
+        return build
+
+    return decorator
+
+
+@dataclass
+class Fixtures:
+    """
+    Данные, на которые ссылаются сценарии.
+
+    Attributes:
+        emails (list[str]): Email пользователей с паролем PASSWORD.
+        post_ids (list[int]): Опубликованные записи.
+        staff_cookies (dict): Cookies сессии администратора.
+    """
+
+    emails: list
+    post_ids: list
+    staff_cookies: dict
+    rng: random.Random = field(default_factory=lambda: random.Random(20))
+
+
+def client_address():
+    """Отдельный адрес на каждый запрос: ограничитель частоты видит разных клиентов."""
+    n = next(_ids)
+    return f"10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}"
+
+
+@scenario("index")
+def index(data):
+    return Request("GET", "/")
+
+
+@scenario("register-get")
+def register_get(data):
+    return Request("GET", "/register/")
+
+
+@scenario("register-post", expect=302)
+def register_post(data):
+    n = next(_ids)
+    return Request(
+        "POST",
+        "/register/",
+        form={"email": f"bench{n}@example.com", "username": f"bench{n}", "password1": PASSWORD, "password2": PASSWORD},
+    )
+
+
+@scenario("login", expect=302)
+def login(data):
+    return Request("POST", "/login/", form={"username": data.rng.choice(data.emails), "password": PASSWORD})
+
+
+@scenario("admin-changelist")
+def admin_changelist(data):
+    return Request("GET", "/admin/blog/post/", cookies=data.staff_cookies)
+
+
+@scenario("admin-users")
+def admin_users(data):
+    query = urlencode({"q": data.rng.choice(["user1", "user2@", "admin"])})
+    return Request("GET", "/admin/account/user/", query=query, cookies=data.staff_cookies)
+
+
+@scenario("blog-index")
+def blog_index(data):
+    return Request("GET", "/blog/")
+
+
+@scenario("blog-post")
+def blog_post(data):
+    return Request("GET", f"/blog/post/{data.rng.choice(data.post_ids)}/")
+
+
+@scenario("blog-search")
+def blog_search(data):
+    return Request("GET", "/blog/search", query=urlencode({"q": data.rng.choice(WORDS)}))
+
+
+def seed(users=1000, posts=200, comments=10):
+    """
+    Заполняет базу пользователями, записями и комментариями.
+
+    Пароль хешируется один раз и записывается всем пользователям, поэтому
+    вход замеряется с настоящим хешером, а подготовка занимает секунды.
+
+    Returns:
+        Fixtures: Данные для сценариев.
+    """
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+    from django.test import Client
+    from django.utils import timezone
+
+    from blog.models import Comment, Post, path_segment
+
+    User = get_user_model()
+    rng = random.Random(20)
+    password = make_password(PASSWORD)
+    authors = User.objects.bulk_create(
+        User(email=f"user{n}@example.com", username=f"user{n}", password=password) for n in range(users)
+    )
+    staff = User.objects.create_superuser(email="admin@example.com", username="admin", password=PASSWORD)
+
+    now = timezone.now()
+    entries = []
+    for n in range(posts):
+        paragraphs = (" ".join(rng.choices(WORDS, k=60)) for _ in range(5))
+        post = Post(
+            author=rng.choice(authors),
+            title=" ".join(rng.choices(WORDS, k=5)).capitalize(),
+            body="\n\n".join(paragraphs),
+            is_published=n % 10 != 0,
+            published_at=now - timedelta(hours=n),
+        )
+        post.render_body()
+        entries.append(post)
+    Post.objects.bulk_create(entries)
+    post_ids = list(Post.objects.published().values_list("pk", flat=True))
+
+    # Ветки с явными id и путями, как их построил бы Comment.save().
+    pk = (Comment.objects.order_by("-pk").values_list("pk", flat=True).first() or 0) + 1
+    thread = []
+    for post_id in post_ids:
+        nodes = []
+        for _ in range(comments):
+            parent = rng.choice(nodes) if nodes and rng.random() < 0.6 else None
+            comment = Comment(
+                pk=pk,
+                post_id=post_id,
+                author=rng.choice(authors),
+                parent_id=parent.pk if parent else None,
+                body=" ".join(rng.choices(WORDS, k=20)),
+                path=(parent.path if parent else "") + path_segment(pk),
+                depth=parent.depth + 1 if parent else 0,
+            )
+            if parent is not None:
+                parent.reply_count += 1
+            nodes.append(comment)
+            pk += 1
+        thread += nodes
+    Comment.objects.bulk_create(thread, batch_size=1000)
+
+    client = Client()
+    client.force_login(staff)
+    staff_cookies = {name: morsel.value for name, morsel in client.cookies.items()}
+    return Fixtures(emails=[user.email for user in authors], post_ids=post_ids, staff_cookies=staff_cookies)
+
+
+def call_wsgi(app, request):
+    """Передает запрос WSGI-приложению и читает ответ целиком; возвращает код ответа."""
+    body = request.body
+    environ = {
+        "REQUEST_METHOD": request.method,
+        "SCRIPT_NAME": "",
+        "PATH_INFO": request.path,
+        "QUERY_STRING": request.query,
+        "SERVER_NAME": "testserver",
+        "SERVER_PORT": "80",
+        "SERVER_PROTOCOL": "HTTP/1.1",
+        "REMOTE_ADDR": client_address(),
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": "http",
+        "wsgi.input": BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for name, value in request.headers():
+        if name == "content-type":
+            environ["CONTENT_TYPE"] = value
+        else:
+            environ["HTTP_" + name.upper().replace("-", "_")] = value
+
+    status = []
+    result = app(environ, lambda value, headers, exc_info=None: status.append(int(value.split()[0])))
+    try:
+        for _chunk in result:
+            pass
+    finally:
+        # close() отправляет request_finished, как это делает WSGI-сервер.
+        if hasattr(result, "close"):
+            result.close()
+    return status[0]
+
+
+async def call_asgi(app, request):
+    """Передает запрос ASGI-приложению и читает ответ целиком; возвращает код ответа."""
+    messages = [{"type": "http.request", "body": request.body, "more_body": False}]
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": request.method,
+        "scheme": "http",
+        "path": request.path,
+        "raw_path": request.path.encode(),
+        "query_string": request.query.encode(),
+        "root_path": "",
+        "headers": [(name.encode(), value.encode()) for name, value in request.headers()],
+        "client": (client_address(), 50000),
+        "server": ("testserver", 80),
+    }
+    status = None
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        # Клиент не отключается: ждем, пока Django не отменит ожидание.
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+def summarize(latencies, errors, seconds):
+    """Сводка прогона: пропускная способность и перцентили задержки в миллисекундах."""
+    ms = [value * 1000 for value in latencies]
+    return {
+        "requests": len(ms),
+        "errors": errors,
+        "rps": round(len(ms) / seconds, 1) if seconds else 0.0,
+        "p50_ms": round(percentile(ms, 50), 2),
+        "p95_ms": round(percentile(ms, 95), 2),
+        "p99_ms": round(percentile(ms, 99), 2),
+    }
+
+
+def run_wsgi(item, data, requests, concurrency):
+    """Прогоняет сценарий через WSGI-приложение в concurrency потоках."""
+    from django.db import connections
+
+    from blog_gomer_lisa.wsgi import application
+
+    def worker(count):
+        latencies, errors = [], 0
+        try:
+            for _ in range(count):
+                request = item.build(data)
+                started = time.perf_counter()
+                status = call_wsgi(application, request)
+                latencies.append(time.perf_counter() - started)
+                errors += status != item.expect
+        finally:
+            connections.close_all()
+        return latencies, errors
+
+    shares = [requests // concurrency + (n < requests % concurrency) for n in range(concurrency)]
+    with timer() as t, ThreadPoolExecutor(max_workers=concurrency) as pool:
+        parts = list(pool.map(worker, shares))
+    return summarize([value for part, _errors in parts for value in part], sum(e for _part, e in parts), t.seconds)
+
+
+def run_asgi(item, data, requests, concurrency):
+    """
+    Прогоняет сценарий через ASGI-приложение: concurrency одновременных
+    клиентов в одном цикле событий.
+
+    Регистрация и вход обслуживаются асинхронными представлениями
+    (benchmarks.urls_async), как при ACCOUNT_ASYNC_VIEWS под ASGI.
+    """
+    from asgiref.sync import sync_to_async
+    from django.db import connections
+    from django.test.utils import override_settings
+
+    from blog_gomer_lisa.asgi import application
+
+    async def run():
+        pending = iter(range(requests))
+        latencies, errors = [], 0
+
+        async def client():
+            nonlocal errors
+            for _ in pending:
+                request = item.build(data)
+                started = time.perf_counter()
+                status = await call_asgi(application, request)
+                latencies.append(time.perf_counter() - started)
+                errors += status != item.expect
+
+        try:
+            with timer() as t:
+                await asyncio.gather(*(client() for _ in range(concurrency)))
+        finally:
+            await sync_to_async(connections.close_all)()
+        return summarize(latencies, errors, t.seconds)
+
+    with override_settings(ROOT_URLCONF="benchmarks.urls_async"):
+        return asyncio.run(run())
+
+
+RUNNERS = {"wsgi": run_wsgi, "asgi": run_asgi}
+
+
+def run_suite(data, names=None, servers=("wsgi", "asgi"), requests=200, concurrency=8, warmup=10, progress=None):
+    """
+    Прогоняет сценарии names на каждом из servers.
+
+    Перед замером каждый сценарий выполняется warmup раз в одном потоке:
+    прогреваются кеши, шаблоны и соединения с базой.
+
+    Args:
+        data (Fixtures): Данные из seed().
+        names (list[str], optional): Сценарии; по умолчанию все.
+        progress (Callable[[str, dict], None], optional): Вызывается
+            после каждого сценария.
+
+    Returns:
+        dict: {"<сервер>:<сценарий>": сводка summarize()}.
+    """
+    from blog.models import post_views
+
+    results = {}
+    try:
+        for server in servers:
+            runner = RUNNERS[server]
+            for name in names or scenarios:
+                item = scenarios[name]
+                if warmup:
+                    runner(item, data, warmup, 1)
+                key = f"{server}:{name}"
+                results[key] = runner(item, data, requests, concurrency)
+                if progress is not None:
+                    progress(key, results[key])
+    finally:
+        # Отложенные просмотры пишутся во временную базу, пока она существует.
+        post_views.flush()
+    return results
+
+
+def compare(baseline, results, threshold):
+    """
+    Сравнивает результаты с базовыми.
+
+    Регрессией считается падение пропускной способности или рост p95
+    больше чем на threshold (доля, 0.2 = 20%). Сценарии, которых нет в
+    базовых результатах, не сравниваются.
+
+    Returns:
+        list[str]: Описания регрессий; пустой список, если их нет.
+    """
+    regressions = []
+    for key, current in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if current["rps"] < base["rps"] * (1 - threshold):
+            regressions.append(f"{key}: {current['rps']} req/s, baseline {base['rps']} req/s")
+        if current["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            regressions.append(f"{key}: p95 {current['p95_ms']} ms, baseline {base['p95_ms']} ms")
+    return regressions
+
+
+def load_report(path):
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def save_report(report, path):
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2, sort_keys=True)
+        file.write("\n")
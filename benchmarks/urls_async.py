@@ -0,0 +1,10 @@
+"""Маршруты с асинхронными представлениями для бенчмарков под ASGI."""
+from django.urls import include, path
+
+from account.views import AsyncLoginView, AsyncRegisterView
+
+urlpatterns = [
+    path("register/", AsyncRegisterView.as_view()),
+    path("login/", AsyncLoginView.as_view()),
+    path("", include("blog_gomer_lisa.urls")),
+]
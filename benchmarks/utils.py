@@ -0,0 +1,65 @@
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+
+def setup_django(settings_module="blog_gomer_lisa.settings"):
+    """Настраивает Django для запуска бенчмарка вне manage.py."""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    import django
+
+    django.setup()
+
+
+@contextmanager
+def test_database(verbosity=0, file_backed=False):
+    """
+    Создает временную тестовую базу на время бенчмарка.
+
+    Используется тот же механизм, что и в manage.py test, поэтому
+    рабочая база разработчика не изменяется.
+
+    Args:
+        file_backed (bool): Для SQLite создать базу во временном файле,
+            а не в памяти. Нужно для бенчмарков с параллельной записью
+            из нескольких потоков.
+    """
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict["NAME"]
+    tmpdir = None
+    if file_backed and connection.vendor == "sqlite":
+        tmpdir = tempfile.TemporaryDirectory()
+        connection.settings_dict["TEST"]["NAME"] = os.path.join(tmpdir.name, "bench.sqlite3")
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        teardown_test_environment()
+        if tmpdir is not None:
+            connection.settings_dict["TEST"]["NAME"] = None
+            tmpdir.cleanup()
+
+
+@contextmanager
+def timer():
+    """Замеряет время выполнения блока; результат в поле seconds."""
+    result = type("Timer", (), {"seconds": 0.0})()
+    started = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result.seconds = time.perf_counter() - started
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
@@ -1,3 +1,35 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import Comment, Post, PostTag, Tag
+
+
+class PostTagInline(admin.TabularInline):
+    model = PostTag
+    extra = 1
+    autocomplete_fields = ("tag",)
+
+
+@admin.register(Post)
+class PostAdmin(admin.ModelAdmin):
+    list_display = ("title", "author", "is_published", "published_at")
+    list_filter = ("is_published",)
+    list_select_related = ("author",)
+    raw_id_fields = ("author",)
+    search_fields = ("title",)
+    inlines = (PostTagInline,)
+
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ("name", "slug", "post_count")
+    prepopulated_fields = {"slug": ("name",)}
+    readonly_fields = ("post_count",)
+    search_fields = ("name",)
+
+
+@admin.register(Comment)
+class CommentAdmin(admin.ModelAdmin):
+    list_display = ("__str__", "author", "depth", "reply_count", "created_at")
+    list_select_related = ("author",)
+    raw_id_fields = ("post", "author", "parent")
+    readonly_fields = ("path", "depth", "reply_count")
@@ -0,0 +1,89 @@
+import re
+from dataclasses import dataclass, field
+
+from django.db.models import F, Q, Subquery
+
+from core.pagination import InvalidCursor
+
+from .models import PATH_STEP, Comment
+
+ROOT_CURSOR_RE = re.compile(rf"^[0-9a-z]{{{PATH_STEP}}}$")
+
+
+def build_tree(comments):
+    """
+    Собирает дерево из комментариев, отсортированных по path, за O(n).
+
+    При обходе в порядке path родитель всегда встречается раньше своих
+    ответов, поэтому каждому комментарию достаточно найти родителя в
+    словаре уже пройденных. Комментарии, родителя которых нет в выборке,
+    становятся корнями (так выводится отдельная ветка).
+
+    Returns:
+        list[Comment]: Корни; у каждого комментария заполнен список children.
+    """
+    nodes = {}
+    roots = []
+    for comment in comments:
+        comment.children = []
+        nodes[comment.pk] = comment
+        parent = nodes.get(comment.parent_id)
+        if parent is None:
+            roots.append(comment)
+        else:
+            parent.children.append(comment)
+    return roots
+
+
+@dataclass
+class CommentPage:
+    """Страница корневых комментариев с полными ветками ответов."""
+
+    roots: list = field(default_factory=list)
+    next_cursor: str = None
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def comment_page(post, per_page=20, cursor=None):
+    """
+    Загружает per_page корневых комментариев записи вместе со всеми ответами.
+
+    Выполняется один запрос: строки записи в диапазоне path от курсора до
+    корня, с которого начнется следующая страница. Эта граница
+    вычисляется подзапросом по индексу idx_comment_roots, и она же
+    возвращается как курсор следующей страницы. На последней странице
+    границы нет, и верхнего предела у диапазона тоже: символ-заглушка
+    вроде "~" больше base36 только при побайтовом сравнении, а не в
+    обычных сортировках PostgreSQL (en_US.UTF-8).
+
+    Args:
+        post (Post | int): Запись или ее id.
+        per_page (int): Число корневых комментариев на странице.
+        cursor (str, optional): Курсор из next_cursor предыдущей страницы -
+            path первого корня страницы.
+
+    Returns:
+        CommentPage: Корни страницы с заполненными children.
+
+    Raises:
+        InvalidCursor: Курсор не похож на путь корневого комментария.
+    """
+    if cursor is not None and not ROOT_CURSOR_RE.match(cursor):
+        raise InvalidCursor(cursor)
+    comments = Comment.objects.filter(post=post)
+    roots = comments.filter(depth=0)
+    if cursor is not None:
+        comments = comments.filter(path__gte=cursor)
+        roots = roots.filter(path__gte=cursor)
+    boundary = Subquery(roots.order_by("path").values("path")[per_page:per_page + 1])
+    rows = list(
+        comments.annotate(next_root=boundary)
+        .filter(Q(next_root__isnull=True) | Q(path__lt=F("next_root")))
+        .select_related("author")
+        .only("post_id", "parent_id", "body", "path", "depth", "reply_count", "created_at", "author__username")
+        .order_by("path")
+    )
+    return CommentPage(build_tree(rows), rows[0].next_root if rows else None)
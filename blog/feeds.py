@@ -0,0 +1,134 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import feedgenerator
+from django.utils import timezone
+from django.views import View
+
+from core.streaming import ConditionalStreamMixin, stream_xml
+
+from .models import Post
+
+# Время последнего удаления записи: удаленная запись не оставляет
+# updated_at, по которому ленты и карта сайта узнают об изменении.
+POSTS_DELETED_KEY = "blog:posts:deleted-at"
+
+
+def mark_posts_deleted():
+    cache.set(POSTS_DELETED_KEY, timezone.now(), None)
+
+
+def posts_last_modified():
+    """
+    Дата последнего изменения записей блога для условных запросов.
+
+    Учитывает любые записи, а не только опубликованные: снятие с
+    публикации тоже меняет ленту.
+    """
+    dates = [Post.objects.last_modified(), cache.get(POSTS_DELETED_KEY)]
+    return max(filter(None, dates), default=None)
+
+
+class StreamingFeedMixin:
+    """
+    Потоковая запись ленты feedgenerator.
+
+    Стандартный SyndicationFeed.write() требует заранее собранного
+    списка всех элементов; здесь элементы добавляются и пишутся по
+    одному, а дата обновления ленты передается явно.
+    """
+
+    def __init__(self, *args, updated=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.updated = updated
+
+    def latest_post_date(self):
+        return self.updated or datetime.now(tz=dt_timezone.utc)
+
+    def stream(self, items):
+        """
+        Пишет ленту из итератора словарей аргументов add_item().
+
+        Yields:
+            str: Очередной кусок документа.
+        """
+
+        def write_item(handler, item):
+            self.add_item(**item)
+            self.write_items(handler)
+            self.items.clear()
+
+        return stream_xml(self.start_document, items, write_item, self.end_document, chunk_size=20)
+
+
+class AtomFeed(StreamingFeedMixin, feedgenerator.Atom1Feed):
+    def start_document(self, handler):
+        handler.startElement("feed", self.root_attributes())
+        self.add_root_elements(handler)
+
+    def end_document(self, handler):
+        handler.endElement("feed")
+
+
+class RssFeed(StreamingFeedMixin, feedgenerator.Rss201rev2Feed):
+    def start_document(self, handler):
+        handler.startElement("rss", self.rss_attributes())
+        handler.startElement("channel", self.root_attributes())
+        self.add_root_elements(handler)
+
+    def end_document(self, handler):
+        self.endChannelElement(handler)
+        handler.endElement("rss")
+
+
+class PostFeedView(ConditionalStreamMixin, View):
+    """
+    Лента последних settings.BLOG_FEED_ITEMS опубликованных записей.
+
+    Формат задается в as_view(feed_class=AtomFeed | RssFeed). Записи
+    читаются из базы итератором и пишутся в ответ по мере чтения.
+    """
+
+    feed_class = AtomFeed
+    title = "Blog Gomer Lisa"
+    description = "Latest blog posts"
+
+    @property
+    def content_type(self):
+        return self.feed_class.content_type
+
+    def get_last_modified(self):
+        return posts_last_modified()
+
+    def stream_content(self):
+        absolute = self.request.build_absolute_uri
+        feed = self.feed_class(
+            title=self.title,
+            link=absolute(reverse("blog:index")),
+            description=self.description,
+            feed_url=absolute(self.request.path),
+            language=settings.LANGUAGE_CODE,
+            updated=self.last_modified,
+        )
+        posts = (
+            Post.objects.published()
+            .select_related("author")
+            .only("title", "excerpt", "published_at", "updated_at", "author__username")
+            [:settings.BLOG_FEED_ITEMS]
+        )
+        return feed.stream(self.item(post, absolute) for post in posts.iterator(chunk_size=100))
+
+    @staticmethod
+    def item(post, absolute):
+        link = absolute(reverse("blog:post", args=[post.pk]))
+        return {
+            "title": post.title,
+            "link": link,
+            "unique_id": link,
+            "description": post.excerpt,
+            "author_name": post.author.username,
+            "pubdate": post.published_at,
+            "updateddate": post.updated_at,
+        }
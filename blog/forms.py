@@ -0,0 +1,45 @@
+from django import forms
+
+from .models import Comment, PostImage
+
+
+class PostImageForm(forms.ModelForm):
+    class Meta:
+        model = PostImage
+        fields = ("image", "alt")
+
+
+class CommentForm(forms.ModelForm):
+    """
+    Комментарий или ответ на комментарий той же записи.
+
+    Args:
+        post (Post): Запись, к которой пишется комментарий.
+        author (User): Автор.
+    """
+
+    parent = forms.IntegerField(required=False, widget=forms.HiddenInput)
+
+    class Meta:
+        model = Comment
+        fields = ("body",)
+        widgets = {"body": forms.Textarea(attrs={"rows": 3})}
+
+    def __init__(self, *args, post, author, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.instance.post = post
+        self.instance.author = author
+
+    def clean_parent(self):
+        parent_id = self.cleaned_data["parent"]
+        if parent_id is None:
+            return None
+        parent = (
+            Comment.objects.filter(pk=parent_id, post=self.instance.post)
+            .only("post_id", "path", "depth")
+            .first()
+        )
+        if parent is None:
+            raise forms.ValidationError("Unknown comment.", code="invalid_parent")
+        self.instance.parent = parent
+        return parent
@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.models import Post
+from blog.search import get_search_backend
+
+
+class Command(BaseCommand):
+    """
+    Перестраивает поисковый индекс записей блога.
+
+    Id записей читаются потоком, а индекс обновляется пачками по
+    --chunk-size в отдельных транзакциях: память не зависит от числа
+    записей, а блокировка базы не держится на все время перестройки.
+    Индекс заранее не очищается, index() заменяет строки своей пачки,
+    так что поиск работает и во время перестройки. В конце одним
+    запросом удаляются строки удаленных и снятых с публикации записей.
+    Нужна после bulk_create/update(), которые не вызывают сигналы.
+
+    Пример:
+        python manage.py rebuild_search_index --chunk-size 2000
+    """
+
+    help = "Перестраивает полнотекстовый индекс записей блога"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        chunk_size = options["chunk_size"]
+        self.verbosity = options["verbosity"]
+        started = time.perf_counter()
+
+        indexed = 0
+        chunk = []
+        ids = Post.objects.published().order_by().values_list("id", flat=True)
+        for post_id in ids.iterator(chunk_size=chunk_size):
+            chunk.append(post_id)
+            if len(chunk) == chunk_size:
+                indexed += self.index_chunk(backend, chunk)
+                chunk = []
+        if chunk:
+            indexed += self.index_chunk(backend, chunk)
+        with transaction.atomic():
+            backend.prune()
+        backend.optimize()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} posts in {elapsed:.1f}s"))
+
+    def index_chunk(self, backend, chunk):
+        with transaction.atomic():
+            backend.index(chunk)
+        if self.verbosity >= 2:
+            self.stdout.write(f"  ... up to id {chunk[-1]}")
+        return len(chunk)
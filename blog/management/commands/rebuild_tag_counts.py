@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from blog.models import PostTag, Tag
+
+
+class Command(BaseCommand):
+    """
+    Пересчитывает денормализованные данные тегов.
+
+    Счетчики Tag.post_count и поля публикации в PostTag обновляются
+    приращениями при сохранении записей и связей; изменения в обход
+    моделей (QuerySet.update(), правка базы вручную) дают расхождение.
+    Команда:
+
+    1. копирует is_published и published_at записей в связи пачками по
+       диапазону id, короткими транзакциями;
+    2. пересчитывает post_count одним UPDATE только у тегов, где счетчик
+       разошелся с числом опубликованных связей.
+
+    Пример:
+        python manage.py rebuild_tag_counts --chunk-size 10000
+    """
+
+    help = "Пересчитывает счетчики записей у тегов"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        chunk_size = options["chunk_size"]
+        last_id = PostTag.objects.aggregate(last=Max("id"))["last"] or 0
+        for start in range(0, last_id, chunk_size):
+            PostTag.objects.filter(id__gt=start, id__lte=start + chunk_size).sync_with_posts()
+            if options["verbosity"] >= 2:
+                self.stdout.write(f"  links up to #{min(start + chunk_size, last_id)} synced")
+
+        published = (
+            PostTag.objects.filter(tag=OuterRef("pk"), is_published__in=[True])
+            .order_by()
+            .values("tag")
+            .annotate(n=Count("pk"))
+            .values("n")
+        )
+        actual = Coalesce(Subquery(published), 0)
+        fixed = Tag.objects.exclude(post_count=actual).update(post_count=actual)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Fixed {fixed} tag counts in {elapsed:.2f} s"))
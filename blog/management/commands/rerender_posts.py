@@ -0,0 +1,128 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from blog.models import Post
+from blog.rendering import RENDERER_VERSION, render_cached
+from blog.search import get_search_backend
+from core.fragments import invalidate_pks
+
+
+def render_rows(rows):
+    """Рендерит пачку (id, body, updated_at); выполняется в процессе пула."""
+    return [(post_id, updated_at, *render_cached(body)) for post_id, body, updated_at in rows]
+
+
+def init_worker():
+    """Поднимает Django в процессе пула, если он запущен через spawn."""
+    if not apps.ready:
+        django.setup()
+
+
+class Command(BaseCommand):
+    """
+    Перерисовывает body_html, excerpt и body_text записей после смены
+    RENDERER_VERSION и переиндексирует их для поиска.
+
+    Записи читаются пачками по id (без открытого курсора на всю таблицу),
+    Markdown рендерится в пуле процессов, а результаты сохраняются одной
+    транзакцией на пачку. Пока пачка сохраняется, пул уже рендерит
+    следующие, в работе не больше двух пачек на процесс.
+
+    Каждая строка обновляется, только если ее updated_at не изменился с
+    момента чтения: запись, отредактированную во время рендеринга, уже
+    перерисовал Post.save(), и старый HTML ее не затирает. Перерисованным
+    записям updated_at ставится текущий, чтобы ленты, карта сайта и их
+    ETag увидели новые анонсы, а фрагменты записей сбрасываются.
+
+    Пример:
+        python manage.py rerender_posts --workers 4
+        python manage.py rerender_posts --all
+    """
+
+    help = "Перерисовывает HTML записей, отрендеренных старой версией рендерера"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Количество процессов для рендеринга (1 - без пула)",
+        )
+        parser.add_argument("--all", action="store_true", help="Перерисовать все записи, а не только устаревшие")
+
+    def handle(self, *args, **options):
+        queryset = Post.objects.all()
+        if not options["all"]:
+            queryset = queryset.exclude(render_version=RENDERER_VERSION)
+        batches = self.read_batches(queryset, options["batch_size"])
+        workers = options["workers"]
+
+        started = time.perf_counter()
+        rendered = read = 0
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+                pending = deque()
+                for batch in batches:
+                    read += len(batch)
+                    pending.append(executor.submit(render_rows, batch))
+                    if len(pending) >= workers * 2:
+                        rendered += self.save_batch(pending.popleft().result())
+                while pending:
+                    rendered += self.save_batch(pending.popleft().result())
+        else:
+            for batch in batches:
+                read += len(batch)
+                rendered += self.save_batch(render_rows(batch))
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Rendered {rendered} posts with renderer v{RENDERER_VERSION} in {elapsed:.1f}s"
+            f" (skipped {read - rendered} edited meanwhile)"
+        ))
+
+    @staticmethod
+    def read_batches(queryset, batch_size):
+        last_id = 0
+        while True:
+            batch = list(
+                queryset.filter(id__gt=last_id).order_by("id").values_list("id", "body", "updated_at")[:batch_size]
+            )
+            if not batch:
+                return
+            last_id = batch[-1][0]
+            yield batch
+
+    @staticmethod
+    def save_batch(rows):
+        """
+        Сохраняет отрендеренную пачку.
+
+        Returns:
+            int: Сколько записей обновлено; измененные после чтения пропускаются.
+        """
+        saved_ids = []
+        now = timezone.now()
+        with transaction.atomic():
+            for post_id, updated_at, html, excerpt, text, digest in rows:
+                if Post.objects.filter(id=post_id, updated_at=updated_at).update(
+                    body_html=html,
+                    excerpt=excerpt,
+                    body_text=text,
+                    body_hash=digest,
+                    render_version=RENDERER_VERSION,
+                    updated_at=now,
+                ):
+                    saved_ids.append(post_id)
+            if saved_ids:
+                get_search_backend().index(saved_ids)
+                invalidate_pks(Post, saved_ids)
+        return len(saved_ids)
@@ -0,0 +1,42 @@
+from django.db import migrations
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE blog_post_fts USING fts5("
+    "title, body, tokenize = 'unicode61 remove_diacritics 2')",
+]
+SQLITE_BACKWARD = ["DROP TABLE IF EXISTS blog_post_fts"]
+
+POSTGRES_FORWARD = [
+    "CREATE TABLE blog_post_search ("
+    "post_id bigint PRIMARY KEY REFERENCES blog_post (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+    "document tsvector NOT NULL)",
+    "CREATE INDEX blog_post_search_document ON blog_post_search USING GIN (document)",
+]
+POSTGRES_BACKWARD = ["DROP TABLE IF EXISTS blog_post_search"]
+
+
+def run_for_vendor(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+    """
+    Полнотекстовый индекс записей (см. blog/search.py): FTS5 в SQLite,
+    tsvector с GIN-индексом в PostgreSQL. Для других баз индекс не
+    создается, поиск работает через LIKE.
+    """
+
+    dependencies = [
+        ("blog", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor({"sqlite": SQLITE_FORWARD, "postgresql": POSTGRES_FORWARD}),
+            run_for_vendor({"sqlite": SQLITE_BACKWARD, "postgresql": POSTGRES_BACKWARD}),
+        ),
+    ]
@@ -1,3 +1,353 @@
-from django.db import models
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.utils import timezone
+from django.utils.http import int_to_base36
 
-# Create your models here.
+from core.counters import WriteBehindCounter
+from core.images import validate_upload_size
+
+from .rendering import RENDERER_VERSION, content_hash, render_cached
+
+
+class PostQuerySet(models.QuerySet):
+    def published(self):
+        # is_published=True Django превращает в "WHERE is_published", и SQLite
+        # не использует такое условие как равенство по первому полю индекса
+        # idx_post_published: лента сортируется во временном B-дереве.
+        # Условие IN (True) планировщик понимает как is_published = ?.
+        return self.filter(is_published__in=[True])
+
+    def last_modified(self):
+        """Самая поздняя дата изменения среди записей (по индексу idx_post_updated)."""
+        return self.order_by("-updated_at").values_list("updated_at", flat=True).first()
+
+
+class Tag(models.Model):
+    """
+    Тег записей блога.
+
+    Attributes:
+        name (CharField): Название.
+        slug (SlugField): Часть адреса страницы тега.
+        post_count (PositiveIntegerField): Число опубликованных записей с
+            тегом. Поддерживается при публикации, снятии с публикации,
+            удалении записей и изменении связей; расхождение исправляет
+            команда rebuild_tag_counts.
+
+    Meta:
+        idx_tag_cloud: Самые популярные теги (post_count по убыванию).
+    """
+
+    name = models.CharField(max_length=50, unique=True)
+    slug = models.SlugField(max_length=50, unique=True)
+    post_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        ordering = ["name"]
+        indexes = [models.Index(fields=["-post_count", "name"], name="idx_tag_cloud")]
+
+    def __str__(self):
+        return self.name
+
+
+# Счетчики записей у тегов. Используется только write(): счетчики
+# меняются сразу, в одной транзакции со связями.
+tag_counts = WriteBehindCounter(Tag, "post_count")
+
+
+class Post(models.Model):
+    """
+    Запись блога.
+
+    Attributes:
+        author (ForeignKey): Автор записи.
+        title (CharField): Заголовок.
+        body (TextField): Текст записи в Markdown.
+        body_html (TextField): Очищенный HTML текста, готовый к выводу.
+        excerpt (TextField): Текстовый анонс для ленты.
+        body_text (TextField): Текст записи без разметки; по нему строятся
+            поисковый индекс и сниппеты.
+        body_hash (CharField): Хеш body и версии рендерера, по которому
+            body_html считается актуальным.
+        render_version (PositiveSmallIntegerField): Версия рендерера,
+            которой получен body_html.
+        is_published (BooleanField): Опубликована ли запись.
+        published_at (DateTimeField): Дата публикации; выставляется при
+            первой публикации.
+        created_at (DateTimeField): Дата создания.
+        updated_at (DateTimeField): Дата последнего изменения.
+        views (PositiveBigIntegerField): Число просмотров; пишется с
+            задержкой через post_views, актуальное значение -
+            post_views.value(pk, views).
+        tags (ManyToManyField): Теги записи (через PostTag).
+
+    Meta:
+        idx_post_published: Индекс ленты (is_published, published_at, id),
+            по которому работает keyset-пагинация на главной блога.
+        idx_post_updated: Дата последнего изменения записей для условных
+            запросов лент и карты сайта.
+    """
+
+    author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="posts")
+    title = models.CharField(max_length=200)
+    body = models.TextField()
+    body_html = models.TextField(blank=True, editable=False)
+    excerpt = models.TextField(blank=True, editable=False)
+    body_text = models.TextField(blank=True, editable=False)
+    body_hash = models.CharField(max_length=64, blank=True, editable=False)
+    render_version = models.PositiveSmallIntegerField(default=0, editable=False)
+    is_published = models.BooleanField(default=False)
+    published_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    views = models.PositiveBigIntegerField(default=0, editable=False)
+    tags = models.ManyToManyField(Tag, through="PostTag", related_name="posts", blank=True)
+
+    objects = PostQuerySet.as_manager()
+
+    # (is_published, published_at), с которыми запись загружена или сохранена;
+    # по ним save() понимает, что связи с тегами нужно пересчитать.
+    _tag_state = None
+
+    # Поля, которые заполняет render_body().
+    RENDERED_FIELDS = ("body_html", "excerpt", "body_text", "body_hash", "render_version")
+
+    class Meta:
+        ordering = ["-published_at", "-id"]
+        indexes = [
+            models.Index(fields=["is_published", "published_at", "id"], name="idx_post_published"),
+            models.Index(fields=["updated_at"], name="idx_post_updated"),
+        ]
+
+    def __str__(self):
+        return self.title
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        post = super().from_db(db, field_names, values)
+        # Отложенные поля не читаются: неизвестное состояние просто
+        # считается изменившимся.
+        post._tag_state = (post.__dict__.get("is_published"), post.__dict__.get("published_at"))
+        return post
+
+    def save(self, *args, **kwargs):
+        if self.is_published and self.published_at is None:
+            self.published_at = timezone.now()
+        update_fields = kwargs.get("update_fields")
+        # Частичное сохранение без body не должно подгружать отложенный текст.
+        if (update_fields is None or "body" in update_fields) and self.render_body():
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, *self.RENDERED_FIELDS}
+
+        state = (self.is_published, self.published_at)
+        resync = (
+            not self._state.adding
+            and state != self._tag_state
+            and (update_fields is None or {"is_published", "published_at"} & set(update_fields))
+        )
+        if not resync:
+            super().save(*args, **kwargs)
+        else:
+            # Публикация или снятие с публикации: счетчики тегов уменьшаются
+            # по старому состоянию связей и увеличиваются по новому.
+            with transaction.atomic(using=kwargs.get("using")):
+                super().save(*args, **kwargs)
+                links = PostTag.objects.filter(post=self)
+                links.adjust_tag_counts(-1)
+                links.sync_with_posts()
+                links.adjust_tag_counts(1)
+        self._tag_state = state
+
+    def render_body(self):
+        """
+        Обновляет body_html, excerpt и body_text, если изменился текст или рендерер.
+
+        Returns:
+            bool: True, если поля были перерисованы.
+        """
+        if self.render_version == RENDERER_VERSION and self.body_hash == content_hash(self.body):
+            return False
+        self.body_html, self.excerpt, self.body_text, self.body_hash = render_cached(self.body)
+        self.render_version = RENDERER_VERSION
+        return True
+
+
+# Просмотры записей: приращения пишутся пачками в фоне (core.counters).
+post_views = WriteBehindCounter(Post, "views")
+
+
+class PostTagQuerySet(models.QuerySet):
+    def sync_with_posts(self):
+        """Копирует is_published и published_at записей в связи выборки."""
+        post = Post.objects.filter(pk=OuterRef("post_id"))
+        return self.update(
+            is_published=Subquery(post.values("is_published")[:1]),
+            published_at=Subquery(post.values("published_at")[:1]),
+        )
+
+    def adjust_tag_counts(self, sign):
+        """Прибавляет к post_count тегов число опубликованных связей выборки, умноженное на sign."""
+        counts = self.filter(is_published__in=[True]).order_by().values_list("tag_id").annotate(n=Count("pk"))
+        deltas = {tag_id: n * sign for tag_id, n in counts}
+        if deltas:
+            tag_counts.write(deltas)
+
+
+class PostTag(models.Model):
+    """
+    Связь записи с тегом.
+
+    is_published и published_at повторяют поля записи, чтобы страница
+    тега листалась по одному индексу idx_posttag_listing: условие по тегу
+    и публикации, сортировка по дате и id записи - без чтения и
+    сортировки всех записей тега. Поля обновляет Post.save().
+
+    Meta:
+        uniq_post_tag: Тег у записи не повторяется.
+        idx_posttag_listing: Страница тега (tag, is_published, published_at, post).
+    """
+
+    # Отдельные индексы внешних ключей не нужны: их покрывают
+    # uniq_post_tag (post, tag) и idx_posttag_listing (tag, ...).
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="post_tags", db_index=False)
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name="post_tags", db_index=False)
+    is_published = models.BooleanField(default=False, editable=False)
+    published_at = models.DateTimeField(null=True, editable=False)
+
+    objects = PostTagQuerySet.as_manager()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["post", "tag"], name="uniq_post_tag")]
+        indexes = [
+            models.Index(fields=["tag", "is_published", "published_at", "post"], name="idx_posttag_listing"),
+        ]
+
+    def __str__(self):
+        return f"{self.post_id}: {self.tag_id}"
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            self.is_published, self.published_at = self.post.is_published, self.post.published_at
+            previous_tag = None
+        else:
+            previous_tag = PostTag.objects.filter(pk=self.pk).values_list("tag_id", flat=True).first()
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+            if self.is_published and previous_tag != self.tag_id:
+                deltas = {self.tag_id: 1}
+                if previous_tag is not None:
+                    deltas[previous_tag] = -1
+                tag_counts.write(deltas)
+
+
+class PostImage(models.Model):
+    """
+    Изображение, загруженное для записи блога.
+
+    Attributes:
+        post (ForeignKey): Запись, к которой относится изображение.
+        image (ImageField): Оригинал загруженного файла.
+        width (PositiveIntegerField): Ширина оригинала.
+        height (PositiveIntegerField): Высота оригинала.
+        alt (CharField): Альтернативный текст.
+        variants (JSONField): Построенные WebP-варианты
+            (см. core.images.refresh_variants).
+        created_at (DateTimeField): Дата загрузки.
+    """
+
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="images")
+    image = models.ImageField(
+        upload_to="posts/%Y/%m/",
+        width_field="width",
+        height_field="height",
+        validators=[validate_upload_size],
+    )
+    width = models.PositiveIntegerField(null=True, editable=False)
+    height = models.PositiveIntegerField(null=True, editable=False)
+    alt = models.CharField(max_length=200, blank=True)
+    variants = models.JSONField(default=dict, blank=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.image.name
+
+
+# Ширина сегмента пути комментария: id в base36, дополненный нулями.
+# Шесть символов - до 2 176 782 335 комментариев; при одинаковой ширине
+# сегментов порядок строк совпадает с порядком обхода дерева.
+PATH_STEP = 6
+
+
+def path_segment(pk):
+    return int_to_base36(pk).rjust(PATH_STEP, "0")
+
+
+class Comment(models.Model):
+    """
+    Комментарий к записи блога; ответы образуют дерево.
+
+    Дерево хранится материализованным путем: path - сегменты id всех
+    предков и самого комментария (см. PATH_STEP). Сортировка по path дает
+    обход дерева в глубину, поэтому ветка любой глубины читается одним
+    запросом по диапазону индекса, без рекурсии.
+
+    Attributes:
+        post (ForeignKey): Запись.
+        author (ForeignKey): Автор комментария.
+        parent (ForeignKey): Комментарий, на который это ответ.
+        body (TextField): Текст комментария (выводится как текст).
+        path (CharField): Материализованный путь.
+        depth (PositiveSmallIntegerField): Глубина, у корневых - 0.
+        reply_count (PositiveIntegerField): Число прямых ответов.
+        created_at (DateTimeField): Дата создания.
+
+    Meta:
+        idx_comment_thread: Ветка записи в порядке дерева (post, path).
+        idx_comment_roots: Страницы корневых комментариев (post, depth, path).
+    """
+
+    MAX_DEPTH = 40
+
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="comments")
+    author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="comments")
+    parent = models.ForeignKey("self", on_delete=models.CASCADE, null=True, blank=True, related_name="replies")
+    body = models.TextField(max_length=5000)
+    path = models.CharField(max_length=PATH_STEP * (MAX_DEPTH + 1), editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    reply_count = models.PositiveIntegerField(default=0, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["path"]
+        indexes = [
+            models.Index(fields=["post", "path"], name="idx_comment_thread"),
+            models.Index(fields=["post", "depth", "path"], name="idx_comment_roots"),
+        ]
+
+    def __str__(self):
+        return f"Comment #{self.pk} on post #{self.post_id}"
+
+    def clean(self):
+        if self.parent_id is None:
+            return
+        if self.parent.post_id != self.post_id:
+            raise ValidationError("Reply must belong to the same post.", code="wrong_post")
+        if self.parent.depth >= self.MAX_DEPTH:
+            raise ValidationError("The thread is too deep to reply here.", code="too_deep")
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            super().save(*args, **kwargs)
+            return
+        # Путь содержит собственный id, поэтому он записывается после INSERT;
+        # в той же транзакции увеличивается счетчик ответов у родителя.
+        parent = self.parent if self.parent_id else None
+        self.depth = parent.depth + 1 if parent else 0
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+            self.path = (parent.path if parent else "") + path_segment(self.pk)
+            Comment.objects.filter(pk=self.pk).update(path=self.path)
+            if parent:
+                Comment.objects.filter(pk=parent.pk).update(reply_count=F("reply_count") + 1)
@@ -0,0 +1,89 @@
+import hashlib
+from html import unescape
+
+import markdown
+import nh3
+from django.core.cache import caches
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+# Версия рендерера: увеличивается при любом изменении, которое меняет
+# итоговый HTML (расширения Markdown, разрешенные теги, длина анонса).
+# Записи со старой версией перерисовывает manage.py rerender_posts.
+RENDERER_VERSION = 3
+
+MARKDOWN_EXTENSIONS = ["fenced_code", "tables", "sane_lists"]
+
+ALLOWED_TAGS = {
+    "a", "abbr", "blockquote", "br", "code", "del", "em", "h1", "h2", "h3", "h4", "h5", "h6",
+    "hr", "img", "li", "ol", "p", "pre", "strong", "table", "tbody", "td", "th", "thead", "tr", "ul",
+}
+ALLOWED_ATTRIBUTES = {
+    "a": {"href", "title"},
+    "abbr": {"title"},
+    "img": {"src", "alt", "title"},
+    "td": {"align"},
+    "th": {"align"},
+}
+
+EXCERPT_WORDS = 50
+
+# Кеш готового HTML по хешу исходника и версии рендерера.
+RENDER_CACHE_ALIAS = "default"
+RENDER_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+
+def content_hash(source):
+    """Хеш исходного текста вместе с версией рендерера."""
+    return hashlib.sha256(f"{RENDERER_VERSION}:{source}".encode()).hexdigest()
+
+
+def render_markdown(source):
+    """
+    Превращает Markdown в безопасный HTML, анонс для ленты и текст для поиска.
+
+    HTML из исходника не доверяется: после Markdown результат очищается
+    nh3 по списку разрешенных тегов и атрибутов, ссылкам добавляется
+    rel="noopener noreferrer nofollow".
+
+    Args:
+        source (str): Текст записи в Markdown.
+
+    Returns:
+        tuple[str, str, str]: Очищенный HTML, текстовый анонс и весь
+            текст без разметки.
+    """
+    html = markdown.markdown(source, extensions=MARKDOWN_EXTENSIONS, output_format="html")
+    html = nh3.clean(
+        html,
+        tags=ALLOWED_TAGS,
+        attributes=ALLOWED_ATTRIBUTES,
+        url_schemes={"http", "https", "mailto"},
+        link_rel="noopener noreferrer nofollow",
+    )
+    # Анонс и текст для поиска - обычный текст: сущности из HTML
+    # раскрываются, а экранирует его тот, кто выводит (шаблоны, ленты,
+    # сниппеты поиска). Адреса ссылок и изображений в текст не попадают.
+    text = " ".join(unescape(strip_tags(html)).split())
+    return html, Truncator(text).words(EXCERPT_WORDS), text
+
+
+def render_cached(source):
+    """
+    render_markdown() с кешем по хешу содержимого.
+
+    Одинаковые тексты (повторное сохранение, копии записей, повторный
+    запуск rerender_posts) рендерятся один раз.
+
+    Returns:
+        tuple[str, str, str, str]: HTML, анонс, текст и хеш содержимого.
+    """
+    digest = content_hash(source)
+    cache = caches[RENDER_CACHE_ALIAS]
+    key = f"markdown:{digest}"
+    rendered = cache.get(key)
+    if rendered is None:
+        rendered = render_markdown(source)
+        cache.set(key, rendered, RENDER_CACHE_TIMEOUT)
+    html, excerpt, text = rendered
+    return html, excerpt, text, digest
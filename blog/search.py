@@ -0,0 +1,298 @@
+import re
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+
+# Маркеры подсветки в сниппетах базы. Сниппет экранируется целиком, и
+# только потом маркеры заменяются на <mark>, чтобы HTML из текста записи
+# не попал на страницу.
+MARK_START = "\x02"
+MARK_END = "\x03"
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def highlight(snippet):
+    """Превращает сниппет с маркерами в безопасный HTML с <mark>."""
+    html = escape(snippet).replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+    return mark_safe(html)
+
+
+def query_terms(query, limit=16):
+    """Слова поискового запроса без операторов и спецсимволов."""
+    return WORD_RE.findall(query)[:limit]
+
+
+@dataclass
+class SearchResult:
+    post: Post
+    snippet: str
+
+
+@dataclass
+class SearchPage:
+    """
+    Страница результатов поиска.
+
+    Общее число совпадений не считается: для частых слов это полный
+    проход по индексу. Вместо этого читается на одну строку больше
+    страницы, чтобы узнать, есть ли следующая.
+    """
+
+    results: list = field(default_factory=list)
+    number: int = 1
+    has_next: bool = False
+
+    @property
+    def has_previous(self):
+        return self.number > 1
+
+    def __iter__(self):
+        return iter(self.results)
+
+    def __len__(self):
+        return len(self.results)
+
+
+class SearchBackend:
+    """
+    Поисковый индекс записей блога.
+
+    В индекс попадают только опубликованные записи. Индексируется и
+    показывается в сниппетах текст без разметки (Post.body_text), чтобы
+    адреса ссылок и синтаксис Markdown не находились поиском. Индекс
+    хранится в той же базе, что и записи, и обновляется в той же транзакции.
+
+    Attributes:
+        max_candidates (int): Сколько самых новых совпадений ранжировать.
+            Для частых слов совпадает почти весь архив, и подсчет
+            релевантности для каждой записи стоит сотни миллисекунд;
+            ограничение делает запрос O(max_candidates), а для частых
+            слов выдача смещается к новым записям.
+    """
+
+    max_candidates = 2000
+
+    def index(self, ids):
+        """Переиндексирует записи с указанными id (удаляет неопубликованные)."""
+        raise NotImplementedError
+
+    def remove(self, ids):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def prune(self):
+        """Удаляет из индекса удаленные и снятые с публикации записи одним запросом."""
+        raise NotImplementedError
+
+    def optimize(self):
+        """Обслуживание индекса после массовой загрузки."""
+
+    def search_ids(self, query, limit, offset):
+        """Возвращает пары (id записи, сниппет с маркерами) по релевантности."""
+        raise NotImplementedError
+
+    def search(self, query, page=1, per_page=20):
+        """
+        Ищет опубликованные записи и возвращает страницу результатов.
+
+        Args:
+            query (str): Запрос пользователя; операторы не поддерживаются,
+                ищутся записи, содержащие все слова.
+            page (int): Номер страницы, начиная с 1.
+            per_page (int): Размер страницы.
+
+        Returns:
+            SearchPage: Записи с подсвеченными сниппетами.
+        """
+        if not query_terms(query):
+            return SearchPage(number=page)
+        rows = self.search_ids(query, per_page + 1, (page - 1) * per_page)
+        posts = (
+            Post.objects.select_related("author")
+            .only("title", "published_at", "author__username")
+            .in_bulk([post_id for post_id, _snippet in rows[:per_page]])
+        )
+        results = [
+            SearchResult(posts[post_id], highlight(snippet))
+            for post_id, snippet in rows[:per_page]
+            if post_id in posts
+        ]
+        return SearchPage(results, page, has_next=len(rows) > per_page)
+
+    @staticmethod
+    def placeholders(ids):
+        return ", ".join(["%s"] * len(ids))
+
+
+class SqliteSearchBackend(SearchBackend):
+    """
+    Индекс в виртуальной таблице FTS5 blog_post_fts (rowid = id записи).
+
+    Релевантность - bm25, совпадения в заголовке весят в 10 раз больше,
+    чем в тексте.
+    """
+
+    def index(self, ids):
+        ids = list(ids)
+        if not ids:
+            return
+        marks = self.placeholders(ids)
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM blog_post_fts WHERE rowid IN ({marks})", ids)
+            cursor.execute(
+                "INSERT INTO blog_post_fts (rowid, title, body) "
+                f"SELECT id, title, body_text FROM blog_post WHERE id IN ({marks}) AND is_published",
+                ids,
+            )
+
+    def remove(self, ids):
+        ids = list(ids)
+        if ids:
+            with connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM blog_post_fts WHERE rowid IN ({self.placeholders(ids)})", ids)
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM blog_post_fts")
+
+    def prune(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM blog_post_fts WHERE rowid NOT IN (SELECT id FROM blog_post WHERE is_published)")
+
+    def optimize(self):
+        with connection.cursor() as cursor:
+            cursor.execute("INSERT INTO blog_post_fts (blog_post_fts) VALUES ('optimize')")
+
+    def search_ids(self, query, limit, offset):
+        # Каждое слово в кавычках: синтаксис FTS5 из запроса не интерпретируется.
+        match = " ".join('"%s"' % term for term in query_terms(query))
+        with connection.cursor() as cursor:
+            # Нижняя граница rowid среди max_candidates новейших совпадений:
+            # FTS5 перебирает совпадения в порядке rowid без подсчета bm25.
+            cursor.execute(
+                "SELECT rowid, snippet(blog_post_fts, 1, %s, %s, '…', 24) FROM blog_post_fts "
+                "WHERE blog_post_fts MATCH %s AND rowid >= coalesce(("
+                "SELECT rowid FROM blog_post_fts WHERE blog_post_fts MATCH %s "
+                "ORDER BY rowid DESC LIMIT 1 OFFSET %s), 0) "
+                "ORDER BY bm25(blog_post_fts, 10.0, 1.0) LIMIT %s OFFSET %s",
+                [MARK_START, MARK_END, match, match, self.max_candidates - 1, limit, offset],
+            )
+            return cursor.fetchall()
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    Индекс в таблице blog_post_search со столбцом tsvector под GIN-индексом.
+
+    Заголовок получает вес A, текст - вес B; конфигурация разбора текста
+    берется из settings.BLOG_SEARCH_CONFIG.
+    """
+
+    def index(self, ids):
+        ids = list(ids)
+        if not ids:
+            return
+        config = settings.BLOG_SEARCH_CONFIG
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM blog_post_search WHERE post_id = ANY(%s)", [ids])
+            cursor.execute(
+                "INSERT INTO blog_post_search (post_id, document) "
+                "SELECT id, setweight(to_tsvector(%s::regconfig, title), 'A') "
+                "|| setweight(to_tsvector(%s::regconfig, body_text), 'B') "
+                "FROM blog_post WHERE id = ANY(%s) AND is_published",
+                [config, config, ids],
+            )
+
+    def remove(self, ids):
+        ids = list(ids)
+        if ids:
+            with connection.cursor() as cursor:
+                cursor.execute("DELETE FROM blog_post_search WHERE post_id = ANY(%s)", [ids])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute("TRUNCATE blog_post_search")
+
+    def prune(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "DELETE FROM blog_post_search s WHERE NOT EXISTS ("
+                "SELECT 1 FROM blog_post p WHERE p.id = s.post_id AND p.is_published)"
+            )
+
+    def search_ids(self, query, limit, offset):
+        config = settings.BLOG_SEARCH_CONFIG
+        options = f"StartSel={MARK_START}, StopSel={MARK_END}, MinWords=15, MaxWords=35"
+        with connection.cursor() as cursor:
+            # ts_headline считается только для строк страницы: PostgreSQL
+            # вычисляет дорогие выражения списка выборки после LIMIT.
+            cursor.execute(
+                "WITH q AS (SELECT plainto_tsquery(%s::regconfig, %s) AS q), "
+                "candidates AS ("
+                "SELECT s.post_id, s.document FROM blog_post_search s, q WHERE s.document @@ q.q "
+                "ORDER BY s.post_id DESC LIMIT %s) "
+                "SELECT c.post_id, ts_headline(%s::regconfig, p.body_text, q.q, %s) "
+                "FROM candidates c JOIN blog_post p ON p.id = c.post_id, q "
+                "ORDER BY ts_rank_cd(c.document, q.q) DESC, c.post_id DESC LIMIT %s OFFSET %s",
+                [config, " ".join(query_terms(query)), self.max_candidates, config, options, limit, offset],
+            )
+            return cursor.fetchall()
+
+
+class LikeSearchBackend(SearchBackend):
+    """
+    Поиск через icontains без отдельного индекса.
+
+    Используется для баз без полнотекстового поиска и как точка отсчета
+    в бенчмарке: каждый запрос - полный просмотр таблицы записей.
+    """
+
+    def index(self, ids):
+        pass
+
+    def remove(self, ids):
+        pass
+
+    def clear(self):
+        pass
+
+    def prune(self):
+        pass
+
+    def search_ids(self, query, limit, offset):
+        queryset = Post.objects.published()
+        for term in query_terms(query):
+            queryset = queryset.filter(body_text__icontains=term)
+        rows = queryset.order_by("-published_at", "-id").values_list("id", "body_text")[offset:offset + limit]
+        return [(post_id, self.make_snippet(body, query)) for post_id, body in rows]
+
+    @staticmethod
+    def make_snippet(body, query, width=160):
+        terms = [term.lower() for term in query_terms(query)]
+        lowered = body.lower()
+        start = min((lowered.find(term) for term in terms if term in lowered), default=0)
+        snippet = body[max(0, start - width // 4):][:width]
+        for term in terms:
+            snippet = re.sub(
+                f"({re.escape(term)})", f"{MARK_START}\\1{MARK_END}", snippet, flags=re.IGNORECASE
+            )
+        return snippet
+
+
+BACKENDS = {
+    "sqlite": SqliteSearchBackend,
+    "postgresql": PostgresSearchBackend,
+}
+
+
+def get_search_backend():
+    """Поисковый бэкенд для текущей базы данных."""
+    return BACKENDS.get(connection.vendor, LikeSearchBackend)()
@@ -0,0 +1,67 @@
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from core.fragments import track_fragments
+from core.images import track_image_variants
+
+from .feeds import mark_posts_deleted
+from .models import Comment, Post, PostImage, PostTag, Tag, tag_counts
+from .search import get_search_backend
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, raw=False, **kwargs):
+    """Обновляет запись в поисковом индексе (снятые с публикации удаляются)."""
+    if not raw:
+        get_search_backend().index([instance.pk])
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    get_search_backend().remove([instance.pk])
+
+
+@receiver(post_delete, sender=Post)
+def touch_feeds(sender, instance, **kwargs):
+    """Меняет версию лент и карты сайта: у удаленной записи нет updated_at."""
+    mark_posts_deleted()
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_reply_count(sender, instance, **kwargs):
+    """Уменьшает счетчик ответов родителя удаленного комментария."""
+    if instance.parent_id:
+        Comment.objects.filter(pk=instance.parent_id).update(reply_count=F("reply_count") - 1)
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def count_added_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Учитывает связи, добавленные через post.tags.add() или tag.posts.add().
+
+    add() создает строки bulk_create, минуя PostTag.save(), поэтому
+    состояние публикации копируется в них здесь. Удаление учитывает
+    decrement_tag_count.
+    """
+    if action != "post_add" or not pk_set:
+        return
+    if reverse:
+        links = PostTag.objects.filter(tag=instance, post_id__in=pk_set)
+    else:
+        links = PostTag.objects.filter(post=instance, tag_id__in=pk_set)
+    links.sync_with_posts()
+    links.adjust_tag_counts(1)
+
+
+@receiver(post_delete, sender=PostTag)
+def decrement_tag_count(sender, instance, **kwargs):
+    """Уменьшает счетчик тега при удалении связи, в том числе вместе с записью."""
+    if instance.is_published:
+        tag_counts.write({instance.tag_id: -1})
+
+
+track_image_variants(PostImage, "image", "variants")
+track_fragments(Post)
+track_fragments(Tag)
+track_fragments(Comment)
@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.db.models import F, Max
+from django.urls import reverse
+
+from core.sitemaps import Sitemap
+
+from .feeds import posts_last_modified
+from .models import Post
+
+
+class PostSitemap(Sitemap):
+    """
+    Опубликованные записи блога.
+
+    Страница N содержит записи с id в диапазоне
+    ((N - 1) * page_size, N * page_size], поэтому любая страница читается
+    по первичному ключу без OFFSET. Из-за черновиков и удаленных записей
+    страницы бывают неполными; страницы без записей в индекс не попадают.
+
+    Args:
+        page_size (int, optional): Размер диапазона id, по умолчанию
+            settings.SITEMAP_PAGE_SIZE (не больше 50 000 по протоколу).
+    """
+
+    def __init__(self, page_size=None):
+        self._page_size = page_size
+
+    @property
+    def page_size(self):
+        return self._page_size or settings.SITEMAP_PAGE_SIZE
+
+    def last_modified(self):
+        return posts_last_modified()
+
+    def pages(self):
+        # Один проход по записям; результат кешируется вместе с индексом.
+        return (
+            Post.objects.published()
+            .annotate(page=(F("id") - 1) / self.page_size + 1)
+            .values_list("page")
+            .annotate(lastmod=Max("updated_at"))
+            .order_by("page")
+        )
+
+    def has_page(self, page):
+        # Без прохода по всем записям, как в pages(): одна проверка диапазона id.
+        size = self.page_size
+        return page >= 1 and Post.objects.published().filter(id__gt=(page - 1) * size, id__lte=page * size).exists()
+
+    def items(self, page):
+        size = self.page_size
+        rows = (
+            Post.objects.published()
+            .filter(id__gt=(page - 1) * size, id__lte=page * size)
+            .order_by("id")
+            .values_list("id", "updated_at")
+        )
+        for post_id, updated_at in rows.iterator(chunk_size=2000):
+            yield reverse("blog:post", args=[post_id]), updated_at
@@ -0,0 +1,47 @@
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Tag
+
+TAG_CLOUD_KEY = "blog:tag-cloud:{size}"
+
+# Число размеров шрифта в облаке (классы tag-cloud__tag--1 ... --5).
+CLOUD_WEIGHTS = 5
+
+
+def tag_cloud(size=None):
+    """
+    Самые популярные теги для облака.
+
+    Список читается по индексу idx_tag_cloud из готовых счетчиков
+    post_count, без GROUP BY по связям, и кешируется на
+    settings.BLOG_TAG_CLOUD_TIMEOUT секунд.
+
+    Args:
+        size (int, optional): Число тегов, по умолчанию BLOG_TAG_CLOUD_SIZE.
+
+    Returns:
+        list[dict]: name, slug, post_count и weight (1..CLOUD_WEIGHTS) в
+            порядке названий.
+    """
+    size = size or settings.BLOG_TAG_CLOUD_SIZE
+    key = TAG_CLOUD_KEY.format(size=size)
+    tags = cache.get(key)
+    if tags is None:
+        tags = list(
+            Tag.objects.filter(post_count__gt=0)
+            .order_by("-post_count", "name")
+            .values("name", "slug", "post_count")[:size]
+        )
+        # Вес по логарифму числа записей: иначе пара популярных тегов
+        # оставит всем остальным минимальный размер.
+        counts = [math.log(tag["post_count"]) for tag in tags]
+        low, high = min(counts, default=0), max(counts, default=0)
+        for tag, count in zip(tags, counts):
+            share = (count - low) / (high - low) if high > low else 1
+            tag["weight"] = 1 + round(share * (CLOUD_WEIGHTS - 1))
+        tags.sort(key=lambda tag: tag["name"])
+        cache.set(key, tags, settings.BLOG_TAG_CLOUD_TIMEOUT)
+    return tags
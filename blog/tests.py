@@ -1,3 +1,891 @@
-from django.test import TestCase
+import multiprocessing
+import random
+import shutil
+import tempfile
+from datetime import timedelta
+from xml.etree import ElementTree
+from io import StringIO
+from unittest import mock
 
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
 
+from core.fragments import get_stamps, stamp_key
+from core.testing import make_image
+
+from . import rendering
+from .management.commands import rerender_posts
+from .comments import build_tree, comment_page
+from .models import Comment, Post, PostImage, PostTag, Tag, path_segment, post_views
+from .search import LikeSearchBackend, get_search_backend
+from .tags import tag_cloud
+
+
+class PostModelTests(TestCase):
+    """Тесты модели записи"""
+
+    def setUp(self):
+        self.author = get_user_model().objects.create_user(
+            email="author@example.com", username="author", password="ComplexPass123!"
+        )
+
+    def test_published_at_set_on_publish(self):
+        """Тест: дата публикации выставляется при публикации"""
+        draft = Post.objects.create(author=self.author, title="Draft", body="text")
+        self.assertIsNone(draft.published_at)
+
+        draft.is_published = True
+        draft.save()
+        self.assertIsNotNone(draft.published_at)
+
+
+class BlogIndexViewTests(TestCase):
+    """Тесты ленты блога"""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = get_user_model().objects.create_user(
+            email="author@example.com", username="author", password="ComplexPass123!"
+        )
+        now = timezone.now()
+        # 45 записей, у пар соседних одинаковая дата: курсор должен различать их по id.
+        Post.objects.bulk_create(
+            Post(
+                author=author,
+                title=f"Post {n}",
+                body="text",
+                is_published=True,
+                published_at=now - timedelta(minutes=n // 2),
+            )
+            for n in range(45)
+        )
+        Post.objects.create(author=author, title="Draft", body="text")
+
+    def setUp(self):
+        cache.clear()
+
+    def collect_pages(self):
+        titles, pages, url = [], [], reverse("blog:index")
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            page = response.context["page"]
+            pages.append(page)
+            titles += [post.title for post in page]
+            url = f"{reverse('blog:index')}?cursor={page.next_cursor}" if page.has_next else None
+        return titles, pages
+
+    def test_pages_cover_all_published_posts(self):
+        """Тест: страницы по курсору проходят все опубликованные записи без повторов"""
+        titles, pages = self.collect_pages()
+
+        self.assertEqual([len(page) for page in pages], [20, 20, 5])
+        self.assertEqual(len(titles), 45)
+        self.assertEqual(len(set(titles)), 45)
+        self.assertNotIn("Draft", titles)
+        self.assertFalse(pages[0].has_previous)
+
+    def test_previous_cursor_returns_previous_page(self):
+        """Тест: курсор назад возвращает предыдущую страницу"""
+        _titles, pages = self.collect_pages()
+
+        response = self.client.get(reverse("blog:index"), {"cursor": pages[2].previous_cursor})
+        self.assertEqual(list(response.context["page"]), pages[1].object_list)
+        self.assertTrue(response.context["page"].has_next)
+
+    def test_invalid_cursor(self):
+        """Тест: поврежденный курсор дает 404"""
+        for cursor in ("garbage", "WyJuZXh0IiwgIngiLCAxXQ"):
+            response = self.client.get(reverse("blog:index"), {"cursor": cursor})
+            self.assertEqual(response.status_code, 404)
+
+    def test_query_count(self):
+        """Тест: страница ленты - один запрос на любой глубине (облако тегов и боковая колонка берутся из кеша)"""
+        _titles, pages = self.collect_pages()
+        cache.clear()
+        tag_cloud()
+        # Первая страница после очистки кеша отрисовывает и фрагмент боковой колонки.
+        with self.assertNumQueries(2):
+            self.client.get(reverse("blog:index"), {"cursor": pages[1].next_cursor})
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("blog:index"))
+        self.assertContains(response, "Post 0")
+
+    def test_feed_uses_index(self):
+        """Тест: лента читается по индексу idx_post_published без сортировки"""
+        if connection.vendor != "sqlite":
+            self.skipTest("План запроса проверяется для SQLite")
+        plan = Post.objects.published().order_by("-published_at", "-id")[:21].explain()
+        self.assertIn("idx_post_published", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+
+class SearchTests(TestCase):
+    """Тесты полнотекстового поиска"""
+
+    def setUp(self):
+        cache.clear()
+        self.author = get_user_model().objects.create_user(
+            email="author@example.com", username="author", password="ComplexPass123!"
+        )
+        self.django_post = Post.objects.create(
+            author=self.author, title="Django tips", body="How to tune `<b>queries</b>` in Django.", is_published=True
+        )
+        self.python_post = Post.objects.create(
+            author=self.author, title="Python", body="Django and python generators.", is_published=True
+        )
+        self.draft = Post.objects.create(author=self.author, title="Draft", body="Unpublished django notes")
+
+    def search(self, query):
+        return [result.post for result in get_search_backend().search(query)]
+
+    @staticmethod
+    def rendered(post):
+        """Запись для bulk_create с заполненными полями рендеринга, как после save()."""
+        post.render_body()
+        return post
+
+    def test_index_follows_save_and_delete(self):
+        """Тест: индекс обновляется при изменении, снятии с публикации и удалении"""
+        self.assertEqual(self.search("django"), [self.django_post, self.python_post])
+
+        self.draft.is_published = True
+        self.draft.save()
+        self.assertIn(self.draft, self.search("unpublished"))
+
+        self.python_post.is_published = False
+        self.python_post.save()
+        self.assertNotIn(self.python_post, self.search("django"))
+
+        self.django_post.delete()
+        self.assertEqual(self.search("tune"), [])
+
+    def test_ranking_limited_to_newest_candidates(self):
+        """Тест: ранжируются только max_candidates самых новых совпадений"""
+        backend = get_search_backend()
+        backend.max_candidates = 1
+        self.assertEqual([result.post for result in backend.search("django")], [self.python_post])
+
+    def test_all_words_required_and_syntax_ignored(self):
+        """Тест: нужны все слова запроса, операторы FTS не интерпретируются"""
+        self.assertEqual(self.search("django generators"), [self.python_post])
+        self.assertEqual(self.search('django OR "x" NEAR(*'), [])
+        self.assertEqual(self.search("  !!! "), [])
+
+    def test_search_view_highlights_escaped_snippet(self):
+        """Тест: страница поиска подсвечивает совпадения и экранирует HTML записи"""
+        response = self.client.get(reverse("blog:search"), {"q": "queries"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "&lt;b&gt;<mark>queries</mark>&lt;/b&gt;", html=False)
+        self.assertContains(response, "Django tips")
+
+    def test_search_view_pages(self):
+        """Тест: выдача листается страницами, глубина ограничена"""
+        Post.objects.bulk_create(
+            self.rendered(Post(author=self.author, title=f"Bulk {n}", body="paging", is_published=True))
+            for n in range(25)
+        )
+        call_command("rebuild_search_index", "--chunk-size", "10", stdout=StringIO())
+
+        first = self.client.get(reverse("blog:search"), {"q": "paging"}).context["page"]
+        second = self.client.get(reverse("blog:search"), {"q": "paging", "page": 2}).context["page"]
+        self.assertEqual((len(first), first.has_next), (20, True))
+        self.assertEqual((len(second), second.has_next), (5, False))
+        self.assertEqual(self.client.get(reverse("blog:search"), {"q": "x", "page": 51}).status_code, 404)
+
+    def test_rebuild_search_index(self):
+        """Тест: перестройка индексирует записи, созданные без сигналов"""
+        Post.objects.bulk_create([self.rendered(Post(author=self.author, title="Bulk", body="imported", is_published=True))])
+        self.assertEqual(self.search("imported"), [])
+
+        out = StringIO()
+        call_command("rebuild_search_index", stdout=out)
+        self.assertIn("Indexed 3 posts", out.getvalue())
+        self.assertEqual(len(self.search("imported")), 1)
+
+    def test_rebuild_search_index_keeps_search_available(self):
+        """Тест: перестройка не очищает индекс заранее и удаляет записи, снятые с публикации в обход сигналов"""
+        Post.objects.filter(pk=self.python_post.pk).update(is_published=False)
+        backend_class = type(get_search_backend())
+        index = backend_class.index
+        seen = []
+
+        def index_and_search(backend, ids):
+            seen.append(self.search("tune"))
+            return index(backend, ids)
+
+        with mock.patch.object(backend_class, "index", index_and_search):
+            call_command("rebuild_search_index", "--chunk-size", "1", stdout=StringIO())
+        self.assertTrue(all(found == [self.django_post] for found in seen))
+        self.assertEqual(self.search("generators"), [])
+        self.assertEqual(self.search("django"), [self.django_post])
+
+    def test_markdown_syntax_not_indexed(self):
+        """Тест: ищется и показывается текст без разметки, адреса ссылок и изображений не находятся"""
+        post = Post.objects.create(
+            author=self.author,
+            title="Links",
+            body="See **docs** at [here](https://example.com/guide) ![logo](/media/logo.png)",
+            is_published=True,
+        )
+        self.assertEqual(self.search("https"), [])
+        self.assertEqual(self.search("png"), [])
+        for backend in (get_search_backend(), LikeSearchBackend()):
+            with self.subTest(backend=type(backend).__name__):
+                page = backend.search("docs")
+                self.assertEqual([result.post for result in page], [post])
+                self.assertIn("See <mark>docs</mark> at here", page.results[0].snippet)
+                self.assertNotIn("*", page.results[0].snippet)
+
+    def test_like_backend_snippet(self):
+        """Тест: запасной поиск через LIKE находит записи и подсвечивает слова"""
+        page = LikeSearchBackend().search("python")
+        self.assertEqual([result.post for result in page], [self.python_post])
+        self.assertIn("<mark>python</mark>", page.results[0].snippet)
+
+
+class PostRenderingTests(TestCase):
+    """Тесты предварительного рендеринга Markdown"""
+
+    def setUp(self):
+        cache.clear()
+        self.author = get_user_model().objects.create_user(
+            email="author@example.com", username="author", password="ComplexPass123!"
+        )
+
+    def test_markdown_rendered_and_sanitized(self):
+        """Тест: Markdown превращается в HTML без опасной разметки"""
+        post = Post.objects.create(
+            author=self.author,
+            title="Post",
+            body="**bold** [link](javascript:alert(1)) <script>alert(1)</script>\n\n```\ncode\n```",
+        )
+        self.assertIn("<strong>bold</strong>", post.body_html)
+        self.assertIn("<pre><code>code", post.body_html)
+        self.assertNotIn("<script", post.body_html)
+        self.assertNotIn("javascript:", post.body_html)
+        self.assertEqual(post.render_version, rendering.RENDERER_VERSION)
+
+    def test_excerpt_is_plain_text(self):
+        """Тест: анонс - текст без тегов, ограниченный по числу слов"""
+        post = Post.objects.create(author=self.author, title="Post", body="# Title\n\n" + "word " * 100)
+        self.assertTrue(post.excerpt.startswith("Title word"))
+        self.assertNotIn("<", post.excerpt)
+        self.assertEqual(len(post.excerpt.split()), rendering.EXCERPT_WORDS)
+
+    def test_excerpt_unescaped_once(self):
+        """Тест: анонс хранится без HTML-сущностей и экранируется на странице один раз"""
+        post = Post.objects.create(author=self.author, title="Post", body="Tom & Jerry: a < b", is_published=True)
+        self.assertEqual(post.excerpt, "Tom & Jerry: a < b")
+        response = self.client.get(reverse("blog:index"))
+        self.assertContains(response, "Tom &amp; Jerry: a &lt; b")
+        self.assertNotContains(response, "&amp;amp;")
+
+    def test_unchanged_body_not_rerendered(self):
+        """Тест: неизмененный текст не рендерится повторно, одинаковые тексты - один раз"""
+        with mock.patch("blog.rendering.render_markdown", wraps=rendering.render_markdown) as render:
+            post = Post.objects.create(author=self.author, title="Post", body="Same *text*")
+            post.title = "Renamed"
+            post.save()
+            post.save(update_fields=["title"])
+            Post.objects.create(author=self.author, title="Copy", body="Same *text*")
+            self.assertEqual(render.call_count, 1)
+
+            post.body = "New text"
+            post.save(update_fields=["body"])
+            self.assertEqual(render.call_count, 2)
+        post.refresh_from_db()
+        self.assertEqual(post.body_html, "<p>New text</p>")
+
+    def test_rerender_posts(self):
+        """Тест: команда перерисовывает устаревшие записи, в том числе в пуле процессов"""
+        Post.objects.bulk_create(
+            Post(author=self.author, title=f"Post {n}", body=f"*post {n}*") for n in range(7)
+        )
+        Post.objects.create(author=self.author, title="Current", body="current")
+
+        for workers in ("1", "2"):
+            with self.subTest(workers=workers):
+                if workers != "1" and multiprocessing.current_process().daemon:
+                    # Процесс параллельного прогона тестов не может запускать свои процессы.
+                    self.skipTest("process pool is unavailable in a parallel test worker")
+                Post.objects.exclude(title="Current").update(render_version=0, body_html="")
+                out = StringIO()
+                call_command("rerender_posts", "--workers", workers, "--batch-size", "3", stdout=out)
+                self.assertIn("Rendered 7 posts", out.getvalue())
+                self.assertFalse(Post.objects.exclude(render_version=rendering.RENDERER_VERSION).exists())
+                self.assertEqual(Post.objects.get(title="Post 3").body_html, "<p><em>post 3</em></p>")
+
+        out = StringIO()
+        call_command("rerender_posts", "--all", "--workers", "1", stdout=out)
+        self.assertIn("Rendered 8 posts", out.getvalue())
+
+    def test_rerender_posts_skips_edited_posts(self):
+        """Тест: команда не затирает HTML записи, отредактированной во время рендеринга"""
+        post = Post.objects.create(author=self.author, title="Post", body="*old*")
+        Post.objects.create(author=self.author, title="Other", body="*other*")
+        Post.objects.update(render_version=0, body_html="")
+        render_rows = rerender_posts.render_rows
+
+        def render_and_edit(rows):
+            rendered = render_rows(rows)
+            edited = Post.objects.get(pk=post.pk)
+            edited.body = "*new*"
+            edited.save()
+            return rendered
+
+        out = StringIO()
+        with mock.patch.object(rerender_posts, "render_rows", render_and_edit):
+            call_command("rerender_posts", "--workers", "1", stdout=out)
+        self.assertIn("Rendered 1 posts", out.getvalue())
+        self.assertIn("skipped 1", out.getvalue())
+        self.assertEqual(Post.objects.get(pk=post.pk).body_html, "<p><em>new</em></p>")
+        self.assertEqual(Post.objects.get(title="Other").body_html, "<p><em>other</em></p>")
+
+    @override_settings(COUNTERS_FLUSH_INTERVAL=3600)
+    def test_detail_view(self):
+        """Тест: страница записи выводит готовый HTML (запись, изображения, теги, комментарии и боковая колонка при пустом кеше фрагментов - пять запросов), черновики недоступны"""
+        self.addCleanup(post_views.flush)
+        post = Post.objects.create(author=self.author, title="Post", body="Hello **world**", is_published=True)
+        draft = Post.objects.create(author=self.author, title="Draft", body="draft")
+
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse("blog:post", args=[post.pk]))
+        self.assertContains(response, "<p>Hello <strong>world</strong></p>", html=True)
+        self.assertEqual(self.client.get(reverse("blog:post", args=[draft.pk])).status_code, 404)
+
+
+class PostImageUploadTests(TestCase):
+    """Тесты загрузки изображений к записи"""
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        media = override_settings(MEDIA_ROOT=root, FILE_UPLOAD_TEMP_DIR=root)
+        media.enable()
+        self.addCleanup(media.disable)
+        User = get_user_model()
+        self.author = User.objects.create_user(email="author@example.com", username="author", password="ComplexPass123!")
+        self.other = User.objects.create_user(email="other@example.com", username="other", password="ComplexPass123!")
+        self.post = Post.objects.create(author=self.author, title="Post", body="text", is_published=True)
+        self.url = reverse("blog:post-image-upload", args=[self.post.pk])
+
+    def test_author_uploads_image(self):
+        """Тест: автор загружает изображение, размеры сохраняются, страница записи выводит его"""
+        self.client.force_login(self.author)
+        response = self.client.post(self.url, {"image": make_image(640, 480), "alt": "Cover"})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.json()["width"], response.json()["height"]), (640, 480))
+        image = PostImage.objects.get(post=self.post)
+        cache.clear()
+        self.assertContains(self.client.get(reverse("blog:post", args=[self.post.pk])), 'alt="Cover"')
+        self.assertEqual(image.variants, {})
+
+    def test_other_user_gets_404(self):
+        """Тест: загрузить изображение к чужой записи нельзя"""
+        self.client.force_login(self.other)
+        response = self.client.post(self.url, {"image": make_image(10, 10)})
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(PostImage.objects.exists())
+
+    def test_not_an_image_rejected(self):
+        """Тест: файл, не являющийся изображением, отклоняется"""
+        self.client.force_login(self.author)
+        response = self.client.post(self.url, {"image": SimpleUploadedFile("a.png", b"not an image")})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("image", response.json()["errors"])
+
+
+class FeedAndSitemapTests(TestCase):
+    """Тесты лент и карты сайта"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = get_user_model().objects.create_user(
+            email="author@example.com", username="author", password="ComplexPass123!"
+        )
+        cls.posts = [
+            Post.objects.create(author=cls.author, title=f"Post {n}", body=f"Body {n}", is_published=True)
+            for n in range(5)
+        ]
+        Post.objects.create(author=cls.author, title="Draft", body="draft")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_feeds_stream_published_posts(self):
+        """Тест: Atom и RSS отдаются потоком и содержат только опубликованные записи"""
+        for name, item_tag in (("blog:feed-atom", "{http://www.w3.org/2005/Atom}entry"), ("blog:feed-rss", "item")):
+            with self.subTest(feed=name):
+                response = self.client.get(reverse(name))
+                self.assertTrue(response.streaming)
+                root = ElementTree.fromstring(b"".join(response.streaming_content))
+                self.assertEqual(len(root.findall(f".//{item_tag}")), 5)
+                self.assertNotIn(b"Draft", ElementTree.tostring(root))
+
+    def test_conditional_get_and_cache(self):
+        """Тест: без изменений - 304 за один запрос к базе, после изменения - новый ETag"""
+        url = reverse("blog:feed-atom")
+        first = self.client.get(url)
+        content = b"".join(first.streaming_content)
+        self.assertIn("Last-Modified", first)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, headers={"if-none-match": first["ETag"]})
+        self.assertEqual(response.status_code, 304)
+
+        # Повторный запрос без условий отдается из кеша целиком.
+        with self.assertNumQueries(1):
+            cached = self.client.get(url)
+        self.assertFalse(cached.streaming)
+        self.assertEqual(cached.content, content)
+
+        self.posts[0].title = "Changed"
+        self.posts[0].save()
+        response = self.client.get(url, headers={"if-none-match": first["ETag"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Changed", b"".join(response.streaming_content))
+
+        etag = response["ETag"]
+        self.posts[1].delete()
+        self.assertNotEqual(self.client.get(url)["ETag"], etag)
+
+    def test_rerender_changes_etag(self):
+        """Тест: после rerender_posts лента отдается заново, с новыми анонсами, а записи переиндексированы"""
+        url = reverse("blog:feed-atom")
+        first = self.client.get(url)
+        b"".join(first.streaming_content)
+        stamp = get_stamps([stamp_key(Post)])[stamp_key(Post)]
+
+        def render_cached(body):
+            return "<p>Rerendered</p>", "Rerendered excerpt", "Rerendered text", "digest"
+
+        with mock.patch.object(rerender_posts, "render_cached", render_cached):
+            call_command("rerender_posts", "--all", "--workers", "1", stdout=StringIO())
+        response = self.client.get(url, headers={"if-none-match": first["ETag"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Rerendered excerpt", b"".join(response.streaming_content))
+        self.assertNotEqual(get_stamps([stamp_key(Post)])[stamp_key(Post)], stamp)
+        self.assertEqual(len(get_search_backend().search("rerendered")), 5)
+
+    @override_settings(SITEMAP_PAGE_SIZE=2)
+    def test_sitemap_index_and_pages(self):
+        """Тест: индекс карты сайта ссылается на страницы, страницы читаются по диапазону id"""
+        ns = {"s": "http://www.sitemaps.org/schemas/sitemap/0.9"}
+        response = self.client.get(reverse("sitemap"))
+        index = ElementTree.fromstring(b"".join(response.streaming_content))
+        locations = [loc.text for loc in index.findall("s:sitemap/s:loc", ns)]
+        first_id = self.posts[0].pk
+        pages = sorted({(post.pk - 1) // 2 + 1 for post in self.posts})
+        self.assertEqual(
+            locations,
+            ["http://testserver/sitemap-pages-1.xml"]
+            + [f"http://testserver/sitemap-posts-{page}.xml" for page in pages],
+        )
+
+        response = self.client.get(reverse("sitemap-section", kwargs={"section": "posts", "page": pages[0]}))
+        urlset = ElementTree.fromstring(b"".join(response.streaming_content))
+        self.assertIn(
+            f"http://testserver{reverse('blog:post', args=[first_id])}",
+            [loc.text for loc in urlset.findall("s:url/s:loc", ns)],
+        )
+
+        response = self.client.get(reverse("sitemap-section", kwargs={"section": "pages", "page": 1}))
+        self.assertIn(b"http://testserver/register/", b"".join(response.streaming_content))
+        self.assertEqual(self.client.get("/sitemap-unknown-1.xml").status_code, 404)
+
+    @override_settings(SITEMAP_PAGE_SIZE=2)
+    def test_sitemap_missing_pages(self):
+        """Тест: страницы, которых нет в индексе карты сайта, отдают 404"""
+        last_page = (max(post.pk for post in self.posts) - 1) // 2 + 1
+        for section, page in (("pages", 2), ("posts", 0), ("posts", last_page + 1)):
+            with self.subTest(section=section, page=page):
+                url = reverse("sitemap-section", kwargs={"section": section, "page": page})
+                self.assertEqual(self.client.get(url).status_code, 404)
+                # Условный запрос тоже не получает 304.
+                response = self.client.get(url, HTTP_IF_MODIFIED_SINCE="Fri, 01 Jan 2100 00:00:00 GMT")
+                self.assertEqual(response.status_code, 404)
+        url = reverse("sitemap-section", kwargs={"section": "posts", "page": last_page})
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class PostViewsCounterTests(TestCase):
+    """Тесты счетчика просмотров с отложенной записью"""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = get_user_model().objects.create_user(
+            email="author@example.com", username="author", password="ComplexPass123!"
+        )
+        cls.first, cls.second = (
+            Post.objects.create(author=author, title=title, body="text", is_published=True)
+            for title in ("First", "Second")
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(post_views.flush)
+
+    @override_settings(COUNTERS_FLUSH_INTERVAL=3600)
+    def test_hits_batched_into_one_update(self):
+        """Тест: просмотры копятся в памяти, читаются с учетом накопленного и пишутся одним UPDATE"""
+        url = reverse("blog:post", args=[self.first.pk])
+        for _ in range(3):
+            self.client.get(url)
+        self.client.get(reverse("blog:post", args=[self.second.pk]))
+        self.client.get(reverse("blog:post", args=[10**6]))
+
+        self.assertEqual(Post.objects.get(pk=self.first.pk).views, 0)
+        self.assertEqual(post_views.value(self.first.pk, 0), 3)
+        cache.clear()
+        self.assertContains(self.client.get(url), "3 views")
+
+        with self.assertNumQueries(1):
+            self.assertEqual(post_views.flush(), 2)
+        self.assertEqual(
+            dict(Post.objects.values_list("title", "views")), {"First": 4, "Second": 1}
+        )
+        self.assertEqual(post_views.pending(self.first.pk), 0)
+
+    @override_settings(COUNTERS_FLUSH_INTERVAL=3600)
+    def test_failed_flush_requeues(self):
+        """Тест: при ошибке базы приращения возвращаются в очередь"""
+        post_views.incr(self.first.pk, 5)
+        with mock.patch.object(post_views, "write", side_effect=DatabaseError("locked")), \
+                self.assertLogs("core.counters", "ERROR"):
+            self.assertEqual(post_views.flush(), 0)
+        self.assertEqual(post_views.pending(self.first.pk), 5)
+
+        post_views.flush()
+        self.assertEqual(Post.objects.get(pk=self.first.pk).views, 5)
+
+    def test_write_through_without_interval(self):
+        """Тест: при COUNTERS_FLUSH_INTERVAL = 0 просмотр сразу пишется в базу"""
+        self.client.get(reverse("blog:post", args=[self.first.pk]))
+        self.assertEqual(Post.objects.get(pk=self.first.pk).views, 1)
+        self.assertEqual(post_views.pending(self.first.pk), 0)
+
+
+class CommentTests(TestCase):
+    """Тесты древовидных комментариев"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.author = User.objects.create_user(email="author@example.com", username="author", password="ComplexPass123!")
+        cls.post = Post.objects.create(author=cls.author, title="Post", body="text", is_published=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_paths_and_reply_counts(self):
+        """Тест: путь содержит id предков, счетчик ответов ведется у родителя"""
+        root = Comment.objects.create(post=self.post, author=self.author, body="root")
+        reply = Comment.objects.create(post=self.post, author=self.author, parent=root, body="reply")
+        nested = Comment.objects.create(post=self.post, author=self.author, parent=reply, body="nested")
+        second = Comment.objects.create(post=self.post, author=self.author, parent=root, body="second")
+
+        self.assertEqual(nested.path, path_segment(root.pk) + path_segment(reply.pk) + path_segment(nested.pk))
+        self.assertEqual(nested.depth, 2)
+        self.assertEqual(
+            list(Comment.objects.filter(post=self.post).values_list("body", "reply_count")),
+            [("root", 2), ("reply", 1), ("nested", 0), ("second", 0)],
+        )
+
+        second.delete()
+        root.refresh_from_db()
+        self.assertEqual(root.reply_count, 1)
+
+    def test_create_via_view(self):
+        """Тест: ответ добавляется через форму, чужая ветка и аноним отклоняются"""
+        root = Comment.objects.create(post=self.post, author=self.author, body="root")
+        other = Post.objects.create(author=self.author, title="Other", body="text", is_published=True)
+        foreign = Comment.objects.create(post=other, author=self.author, body="foreign")
+        url = reverse("blog:post-comments", args=[self.post.pk])
+
+        self.assertEqual(self.client.post(url, {"body": "anonymous"}).status_code, 302)
+        self.client.force_login(self.author)
+        response = self.client.post(url, {"body": "reply <b>", "parent": root.pk})
+        reply = Comment.objects.get(body="reply <b>")
+        self.assertRedirects(response, f"{reverse('blog:post', args=[self.post.pk])}#comment-{reply.pk}")
+        self.assertEqual(reply.parent_id, root.pk)
+        self.assertEqual(self.client.post(url, {"body": "x", "parent": foreign.pk}).status_code, 400)
+
+        response = self.client.get(url)
+        self.assertContains(response, "reply &lt;b&gt;")
+
+    def test_invalid_comment_form(self):
+        """Тест: форма с ошибками возвращается на странице записи, JSON - только по Accept"""
+        other = Post.objects.create(author=self.author, title="Other", body="text", is_published=True)
+        foreign = Comment.objects.create(post=other, author=self.author, body="foreign")
+        url = reverse("blog:post-comments", args=[self.post.pk])
+        self.client.force_login(self.author)
+
+        response = self.client.get(reverse("blog:post", args=[self.post.pk]))
+        self.assertContains(response, f'action="{url}"')
+
+        response = self.client.post(
+            url,
+            {"body": "my reply", "parent": foreign.pk},
+            headers={"accept": "text/html,application/xhtml+xml,*/*;q=0.8"},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertTemplateUsed(response, "blog/post_detail.html")
+        self.assertEqual(response.context["post"], self.post)
+        self.assertContains(response, "Unknown comment.", status_code=400)
+        self.assertContains(response, "my reply", status_code=400)
+
+        response = self.client.post(url, {"body": ""}, headers={"accept": "application/json"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("body", response.json()["errors"])
+        self.assertFalse(Comment.objects.filter(post=self.post).exists())
+
+    def test_last_page_without_next_root(self):
+        """Тест: последняя страница (без следующего корня) выводит все свои ветки без заглушки-границы"""
+        first = Comment.objects.create(post=self.post, author=self.author, body="first")
+        second = Comment.objects.create(post=self.post, author=self.author, body="second")
+        Comment.objects.create(post=self.post, author=self.author, parent=second, body="reply")
+
+        with self.assertNumQueries(1):
+            page = comment_page(self.post, per_page=1, cursor=second.path)
+        self.assertFalse(page.has_next)
+        self.assertEqual([root.body for root in page.roots], ["second"])
+        self.assertEqual([reply.body for reply in page.roots[0].children], ["reply"])
+
+        only = comment_page(self.post, per_page=5)
+        self.assertEqual([root.pk for root in only.roots], [first.pk, second.pk])
+        self.assertFalse(only.has_next)
+
+    def test_max_depth(self):
+        """Тест: ответ глубже MAX_DEPTH отклоняется"""
+        parent = Comment.objects.create(post=self.post, author=self.author, body="root")
+        Comment.objects.filter(pk=parent.pk).update(depth=Comment.MAX_DEPTH)
+        self.client.force_login(self.author)
+        response = self.client.post(
+            reverse("blog:post-comments", args=[self.post.pk]), {"body": "deep", "parent": parent.pk}
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class LargeCommentThreadTests(TestCase):
+    """Тесты выборки ветки из 10 000 комментариев"""
+
+    ROOTS = 100
+    TOTAL = 10_000
+
+    @classmethod
+    def setUpTestData(cls):
+        author = get_user_model().objects.create_user(
+            email="author@example.com", username="author", password="ComplexPass123!"
+        )
+        cls.post = Post.objects.create(author=author, title="Post", body="text", is_published=True)
+        # Дерево строится в памяти с явными id, чтобы не сохранять 10 000 записей по одной.
+        rng = random.Random(19)
+        start = (Comment.objects.order_by("-pk").values_list("pk", flat=True).first() or 0) + 1
+        comments = []
+        for n in range(cls.TOTAL):
+            pk = start + n
+            parent = None if n < cls.ROOTS else rng.choice(comments[max(0, n - 500):n])
+            if parent is not None and parent.depth >= 15:
+                parent = comments[parent.parent_id - start]
+            comment = Comment(
+                pk=pk,
+                post=cls.post,
+                author=author,
+                parent_id=parent.pk if parent else None,
+                body=f"comment {n}",
+                path=(parent.path if parent else "") + path_segment(pk),
+                depth=parent.depth + 1 if parent else 0,
+            )
+            if parent is not None:
+                parent.reply_count += 1
+            comments.append(comment)
+        Comment.objects.bulk_create(comments, batch_size=1000)
+        cls.max_depth = max(comment.depth for comment in comments)
+
+    def test_whole_thread_in_one_query(self):
+        """Тест: вся ветка читается одним запросом и собирается в дерево"""
+        with self.assertNumQueries(1):
+            roots = build_tree(Comment.objects.filter(post=self.post).order_by("path"))
+
+        self.assertEqual(len(roots), self.ROOTS)
+        self.assertGreater(self.max_depth, 5)
+
+        def walk(nodes):
+            for node in nodes:
+                self.assertEqual(len(node.children), node.reply_count)
+                yield node
+                yield from walk(node.children)
+
+        self.assertEqual(sum(1 for _ in walk(roots)), self.TOTAL)
+
+    def test_root_pages_in_one_query_each(self):
+        """Тест: каждая страница корней с ветками - один запрос, страницы покрывают всю ветку"""
+        seen = 0
+        cursor = None
+        pages = 0
+        while True:
+            with self.assertNumQueries(1):
+                page = comment_page(self.post, per_page=30, cursor=cursor)
+            pages += 1
+            stack = list(page.roots)
+            while stack:
+                node = stack.pop()
+                seen += 1
+                stack.extend(node.children)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(pages, 4)
+        self.assertEqual(seen, self.TOTAL)
+
+    def test_comments_view_query_count(self):
+        """Тест: страница комментариев - два запроса (запись и комментарии) независимо от размера ветки"""
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("blog:post-comments", args=[self.post.pk]))
+        self.assertContains(response, "More comments")
+
+
+class TagTests(TestCase):
+    """Тесты тегов и счетчиков записей у тегов"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = get_user_model().objects.create_user(
+            email="author@example.com", username="author", password="ComplexPass123!"
+        )
+        cls.python = Tag.objects.create(name="Python", slug="python")
+        cls.django = Tag.objects.create(name="Django", slug="django")
+
+    def setUp(self):
+        cache.clear()
+
+    def create_post(self, title, is_published=True, **kwargs):
+        return Post.objects.create(author=self.author, title=title, body="text", is_published=is_published, **kwargs)
+
+    def counts(self):
+        return dict(Tag.objects.values_list("slug", "post_count"))
+
+    def test_counts_follow_publishing(self):
+        """Тест: счетчики меняются при добавлении тегов, публикации, снятии и удалении записи"""
+        post = self.create_post("Post")
+        draft = self.create_post("Draft", is_published=False)
+        post.tags.add(self.python, self.django)
+        self.django.posts.add(draft)
+        self.assertEqual(self.counts(), {"python": 1, "django": 1})
+
+        draft.is_published = True
+        draft.save()
+        self.assertEqual(self.counts(), {"python": 1, "django": 2})
+        self.assertTrue(PostTag.objects.get(post=draft).is_published)
+
+        post = Post.objects.get(pk=post.pk)
+        post.is_published = False
+        post.save()
+        self.assertEqual(self.counts(), {"python": 0, "django": 1})
+
+        draft.tags.remove(self.django)
+        self.assertEqual(self.counts(), {"python": 0, "django": 0})
+
+        draft.tags.add(self.python)
+        draft.delete()
+        self.assertEqual(self.counts(), {"python": 0, "django": 0})
+
+    def test_counts_for_link_saved_directly(self):
+        """Тест: связь, сохраненная как объект (инлайн админки), учитывается, смена тега переносит счетчик"""
+        post = self.create_post("Post")
+        link = PostTag.objects.create(post=post, tag=self.python)
+        self.assertEqual(self.counts(), {"python": 1, "django": 0})
+
+        link.tag = self.django
+        link.save()
+        self.assertEqual(self.counts(), {"python": 0, "django": 1})
+
+    def test_unrelated_save_skips_tags(self):
+        """Тест: сохранение записи без смены публикации не трогает связи и счетчики"""
+        post = self.create_post("Post")
+        post.tags.add(self.python)
+        post = Post.objects.get(pk=post.pk)
+        post.title = "Renamed"
+        with CaptureQueriesContext(connection) as queries:
+            post.save()
+        self.assertFalse([query for query in queries if "blog_posttag" in query["sql"] or "blog_tag" in query["sql"]])
+
+    def test_rebuild_command_fixes_drift(self):
+        """Тест: rebuild_tag_counts исправляет счетчики после изменений в обход моделей"""
+        posts = [self.create_post(f"Post {n}") for n in range(3)]
+        for post in posts:
+            post.tags.add(self.python)
+        Post.objects.filter(pk=posts[0].pk).update(is_published=False)
+        Tag.objects.filter(pk=self.django.pk).update(post_count=7)
+
+        out = StringIO()
+        call_command("rebuild_tag_counts", "--chunk-size", "1", stdout=out)
+
+        self.assertIn("Fixed 2 tag counts", out.getvalue())
+        self.assertEqual(self.counts(), {"python": 2, "django": 0})
+        self.assertFalse(PostTag.objects.get(post=posts[0]).is_published)
+
+    def test_tag_page(self):
+        """Тест: страница тега листается курсором, два запроса на любой глубине (плюс боковая колонка при пустом кеше)"""
+        start = timezone.now()
+        for n in range(25):
+            post = self.create_post(f"Post {n}", published_at=start - timedelta(minutes=n))
+            post.tags.add(self.python)
+        self.create_post("Draft", is_published=False).tags.add(self.python)
+        self.create_post("Other").tags.add(self.django)
+        url = reverse("blog:tag", args=["python"])
+
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        first = response.context["page"]
+        self.assertEqual([post.title for post in response.context["posts"]][:2], ["Post 0", "Post 1"])
+        self.assertEqual(len(first), 20)
+        self.assertContains(response, "25 posts")
+
+        with self.assertNumQueries(2):
+            response = self.client.get(url, {"cursor": first.next_cursor})
+        self.assertEqual([post.title for post in response.context["posts"]], [f"Post {n}" for n in range(20, 25)])
+
+        self.assertEqual(self.client.get(url, {"cursor": "garbage"}).status_code, 404)
+        self.assertEqual(self.client.get(reverse("blog:tag", args=["missing"])).status_code, 404)
+
+    def test_tag_page_uses_covering_index(self):
+        """Тест: связи страницы тега читаются по idx_posttag_listing без сортировки"""
+        if connection.vendor != "sqlite":
+            self.skipTest("План запроса проверяется для SQLite")
+        plan = (
+            PostTag.objects.filter(tag=self.python, is_published__in=[True])
+            .select_related("post")
+            .order_by("-published_at", "-post_id")[:21]
+            .explain()
+        )
+        self.assertIn("idx_posttag_listing", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_tag_cloud_cached(self):
+        """Тест: облако тегов строится из счетчиков, кешируется и не содержит пустых тегов"""
+        for n in range(3):
+            self.create_post(f"Post {n}").tags.add(self.python)
+        self.create_post("Other").tags.add(self.django)
+        Tag.objects.create(name="Empty", slug="empty")
+
+        with self.assertNumQueries(1):
+            tags = tag_cloud()
+        with self.assertNumQueries(0):
+            self.assertEqual(tag_cloud(), tags)
+
+        self.assertEqual(
+            [(tag["slug"], tag["post_count"], tag["weight"]) for tag in tags],
+            [("django", 1, 1), ("python", 3, 5)],
+        )
+        self.assertContains(self.client.get(reverse("blog:index")), reverse("blog:tag", args=["python"]))
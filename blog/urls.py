@@ -1,9 +1,17 @@
 
 from django.urls import path
-from .views import BlogIndexView
+from .feeds import AtomFeed, PostFeedView, RssFeed
+from .views import BlogIndexView, PostCommentsView, PostDetailView, PostImageUploadView, SearchView, TagView
 
 app_name = 'blog'
 
 urlpatterns = [
-    path('', BlogIndexView, name='index'),  # Главная страница блога
-]
\ No newline at end of file
+    path('', BlogIndexView.as_view(), name='index'),  # Главная страница блога
+    path('feed/atom/', PostFeedView.as_view(feed_class=AtomFeed), name='feed-atom'),  # Лента Atom
+    path('feed/rss/', PostFeedView.as_view(feed_class=RssFeed), name='feed-rss'),  # Лента RSS
+    path('search', SearchView.as_view(), name='search'),  # Поиск по записям
+    path('tag/<slug:slug>/', TagView.as_view(), name='tag'),  # Записи с тегом
+    path('post/<int:pk>/', PostDetailView.as_view(), name='post'),  # Страница записи
+    path('post/<int:pk>/comments/', PostCommentsView.as_view(), name='post-comments'),  # Комментарии
+    path('post/<int:pk>/images/', PostImageUploadView.as_view(), name='post-image-upload'),  # Загрузка изображений
+]
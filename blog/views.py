@@ -1,4 +1,231 @@
-from django.shortcuts import render
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.views import redirect_to_login
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.views import View
+from django.db.models import Prefetch
+from django.views.generic import DetailView, TemplateView
 
-class BlogIndexView():
-    pass
\ No newline at end of file
+from core.cache import AnonymousCacheMixin
+from core.pagination import InvalidCursor, KeysetPaginator
+
+from .comments import comment_page
+from .forms import CommentForm, PostImageForm
+from .models import Post, PostImage, PostTag, Tag, post_views
+from .search import get_search_backend
+from .tags import tag_cloud
+
+
+class BlogSidebarMixin:
+    """
+    Добавляет в контекст последние записи для боковой колонки блога.
+
+    Queryset ленивый: запрос выполняется, только если фрагмент
+    blog-recent не нашелся в кеше (templates/blog/sidebar.html).
+    """
+
+    recent_posts_count = 5
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["recent_posts"] = Post.objects.published().only("title")[: self.recent_posts_count]
+        return context
+
+
+class BlogIndexView(AnonymousCacheMixin, BlogSidebarMixin, TemplateView):
+    """
+    Лента опубликованных записей, от новых к старым.
+
+    Страницы листаются курсором (?cursor=...) по индексу
+    (is_published, published_at, id), поэтому время ответа не зависит
+    от глубины архива. Из базы читаются только поля, нужные ленте.
+    """
+
+    template_name = "blog/index.html"
+    paginate_by = 20
+
+    def get_queryset(self):
+        return (
+            Post.objects.published()
+            .select_related("author")
+            .only("title", "excerpt", "published_at", "author__username")
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        paginator = KeysetPaginator(self.get_queryset(), self.paginate_by, "published_at")
+        try:
+            page = paginator.page(self.request.GET.get("cursor"))
+        except InvalidCursor:
+            raise Http404("Invalid cursor")
+        context["page"] = page
+        context["posts"] = page.object_list
+        context["tags"] = tag_cloud()
+        return context
+
+
+class TagView(AnonymousCacheMixin, BlogSidebarMixin, TemplateView):
+    """
+    Опубликованные записи с тегом, от новых к старым.
+
+    Листается курсором по связям PostTag: индекс idx_posttag_listing
+    (tag, is_published, published_at, post) отдает строки страницы уже в
+    нужном порядке, записи присоединяются по первичному ключу. Время
+    ответа не зависит ни от числа записей тега, ни от глубины страницы.
+    """
+
+    template_name = "blog/tag.html"
+    paginate_by = 20
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        tag = get_object_or_404(Tag.objects.only("name", "slug", "post_count"), slug=self.kwargs["slug"])
+        links = (
+            PostTag.objects.filter(tag=tag, is_published__in=[True])
+            .select_related("post__author")
+            .only("published_at", "post__title", "post__excerpt", "post__published_at", "post__author__username")
+        )
+        paginator = KeysetPaginator(links, self.paginate_by, "published_at", tiebreaker="post_id")
+        try:
+            page = paginator.page(self.request.GET.get("cursor"))
+        except InvalidCursor:
+            raise Http404("Invalid cursor")
+        context.update(tag=tag, page=page, posts=[link.post for link in page])
+        return context
+
+
+class SearchView(AnonymousCacheMixin, TemplateView):
+    """
+    Поиск по опубликованным записям (?q=...&page=N).
+
+    Результаты отсортированы по релевантности и листаются номером
+    страницы не дальше max_page: глубокие страницы поиска почти не
+    открывают, а OFFSET по ранжированной выдаче дорожает с глубиной.
+    """
+
+    template_name = "blog/search.html"
+    paginate_by = 20
+    max_page = 50
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get("q", "").strip()[:200]
+        try:
+            number = int(self.request.GET.get("page", 1))
+        except ValueError:
+            raise Http404("Invalid page")
+        if not 1 <= number <= self.max_page:
+            raise Http404("Invalid page")
+        page = get_search_backend().search(query, number, self.paginate_by)
+        page.has_next = page.has_next and number < self.max_page
+        context.update(query=query, page=page)
+        return context
+
+
+class PostDetailView(AnonymousCacheMixin, BlogSidebarMixin, DetailView):
+    """
+    Страница записи.
+
+    Текст выводится из body_html, подготовленного при сохранении,
+    поэтому Markdown на запросе не рендерится. Просмотр увеличивает
+    счетчик post_views без записи в таблицу на каждый запрос.
+    """
+
+    template_name = "blog/post_detail.html"
+    context_object_name = "post"
+
+    def get_queryset(self):
+        return (
+            Post.objects.published()
+            .select_related("author")
+            .only("title", "body_html", "published_at", "updated_at", "views", "author__username")
+            .prefetch_related(
+                Prefetch("images", PostImage.objects.order_by("id")),
+                Prefetch("tags", Tag.objects.only("name", "slug")),
+            )
+        )
+
+    def dispatch(self, request, *args, **kwargs):
+        # Считаются и ответы из кеша представления.
+        response = super().dispatch(request, *args, **kwargs)
+        if request.method == "GET" and response.status_code == 200:
+            post_views.incr(kwargs["pk"])
+        return response
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["views"] = post_views.value(self.object.pk, self.object.views)
+        context["comments"] = comment_page(self.object.pk, PostCommentsView.paginate_by)
+        if self.request.user.is_authenticated and "comment_form" not in context:
+            context["comment_form"] = CommentForm(post=self.object, author=self.request.user)
+        return context
+
+
+class PostImageUploadView(LoginRequiredMixin, View):
+    """
+    Загрузка изображения к записи; доступна только автору.
+
+    Отвечает JSON с адресом оригинала: WebP-варианты для srcset
+    появляются позже, их строит фоновый пул core.images.variant_pool.
+    """
+
+    form_class = PostImageForm
+
+    def post(self, request, pk):
+        post = get_object_or_404(Post.objects.only("author_id"), pk=pk, author=request.user)
+        form = self.form_class(request.POST, request.FILES)
+        if not form.is_valid():
+            return JsonResponse({"errors": form.errors}, status=400)
+        image = form.save(commit=False)
+        image.post = post
+        image.save()
+        return JsonResponse(
+            {"id": image.pk, "url": image.image.url, "width": image.width, "height": image.height},
+            status=201,
+        )
+
+
+class PostCommentsView(View):
+    """
+    Комментарии записи.
+
+    GET - страница корневых комментариев с ветками ответов
+    (?cursor=...), одним запросом к комментариям; POST - новый
+    комментарий или ответ, только для вошедших пользователей. Форму с
+    ошибками браузер получает на странице записи, JSON с ошибками -
+    только клиенты, которые просят application/json, а не HTML.
+    """
+
+    template_name = "blog/comments.html"
+    paginate_by = 20
+
+    def get_post(self, pk):
+        return get_object_or_404(Post.objects.published().only("id"), pk=pk)
+
+    def get(self, request, pk):
+        post = self.get_post(pk)
+        try:
+            page = comment_page(post.pk, self.paginate_by, request.GET.get("cursor"))
+        except InvalidCursor:
+            raise Http404("Invalid cursor")
+        return render(request, self.template_name, {"post": post, "comments": page})
+
+    def post(self, request, pk):
+        if not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        post = self.get_post(pk)
+        form = CommentForm(request.POST, post=post, author=request.user)
+        if not form.is_valid():
+            if request.accepts("application/json") and not request.accepts("text/html"):
+                return JsonResponse({"errors": form.errors}, status=400)
+            return self.form_invalid(request, pk, form)
+        comment = form.save()
+        return redirect(f"{reverse('blog:post', args=[post.pk])}#comment-{comment.pk}")
+
+    def form_invalid(self, request, pk, form):
+        """Страница записи с отправленной формой и ее ошибками."""
+        view = PostDetailView(request=request, args=(), kwargs={"pk": pk})
+        view.object = view.get_object()
+        context = view.get_context_data(object=view.object, comment_form=form)
+        return view.render_to_response(context, status=400)
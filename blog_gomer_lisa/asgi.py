@@ -15,3 +15,10 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blog_gomer_lisa.settings')
 
 application = get_asgi_application()
 
+from django.conf import settings  # noqa: E402
+
+if settings.TEMPLATE_WARMUP:
+    from core.templates import warm_templates
+
+    warm_templates()
+
@@ -40,9 +40,11 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     "blog.apps.BlogConfig",
     "account.apps.AccountConfig",
+    "core.apps.CoreConfig",
 ]
 
 MIDDLEWARE = [
+    'core.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,13 +56,30 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'blog_gomer_lisa.urls'
 
+# Метрики запросов (core.instrumentation): заголовок Server-Timing в ответах
+# и доступ к странице /metrics в формате Prometheus. По умолчанию страница
+# закрыта. Доступ дают адреса клиентов METRICS_ALLOWED_IPS (через запятую)
+# или токен METRICS_TOKEN в заголовке "Authorization: Bearer <токен>".
+# За nginx на том же хосте REMOTE_ADDR у всех запросов 127.0.0.1, поэтому
+# адрес клиента берется из X-Forwarded-For по THROTTLE_TRUSTED_PROXIES.
+SERVER_TIMING = os.environ.get('SERVER_TIMING', str(DEBUG)).lower() in ('1', 'true', 'yes')
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.environ.get('METRICS_ALLOWED_IPS', '').split(',') if ip.strip()]
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Шаблоны
+# В продакшен-режиме (TEMPLATE_CACHE=1, по умолчанию при DEBUG=False)
+# загрузчики явно обернуты в cached.Loader, а при TEMPLATE_WARMUP=1
+# воркеры компилируют все шаблоны при старте (см. wsgi.py/asgi.py).
+TEMPLATE_CACHE = os.environ.get('TEMPLATE_CACHE', str(not DEBUG)).lower() in ('1', 'true', 'yes')
+TEMPLATE_WARMUP = os.environ.get('TEMPLATE_WARMUP', str(TEMPLATE_CACHE)).lower() in ('1', 'true', 'yes')
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.templates.InstrumentedDjangoTemplates',
         'DIRS': [
             os.path.join(BASE_DIR, 'templates'),
         ],
-        'APP_DIRS': True,
+        'APP_DIRS': not TEMPLATE_CACHE,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
@@ -71,18 +90,177 @@ TEMPLATES = [
     },
 ]
 
+if TEMPLATE_CACHE:
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
 WSGI_APPLICATION = 'blog_gomer_lisa.wsgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Профиль базы выбирается переменной окружения DB_PROFILE:
+#   sqlite (по умолчанию) - файл db.sqlite3 с настройками по умолчанию;
+#   sqlite-wal - тот же файл в режиме WAL: читатели не блокируют писателя,
+#                писатели ждут блокировку до DB_BUSY_TIMEOUT секунд, а
+#                транзакции сразу берут блокировку на запись (IMMEDIATE),
+#                чтобы не падать с "database is locked" при ее повышении;
+#   postgres - PostgreSQL (параметры из POSTGRES_*), соединения живут
+#              DB_CONN_MAX_AGE секунд с проверкой перед использованием,
+#              а при DB_POOL_SIZE > 0 берутся из пула psycopg.
+
+DB_PROFILE = os.environ.get('DB_PROFILE', 'sqlite')
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+
+if DB_PROFILE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'blog_gomer_lisa'),
+            'USER': os.environ.get('POSTGRES_USER', 'postgres'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', '127.0.0.1'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
     }
-}
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 0))
+    if DB_POOL_SIZE:
+        # Пул несовместим с постоянными соединениями Django.
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': 1,
+            'max_size': DB_POOL_SIZE,
+            'timeout': 10,
+        }
+elif DB_PROFILE == 'sqlite-wal':
+    DB_BUSY_TIMEOUT = int(os.environ.get('DB_BUSY_TIMEOUT', 5))
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'OPTIONS': {
+                'timeout': DB_BUSY_TIMEOUT,
+                'transaction_mode': 'IMMEDIATE',
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    f'PRAGMA busy_timeout={DB_BUSY_TIMEOUT * 1000};'
+                    'PRAGMA mmap_size=134217728;'
+                    'PRAGMA temp_store=MEMORY;'
+                ),
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
+    }
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Бэкенд выбирается переменной окружения CACHE_BACKEND:
+#   locmem (по умолчанию) - память процесса;
+#   file - файловый кеш, общий для воркеров на одном хосте;
+#   redis - любой сервер с протоколом Redis (Redis, Valkey, KeyDB или
+#           локальная замена), адрес задается в CACHE_URL.
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('CACHE_URL', 'redis://127.0.0.1:6379/1'),
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_DIR', os.path.join(BASE_DIR, '.cache')),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Время жизни кеша страниц для анонимных посетителей (0 - кеш отключен)
+VIEW_CACHE_TIMEOUT = int(os.environ.get('VIEW_CACHE_TIMEOUT', 60))
+
+# Кеш фрагментов шаблонов ({% fragment %}, core.fragments): время жизни
+# в секундах (0 - кеш отключен) и псевдоним кеша. Версии объектов
+# хранятся в этом же кеше, поэтому при нескольких процессах он должен
+# быть общим (redis), иначе процесс не узнает об изменениях в других.
+FRAGMENT_CACHE_TIMEOUT = int(os.environ.get('FRAGMENT_CACHE_TIMEOUT', 600))
+FRAGMENT_CACHE_ALIAS = 'default'
+
+# Число строк в списках админки (core.pagination.EstimatedCountPaginator):
+# на PostgreSQL - оценка планировщика, если она не меньше
+# ADMIN_EXACT_COUNT_LIMIT (иначе точный COUNT); на SQLite - точный COUNT,
+# закешированный на ADMIN_COUNT_CACHE_TIMEOUT секунд.
+ADMIN_EXACT_COUNT_LIMIT = int(os.environ.get('ADMIN_EXACT_COUNT_LIMIT', 10000))
+ADMIN_COUNT_CACHE_TIMEOUT = int(os.environ.get('ADMIN_COUNT_CACHE_TIMEOUT', 300))
+
+
+# Конфигурация полнотекстового поиска PostgreSQL для записей блога
+# (например, 'russian' или 'english' для учета словоформ).
+BLOG_SEARCH_CONFIG = os.environ.get('BLOG_SEARCH_CONFIG', 'simple')
+
+# Число записей в лентах Atom/RSS и размер страницы карты сайта
+# (диапазон id записей; по протоколу не больше 50 000 адресов).
+BLOG_FEED_ITEMS = int(os.environ.get('BLOG_FEED_ITEMS', 50))
+SITEMAP_PAGE_SIZE = int(os.environ.get('SITEMAP_PAGE_SIZE', 10000))
+
+# Облако тегов: число тегов и время кеширования в секундах
+# (счетчики записей у тегов в облаке могут отставать на это время).
+BLOG_TAG_CLOUD_SIZE = int(os.environ.get('BLOG_TAG_CLOUD_SIZE', 50))
+BLOG_TAG_CLOUD_TIMEOUT = int(os.environ.get('BLOG_TAG_CLOUD_TIMEOUT', 300))
+
+# Счетчики с отложенной записью (core.counters, просмотры записей):
+# интервал записи в базу в секундах (0 - писать каждое приращение сразу)
+# и предел строк в памяти, после которого запись идет немедленно.
+COUNTERS_FLUSH_INTERVAL = float(os.environ.get('COUNTERS_FLUSH_INTERVAL', 5))
+COUNTERS_MAX_PENDING = int(os.environ.get('COUNTERS_MAX_PENDING', 10000))
+
+
+# Фоновые задачи (core.tasks, manage.py run_worker).
+# TASKS_EAGER - выполнять задачи сразу при постановке (включается в тестах);
+# TASKS_BACKOFF/TASKS_MAX_BACKOFF - первая и максимальная пауза перед
+# повтором, с; TASKS_LOCK_TIMEOUT - через сколько секунд задачу упавшего
+# воркера можно взять снова; TASKS_KEEP_DAYS - сколько хранить выполненные.
+TASKS_EAGER = os.environ.get('TASKS_EAGER', '').lower() in ('1', 'true', 'yes')
+TASKS_BACKOFF = int(os.environ.get('TASKS_BACKOFF', 10))
+TASKS_MAX_BACKOFF = int(os.environ.get('TASKS_MAX_BACKOFF', 3600))
+TASKS_LOCK_TIMEOUT = int(os.environ.get('TASKS_LOCK_TIMEOUT', 600))
+TASKS_KEEP_DAYS = int(os.environ.get('TASKS_KEEP_DAYS', 7))
+
+# Почта: при DEBUG письма выводятся в консоль.
+EMAIL_BACKEND = os.environ.get(
+    'EMAIL_BACKEND',
+    'django.core.mail.backends.console.EmailBackend' if DEBUG else 'django.core.mail.backends.smtp.EmailBackend',
+)
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 25))
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'noreply@blog-gomer-lisa.local')
+
+# Тесты выполняют фоновые задачи и пишут счетчики сразу (core.testing.TestRunner).
+TEST_RUNNER = 'core.testing.TestRunner'
 
 
 # Password validation
@@ -104,6 +282,101 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Хешеры паролей
+# https://docs.djangoproject.com/en/5.2/topics/auth/passwords/
+# Первый хешер используется для новых паролей, остальные - только для
+# проверки старых; при входе устаревший хеш пересчитывается.
+# PASSWORD_HASHER: pbkdf2 (по умолчанию, число итераций из
+# PASSWORD_PBKDF2_ITERATIONS), scrypt или argon2 (нужен argon2-cffi).
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'pbkdf2')
+PASSWORD_PBKDF2_ITERATIONS = int(os.environ.get('PASSWORD_PBKDF2_ITERATIONS', 600_000))
+
+_PASSWORD_HASHERS = {
+    'pbkdf2': 'account.hashers.TunedPBKDF2PasswordHasher',
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    hasher for hasher in (
+        'account.hashers.TunedPBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+        'django.contrib.auth.hashers.ScryptPasswordHasher',
+    ) if hasher != _PASSWORD_HASHERS[PASSWORD_HASHER]
+]
+
+AUTHENTICATION_BACKENDS = ['account.backends.EmailBackend']
+
+# Время жизни кеша пользователя для AuthenticationMiddleware, в секундах
+# (0 - кеш отключен). С locmem-кешем сброс при изменении пользователя
+# виден только в текущем процессе, и другие воркеры еще пускали бы
+# деактивированного пользователя, поэтому по умолчанию кеш включен только
+# с общим кешем (redis, file).
+AUTH_USER_CACHE_TIMEOUT = int(os.environ.get('AUTH_USER_CACHE_TIMEOUT', 0 if CACHE_BACKEND == 'locmem' else 60))
+
+# Время жизни кеша прав пользователя (account.backends.EmailBackend), в
+# секундах (0 - кеш отключен). Изменения групп и прав сбрасывают его сразу,
+# но с locmem-кешем только в текущем процессе: в остальных воркерах
+# разжалованный суперпользователь или отозванное право группы действовали
+# бы до истечения срока. Поэтому, как и кеш пользователя, по умолчанию он
+# включен только с общим кешем.
+AUTH_PERMISSIONS_CACHE_TIMEOUT = int(
+    os.environ.get('AUTH_PERMISSIONS_CACHE_TIMEOUT', 0 if CACHE_BACKEND == 'locmem' else 300)
+)
+
+# Хранилище сессий SESSION_STORE:
+#   cached_db      - чтение из кеша, запись сразу и в кеш, и в базу; запрос
+#                    с сессией не обращается к django_session, пока сессия
+#                    есть в кеше (по умолчанию с CACHE_BACKEND=redis);
+#   db             - только таблица django_session (по умолчанию для
+#                    остальных кешей: locmem и file не видят удаление
+#                    сессии в других воркерах, и выход из аккаунта
+#                    срабатывал бы не везде);
+#   signed_cookies - данные сессии в подписанной cookie, без сервера
+#                    хранения; сессию нельзя отозвать до истечения срока.
+# Просроченные записи django_session удаляет manage.py purge_sessions.
+SESSION_STORE = os.environ.get('SESSION_STORE', 'cached_db' if CACHE_BACKEND == 'redis' else 'db')
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}[SESSION_STORE]
+
+
+# Асинхронные представления регистрации и входа (для запуска под ASGI)
+ACCOUNT_ASYNC_VIEWS = os.environ.get('ACCOUNT_ASYNC_VIEWS', '').lower() in ('1', 'true', 'yes')
+
+# Пул потоков для хеширования паролей в асинхронных представлениях:
+# число потоков (по умолчанию число ядер) и предел задач в очереди,
+# после которого запросы получают 503.
+ACCOUNT_HASHING_WORKERS = int(os.environ.get('ACCOUNT_HASHING_WORKERS', 0)) or None
+ACCOUNT_HASHING_MAX_PENDING = int(os.environ.get('ACCOUNT_HASHING_MAX_PENDING', 0)) or None
+
+
+# Ограничение частоты POST-запросов к регистрации и входу, по IP и по email.
+# Формат: '<число>/<s|m|h|d>'.
+# Хранилище счетчиков ACCOUNT_THROTTLE_STORE:
+#   shared - файл в общей памяти, общий для всех воркеров хоста
+#            (по умолчанию при DEBUG=False);
+#   cache  - кеш ACCOUNT_THROTTLE_CACHE (для нескольких хостов - redis).
+ACCOUNT_THROTTLE_STORE = os.environ.get('ACCOUNT_THROTTLE_STORE', 'cache' if DEBUG else 'shared')
+ACCOUNT_THROTTLE_SHM_PATH = os.environ.get(
+    'ACCOUNT_THROTTLE_SHM_PATH',
+    '/dev/shm/blog_gomer_lisa-throttle' if os.path.isdir('/dev/shm') else '/tmp/blog_gomer_lisa-throttle',
+)
+ACCOUNT_THROTTLE_CACHE = 'default'
+# Адреса и подсети прокси (nginx), которым доверяется X-Forwarded-For.
+# За прокси без этой настройки все клиенты видны с адреса прокси и делят
+# один лимит по IP. Клиентом считается крайний справа адрес заголовка,
+# не входящий в этот список.
+THROTTLE_TRUSTED_PROXIES = [
+    proxy for proxy in os.environ.get('THROTTLE_TRUSTED_PROXIES', '').split(',') if proxy.strip()
+]
+ACCOUNT_THROTTLE_RATES = {
+    'login': {'ip': '20/m', 'email': '5/m'},
+    'register': {'ip': '20/h', 'email': '5/h'},
+}
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -125,10 +398,48 @@ STATICFILES_DIRS = [
     BASE_DIR / 'static' ]
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
-# MEDIA_URL = '/media/'
+# Сборка статики при collectstatic (по умолчанию при DEBUG=False):
+# бандлы CSS, WOFF2-шрифты, хешированные имена и сжатые копии .gz/.br.
+# См. core.storage.OptimizedManifestStaticFilesStorage.
+STATIC_PIPELINE = os.environ.get('STATIC_PIPELINE', str(not DEBUG)).lower() in ('1', 'true', 'yes')
+
+STATIC_BUNDLES = {
+    'css/site.css': [
+        'css/normalize.css',
+        'css/base.css',
+        'css/account/style_account.css',
+    ],
+}
+
+# Шрифты, нужные для первой отрисовки страницы
+STATIC_PRELOAD_FONTS = ['font/Bayon-Regular.woff2']
+
+if STATIC_PIPELINE:
+    STORAGES = {
+        'default': {
+            'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        },
+        'staticfiles': {
+            'BACKEND': 'core.storage.OptimizedManifestStaticFilesStorage',
+        },
+    }
+
+MEDIA_URL = '/media/'
+
+# Папка для хранения медиа-файлов
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', os.path.join(BASE_DIR, 'media'))
+
+# Загрузки всегда пишутся во временный файл по частям и переносятся в
+# MEDIA_ROOT без чтения в память, независимо от размера.
+FILE_UPLOAD_HANDLERS = ['django.core.files.uploadhandler.TemporaryFileUploadHandler']
+FILE_UPLOAD_TEMP_DIR = os.environ.get('FILE_UPLOAD_TEMP_DIR') or None
+MEDIA_MAX_UPLOAD_SIZE = int(os.environ.get('MEDIA_MAX_UPLOAD_SIZE', 10 * 1024 * 1024))
 
-# # Папка для хранения медиа-файлов
-# MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# WebP-варианты загруженных изображений (core.images): ширины для srcset,
+# качество и число фоновых потоков, которые их создают.
+IMAGE_VARIANT_WIDTHS = (320, 640, 960, 1280)
+IMAGE_VARIANT_QUALITY = int(os.environ.get('IMAGE_VARIANT_QUALITY', 80))
+IMAGE_VARIANT_WORKERS = int(os.environ.get('IMAGE_VARIANT_WORKERS', 2))
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -139,6 +450,7 @@ AUTH_USER_MODEL = "account.User"
 
 
 # LOGIN_REDIRECT_URL = 'blog'
+LOGIN_URL = 'account:login'
 
 
 
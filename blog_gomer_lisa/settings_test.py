@@ -0,0 +1,32 @@
+"""
+Быстрый профиль тестов.
+
+manage.py test использует его по умолчанию; прогон на рабочих настройках
+(например, на PostgreSQL с DB_PROFILE=postgres):
+
+    python manage.py test --settings blog_gomer_lisa.settings
+"""
+from .settings import *  # noqa: F401,F403
+
+# Хеширование пароля в тестах не проверяется на стойкость: MD5 на порядки
+# быстрее PBKDF2, который иначе выполняется при каждом create_user() и входе.
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# Тестовая база SQLite в памяти, независимо от DB_PROFILE.
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+# Кеш процесса: у каждого тестового процесса свой, без общего redis.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Тесты выполняются в нескольких процессах, по одному на ядро
+# (core.testing.TestRunner); --parallel 1 отключает это.
+TEST_PARALLEL = 'auto'
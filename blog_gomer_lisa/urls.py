@@ -19,10 +19,26 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from blog.sitemaps import PostSitemap
+from core.sitemaps import SitemapIndexView, SitemapSectionView, StaticSitemap
+from core.views import metrics_view
+
+sitemaps = {
+    'pages': StaticSitemap(['account:index', 'account:register', 'account:login', 'blog:index']),
+    'posts': PostSitemap(),
+}
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
+    path('sitemap.xml', SitemapIndexView.as_view(sitemaps=sitemaps), name='sitemap'),
+    path(
+        'sitemap-<slug:section>-<int:page>.xml',
+        SitemapSectionView.as_view(sitemaps=sitemaps),
+        name='sitemap-section',
+    ),
     path('', include('account.urls')),
-    path("blog", include("blog.urls")),
+    path("blog/", include("blog.urls")),
 ]
 
 
@@ -0,0 +1,83 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import patch_vary_headers
+from django.utils.translation import get_language
+
+from .metrics import counter
+
+view_cache_hits = counter("view_cache_hits_total", "Ответы, отданные из кеша представлений")
+view_cache_misses = counter("view_cache_misses_total", "Промахи кеша представлений")
+
+
+class AnonymousCacheMixin:
+    """
+    Кеширует готовые ответы представления для анонимных посетителей.
+
+    Ответ берется из кеша только для GET/HEAD запросов без сессионной
+    cookie и без аутентификации; все остальные запросы обрабатываются
+    как обычно. Ответы, которые выставляют cookie или используют
+    CSRF-токен, не кешируются, потому что содержат данные конкретного
+    посетителя.
+
+    Attributes:
+        cache_timeout (int, optional): Время жизни записи в секундах.
+            По умолчанию settings.VIEW_CACHE_TIMEOUT; 0 отключает кеш.
+        cache_alias (str): Псевдоним кеша из settings.CACHES.
+    """
+
+    cache_timeout = None
+    cache_alias = "default"
+
+    def dispatch(self, request, *args, **kwargs):
+        timeout = self.get_cache_timeout()
+        if not timeout or not self.is_cacheable_request(request):
+            return super().dispatch(request, *args, **kwargs)
+
+        cache = caches[self.cache_alias]
+        view_name = self.get_view_name(request)
+        key = self.get_view_cache_key(request, view_name)
+        response = cache.get(key)
+        if response is not None:
+            view_cache_hits.inc(view=view_name)
+            return response
+
+        view_cache_misses.inc(view=view_name)
+        response = super().dispatch(request, *args, **kwargs)
+        if hasattr(response, "render") and callable(response.render):
+            response.render()
+        patch_vary_headers(response, ("Cookie",))
+        if self.is_cacheable_response(request, response):
+            cache.set(key, response, timeout)
+        return response
+
+    def get_cache_timeout(self):
+        if self.cache_timeout is not None:
+            return self.cache_timeout
+        return getattr(settings, "VIEW_CACHE_TIMEOUT", 0)
+
+    def is_cacheable_request(self, request):
+        return (
+            request.method in ("GET", "HEAD")
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES
+            and not request.user.is_authenticated
+        )
+
+    def is_cacheable_response(self, request, response):
+        return (
+            response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            and not request.META.get("CSRF_COOKIE_NEEDS_UPDATE")
+        )
+
+    def get_view_name(self, request):
+        match = request.resolver_match
+        return match.view_name if match else type(self).__name__
+
+    def get_view_cache_key(self, request, view_name):
+        url = hashlib.md5(
+            request.build_absolute_uri().encode(), usedforsecurity=False
+        ).hexdigest()
+        return f"view:{view_name}:{get_language()}:{url}"
@@ -0,0 +1,180 @@
+import hashlib
+import uuid
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Model
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.utils.translation import get_language
+
+from .metrics import counter
+
+fragment_cache_hits = counter("fragment_cache_hits_total", "Фрагменты шаблонов, взятые из кеша")
+fragment_cache_misses = counter("fragment_cache_misses_total", "Фрагменты шаблонов, отрисованные заново")
+
+
+def get_cache():
+    return caches[settings.FRAGMENT_CACHE_ALIAS]
+
+
+def stamp_key(model, pk=None):
+    """Ключ версии модели целиком (pk=None) или одного объекта."""
+    label = model._meta.concrete_model._meta.label_lower
+    return f"fragver:{label}" if pk is None else f"fragver:{label}:{pk}"
+
+
+def new_stamp():
+    return uuid.uuid4().hex[:12]
+
+
+def get_stamps(keys):
+    """
+    Текущие версии по ключам stamp_key().
+
+    Версия, которой еще нет в кеше (или которую кеш вытеснил), создается
+    заново: фрагменты со старой версией просто перестают находиться.
+    """
+    cache = get_cache()
+    stamps = cache.get_many(keys)
+    for key in keys:
+        if key not in stamps:
+            stamp = new_stamp()
+            stamps[key] = stamp if cache.add(key, stamp, None) else cache.get(key, stamp)
+    return stamps
+
+
+def bump(model, pk=None):
+    """
+    Меняет версию объекта pk и модели целиком.
+
+    Фрагменты, которые зависят от объекта или от модели, после этого
+    отрисовываются заново; остальные фрагменты остаются в кеше.
+    """
+    bump_many(model, [] if pk is None else [pk])
+
+
+def bump_many(model, pks):
+    """Как bump(), но для нескольких объектов за одну запись в кеш."""
+    keys = [stamp_key(model), *(stamp_key(model, pk) for pk in pks)]
+    get_cache().set_many({key: new_stamp() for key in keys}, None)
+
+
+def invalidate_pks(model, pks, using=None):
+    """
+    Сбрасывает фрагменты, зависящие от объектов model с ключами pks.
+
+    Версия меняется сразу и еще раз после коммита: фрагмент, который
+    другой запрос успел отрисовать по еще не закоммиченным данным, не
+    переживет коммит.
+    """
+    model, pks = model._meta.concrete_model, list(pks)
+    bump_many(model, pks)
+    transaction.on_commit(lambda: bump_many(model, pks), using=using)
+
+
+def invalidate(instance):
+    """Сбрасывает фрагменты, зависящие от instance (см. invalidate_pks())."""
+    invalidate_pks(instance._meta.concrete_model, [instance.pk], using=instance._state.db)
+
+
+def track_fragments(model):
+    """
+    Подключает сброс фрагментов при сохранении и удалении объектов model.
+
+    Изменения many-to-many полей модели тоже учитываются. Изменения в
+    обход моделей (QuerySet.update(), bulk_create) версии не меняют, если
+    QuerySet модели сам не вызывает invalidate_pks(), как это делает
+    UserQuerySet.update() для пользователей.
+    """
+
+    def changed(sender, instance, raw=False, **kwargs):
+        if not raw:
+            invalidate(instance)
+
+    def relations_changed(sender, instance, action, reverse, **kwargs):
+        if not action.startswith("post_"):
+            return
+        if reverse:
+            # Со стороны другой модели затронуты объекты из pk_set.
+            for pk in kwargs["pk_set"] or [None]:
+                bump(model, pk)
+        else:
+            invalidate(instance)
+
+    uid = f"fragments:{model._meta.label}"
+    post_save.connect(changed, sender=model, weak=False, dispatch_uid=uid)
+    post_delete.connect(changed, sender=model, weak=False, dispatch_uid=uid)
+    for field in model._meta.many_to_many:
+        m2m_changed.connect(
+            relations_changed, sender=field.remote_field.through, weak=False, dispatch_uid=f"{uid}.{field.name}"
+        )
+
+
+def fragment_key(name, parts=(), models=()):
+    """
+    Ключ фрагмента name.
+
+    Args:
+        parts (Iterable): Объекты моделей (в ключ входит их версия) и любые
+            другие значения (входят как есть).
+        models (Iterable[type[Model]]): Модели, от всех объектов которых
+            зависит фрагмент.
+    """
+    keys, values = [], []
+    for part in parts:
+        if isinstance(part, Model):
+            keys.append(stamp_key(part._meta.model, part.pk))
+        else:
+            values.append(str(part))
+    keys += [stamp_key(model) for model in models]
+    stamps = get_stamps(keys)
+    source = "|".join([*(stamps[key] for key in keys), *values, get_language() or ""])
+    return f"fragment:{name}:{hashlib.md5(source.encode(), usedforsecurity=False).hexdigest()}"
+
+
+def cached_fragment(name, render, parts=(), models=(), timeout=None):
+    """
+    Возвращает HTML фрагмента из кеша или отрисовывает его через render().
+
+    Args:
+        render (Callable[[], str]): Отрисовка при промахе.
+        timeout (int, optional): Время жизни в секундах, по умолчанию
+            settings.FRAGMENT_CACHE_TIMEOUT; 0 отключает кеш.
+    """
+    timeout = settings.FRAGMENT_CACHE_TIMEOUT if timeout is None else timeout
+    if not timeout:
+        return render()
+    cache = get_cache()
+    key = fragment_key(name, parts, models)
+    html = cache.get(key)
+    if html is not None:
+        fragment_cache_hits.inc(fragment=name)
+        return html
+    fragment_cache_misses.inc(fragment=name)
+    html = render()
+    cache.set(key, html, timeout)
+    return html
+
+
+def resolve_models(labels):
+    """Модели по строке меток "app_label.Model ..." или списку меток."""
+    if isinstance(labels, str):
+        labels = labels.split()
+    return [apps.get_model(label) for label in labels]
+
+
+def hit_rates():
+    """
+    Доля попаданий по фрагментам в этом процессе.
+
+    Returns:
+        dict: {имя: (попадания, промахи, доля попаданий)}.
+    """
+    rates = {}
+    for labels, hits in fragment_cache_hits.samples():
+        rates[labels["fragment"]] = [hits, 0]
+    for labels, misses in fragment_cache_misses.samples():
+        rates.setdefault(labels["fragment"], [0, 0])[1] = misses
+    return {name: (hits, misses, hits / (hits + misses)) for name, (hits, misses) in rates.items()}
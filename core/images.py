@@ -0,0 +1,195 @@
+import io
+import logging
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.template.defaultfilters import filesizeformat
+from django.db import close_old_connections, transaction
+from django.db.models.signals import post_save
+from django.dispatch import Signal
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover
+    Image = ImageOps = None
+
+logger = logging.getLogger(__name__)
+
+# Отправляется из потока пула после записи вариантов: refresh_variants
+# обновляет запись через update(), и post_save не срабатывает.
+# Аргументы: sender - модель, pk, field_name.
+variants_built = Signal()
+
+
+def validate_upload_size(file):
+    """Валидатор поля файла: не больше settings.MEDIA_MAX_UPLOAD_SIZE байт."""
+    if file.size > settings.MEDIA_MAX_UPLOAD_SIZE:
+        raise ValidationError(
+            "File is too large (maximum %(size)s).",
+            code="file_too_large",
+            params={"size": filesizeformat(settings.MEDIA_MAX_UPLOAD_SIZE)},
+        )
+
+
+def variant_name(name, width):
+    """Имя WebP-варианта ширины width для файла name."""
+    stem, _ext = posixpath.splitext(name)
+    return f"{stem}.w{width}.webp"
+
+
+def generate_variants(storage, name, widths=None, quality=None):
+    """
+    Создает уменьшенные WebP-копии изображения рядом с оригиналом.
+
+    Изображение открывается из хранилища потоком, поворачивается по EXIF,
+    и для каждой ширины меньше исходной сохраняется вариант
+    "<имя>.w<ширина>.webp". Плюс всегда создается WebP исходной ширины
+    (не больше максимальной из widths).
+
+    Args:
+        storage (Storage): Хранилище, где лежит файл.
+        name (str): Имя файла в хранилище.
+        widths (Iterable[int], optional): Ширины вариантов, по умолчанию
+            settings.IMAGE_VARIANT_WIDTHS.
+        quality (int, optional): Качество WebP, по умолчанию
+            settings.IMAGE_VARIANT_QUALITY.
+
+    Returns:
+        list[int]: Ширины созданных вариантов по возрастанию.
+    """
+    if Image is None:
+        raise RuntimeError("Pillow is required to build image variants")
+    widths = sorted(widths or settings.IMAGE_VARIANT_WIDTHS)
+    quality = quality or settings.IMAGE_VARIANT_QUALITY
+    with storage.open(name) as f:
+        with Image.open(f) as original:
+            image = ImageOps.exif_transpose(original)
+            image.load()
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+    targets = [width for width in widths if width < image.width]
+    targets.append(min(image.width, widths[-1]))
+    built = []
+    for width in sorted(set(targets)):
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        output = io.BytesIO()
+        resized.save(output, "WEBP", quality=quality, method=4)
+        target = variant_name(name, width)
+        if storage.exists(target):
+            storage.delete(target)
+        storage.save(target, ContentFile(output.getvalue()))
+        built.append(width)
+    return built
+
+
+class VariantPool:
+    """
+    Фоновый пул для генерации вариантов изображений.
+
+    Задачи ставятся после коммита транзакции, поэтому запрос на загрузку
+    не ждет ресайза, а воркер видит уже сохраненную запись. Pillow
+    отпускает GIL на декодировании и ресайзе, поэтому потоков достаточно.
+    Пул создается лениво при первой задаче.
+
+    Args:
+        max_workers (int): Количество потоков.
+    """
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self._executor = None
+        self._futures = set()
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="image-variants")
+            future = self._executor.submit(self._run, func, *args)
+            self._futures.add(future)
+        future.add_done_callback(self._discard)
+        return future
+
+    def submit_on_commit(self, func, *args):
+        transaction.on_commit(lambda: self.submit(func, *args))
+
+    def join(self, timeout=None):
+        """Ждет завершения всех поставленных задач (для тестов и команд)."""
+        with self._lock:
+            futures = list(self._futures)
+        wait(futures, timeout)
+
+    def _discard(self, future):
+        with self._lock:
+            self._futures.discard(future)
+
+    @staticmethod
+    def _run(func, *args):
+        try:
+            return func(*args)
+        except Exception:
+            logger.exception("Image variant task %s failed", getattr(func, "__name__", func))
+            raise
+        finally:
+            # Поток пула живет дольше запроса, соединение за ним не закрывает никто.
+            close_old_connections()
+
+
+variant_pool = VariantPool(settings.IMAGE_VARIANT_WORKERS)
+
+
+def refresh_variants(model, pk, field_name, variants_field):
+    """
+    Создает варианты для текущего файла записи и сохраняет их ширины.
+
+    Выполняется в пуле. Состояние хранится в JSON-поле variants_field
+    как {"source": имя файла, "widths": [...]}; если файл за это время
+    заменили, результат не записывается - задача для нового файла уже
+    поставлена.
+    """
+    obj = model._default_manager.filter(pk=pk).only(field_name, variants_field).first()
+    if obj is None:
+        return
+    file = getattr(obj, field_name)
+    state = getattr(obj, variants_field) or {}
+    if not file:
+        if state:
+            model._default_manager.filter(pk=pk).update(**{variants_field: {}})
+        return
+    if state.get("source") == file.name:
+        return
+    widths = generate_variants(file.storage, file.name)
+    updated = model._default_manager.filter(pk=pk, **{field_name: file.name}).update(
+        **{variants_field: {"source": file.name, "widths": widths}}
+    )
+    if updated:
+        variants_built.send(sender=model, pk=pk, field_name=field_name)
+
+
+def track_image_variants(model, field_name, variants_field):
+    """
+    Подключает фоновую генерацию вариантов для поля изображения модели.
+
+    После сохранения записи, у которой файл отличается от того, для
+    которого построены варианты, в variant_pool ставится refresh_variants.
+    Старые файлы и их варианты удаляет manage.py cleanup_media.
+    """
+
+    def schedule(sender, instance, raw=False, update_fields=None, **kwargs):
+        if raw or (update_fields is not None and field_name not in update_fields):
+            return
+        # Отложенное поле не менялось, а обращение к нему - лишний запрос.
+        if {field_name, variants_field} & instance.get_deferred_fields():
+            return
+        file = getattr(instance, field_name)
+        state = getattr(instance, variants_field) or {}
+        if (file.name or None) != state.get("source"):
+            variant_pool.submit_on_commit(refresh_variants, model, instance.pk, field_name, variants_field)
+
+    post_save.connect(schedule, sender=model, weak=False, dispatch_uid=f"variants:{model._meta.label}.{field_name}")
@@ -0,0 +1,126 @@
+import contextvars
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .metrics import counter, histogram
+
+http_requests = counter("http_requests_total", "Обработанные запросы по представлению и статусу")
+http_request_seconds = histogram("http_request_seconds", "Время обработки запроса представлением")
+http_request_db_seconds = histogram("http_request_db_seconds", "Суммарное время SQL-запросов за запрос")
+http_request_template_seconds = histogram(
+    "http_request_template_seconds", "Суммарное время рендеринга шаблонов за запрос"
+)
+http_request_db_queries = histogram(
+    "http_request_db_queries",
+    "Количество SQL-запросов за запрос",
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+
+# Статистика текущего запроса; None вне InstrumentationMiddleware.
+current_stats = contextvars.ContextVar("request_stats", default=None)
+
+
+class RequestStats:
+    """Счетчики одного запроса: SQL-запросы, время базы и шаблонов."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Обертка execute_wrapper, учитывающая SQL-запрос в статистике запроса.
+
+    Ставится на соединение один раз при подключении (см. install_query_recorder),
+    а статистику берет из contextvar: он копируется в потоки sync_to_async,
+    поэтому запросы асинхронных представлений тоже учитываются.
+    """
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_seconds += time.perf_counter() - started
+        stats.queries += 1
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """Обработчик сигнала connection_created."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def record_template_time(seconds):
+    """Добавляет время рендеринга шаблона к статистике текущего запроса."""
+    stats = current_stats.get()
+    if stats is not None:
+        stats.template_seconds += seconds
+
+
+class InstrumentationMiddleware:
+    """
+    Замеряет каждый запрос: число SQL-запросов, время базы, время
+    шаблонов и общее время обработки.
+
+    Значения пишутся в метрики core.metrics с меткой view (имя URL,
+    например "account:login") и, при settings.SERVER_TIMING, в заголовок
+    Server-Timing ответа, который показывают инструменты разработчика
+    браузера. Middleware стоит ставить первым в MIDDLEWARE, чтобы в замер
+    попали запросы остальных middleware (сессии, аутентификация).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats, token, started = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        return self.finish(request, response, stats, started)
+
+    async def __acall__(self, request):
+        stats, token, started = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        return self.finish(request, response, stats, started)
+
+    def start(self):
+        stats = RequestStats()
+        return stats, current_stats.set(stats), time.perf_counter()
+
+    def finish(self, request, response, stats, started):
+        seconds = time.perf_counter() - started
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match else "<unresolved>"
+        http_requests.inc(view=view, method=request.method, status=response.status_code)
+        http_request_seconds.observe(seconds, view=view)
+        http_request_db_seconds.observe(stats.db_seconds, view=view)
+        http_request_db_queries.observe(stats.queries, view=view)
+        http_request_template_seconds.observe(stats.template_seconds, view=view)
+        if getattr(settings, "SERVER_TIMING", False):
+            response.headers["Server-Timing"] = ", ".join(
+                [
+                    f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries"',
+                    f"tpl;dur={stats.template_seconds * 1000:.1f}",
+                    f"app;dur={seconds * 1000:.1f}",
+                ]
+            )
+        return response
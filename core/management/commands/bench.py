@@ -0,0 +1,110 @@
+import json
+import os
+import platform
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks import load
+from benchmarks.utils import test_database
+
+
+class Command(BaseCommand):
+    """
+    Нагрузочный прогон страниц проекта через WSGI- и ASGI-приложения.
+
+    Во временной базе создаются пользователи, записи и комментарии, затем
+    каждый сценарий (benchmarks.load.scenarios) выполняется --requests раз
+    с --concurrency одновременными клиентами. Отчет - JSON с пропускной
+    способностью и перцентилями p50/p95/p99 для каждой пары
+    сервер/сценарий.
+
+    С --baseline результаты сравниваются с сохраненными ранее: если
+    пропускная способность упала или p95 вырос больше чем на
+    --threshold процентов, команда завершается с ошибкой. Ошибкой
+    считаются и ответы с неожиданным кодом.
+
+    Пример:
+        python manage.py bench --save-baseline --baseline benchmarks/baseline.json
+        python manage.py bench --baseline benchmarks/baseline.json --threshold 20
+        python manage.py bench --server wsgi --scenario blog-post --requests 2000
+    """
+
+    help = "Нагрузочный прогон страниц через WSGI и ASGI с проверкой регрессий"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scenario", action="append", choices=sorted(load.scenarios), help="Сценарий (по умолчанию все)"
+        )
+        parser.add_argument("--server", action="append", choices=sorted(load.RUNNERS), help="wsgi и/или asgi")
+        parser.add_argument("--requests", type=int, default=200, help="Запросов на сценарий")
+        parser.add_argument("--concurrency", type=int, default=8, help="Одновременных клиентов")
+        parser.add_argument("--warmup", type=int, default=10, help="Запросов прогрева на сценарий")
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--posts", type=int, default=200)
+        parser.add_argument("--comments", type=int, default=10, help="Комментариев на запись")
+        parser.add_argument("--output", help="Файл для JSON-отчета (по умолчанию stdout)")
+        parser.add_argument("--baseline", help="Файл с базовыми результатами")
+        parser.add_argument("--save-baseline", action="store_true", help="Записать результаты в --baseline")
+        parser.add_argument("--threshold", type=float, default=20.0, help="Допустимое ухудшение, %%")
+
+    def handle(self, *args, **options):
+        if options["save_baseline"] and not options["baseline"]:
+            raise CommandError("--save-baseline requires --baseline")
+        if options["requests"] < 1 or options["concurrency"] < 1:
+            raise CommandError("--requests and --concurrency must be positive")
+
+        with test_database(file_backed=True):
+            data = load.seed(options["users"], options["posts"], options["comments"])
+            results = load.run_suite(
+                data,
+                names=options["scenario"],
+                servers=options["server"] or list(load.RUNNERS),
+                requests=options["requests"],
+                concurrency=options["concurrency"],
+                warmup=options["warmup"],
+                progress=self.progress,
+            )
+
+        report = {
+            "meta": {
+                "requests": options["requests"],
+                "concurrency": options["concurrency"],
+                "db_profile": settings.DB_PROFILE,
+                "cache_backend": settings.CACHE_BACKEND,
+                "session_store": settings.SESSION_STORE,
+                "password_hasher": settings.PASSWORD_HASHER,
+                "python": platform.python_version(),
+                "django": django.get_version(),
+                "cpus": os.cpu_count(),
+            },
+            "results": results,
+        }
+        if options["output"]:
+            load.save_report(report, options["output"])
+        else:
+            self.stdout.write(json.dumps(report, indent=2, sort_keys=True))
+
+        errors = {key: result["errors"] for key, result in results.items() if result["errors"]}
+        if errors:
+            raise CommandError(f"Unexpected response status: {errors}")
+
+        if options["save_baseline"]:
+            load.save_report(report, options["baseline"])
+            self.stderr.write(f"Baseline saved to {options['baseline']}")
+        elif options["baseline"]:
+            try:
+                baseline = load.load_report(options["baseline"])
+            except FileNotFoundError:
+                raise CommandError(f"Baseline {options['baseline']} not found, run with --save-baseline")
+            regressions = load.compare(baseline["results"], results, options["threshold"] / 100)
+            if regressions:
+                raise CommandError("Performance regression:\n" + "\n".join(regressions))
+            self.stderr.write(self.style.SUCCESS(f"No regressions above {options['threshold']:g}%"))
+
+    def progress(self, key, result):
+        self.stderr.write(
+            f"{key:<24} {result['rps']:8.1f} req/s  p50={result['p50_ms']:7.2f}  p95={result['p95_ms']:7.2f}"
+            f"  p99={result['p99_ms']:7.2f} ms  errors={result['errors']}"
+        )
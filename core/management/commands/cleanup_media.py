@@ -0,0 +1,79 @@
+import posixpath
+import re
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import models
+from django.template.defaultfilters import filesizeformat
+from django.utils import timezone
+
+VARIANT_RE = re.compile(r"^(?P<stem>.+)\.w\d+\.webp$")
+
+
+class Command(BaseCommand):
+    """
+    Удаляет из хранилища медиа файлы, на которые не ссылается ни одна запись.
+
+    Ссылки собираются из всех FileField/ImageField всех моделей потоком,
+    WebP-варианты (core.images) считаются используемыми, пока используется
+    их оригинал. Файлы моложе --min-age не трогаются: это может быть
+    загрузка, транзакция которой еще не закоммичена.
+
+    Пример:
+        python manage.py cleanup_media --dry-run
+        python manage.py cleanup_media --min-age 6
+    """
+
+    help = "Удаляет осиротевшие медиа-файлы и их варианты"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--min-age", type=float, default=24, help="Минимальный возраст файла в часах")
+        parser.add_argument("--dry-run", action="store_true", help="Только показать, что будет удалено")
+
+    def handle(self, *args, **options):
+        referenced = self.referenced_names()
+        stems = {posixpath.splitext(name)[0] for name in referenced}
+        threshold = timezone.now() - timedelta(hours=options["min_age"])
+
+        removed = freed = 0
+        for name in self.walk(default_storage, ""):
+            if name in referenced:
+                continue
+            variant = VARIANT_RE.match(name)
+            if variant and variant.group("stem") in stems:
+                continue
+            if default_storage.get_modified_time(name) > threshold:
+                continue
+            size = default_storage.size(name)
+            if options["verbosity"] >= 2 or options["dry_run"]:
+                self.stdout.write(f"  {name} ({filesizeformat(size)})")
+            if not options["dry_run"]:
+                default_storage.delete(name)
+            removed += 1
+            freed += size
+
+        action = "Would remove" if options["dry_run"] else "Removed"
+        self.stdout.write(self.style.SUCCESS(f"{action} {removed} files, {filesizeformat(freed)}"))
+
+    @staticmethod
+    def referenced_names():
+        names = set()
+        for model in apps.get_models():
+            for field in model._meta.concrete_fields:
+                if not isinstance(field, models.FileField) or field.storage is not default_storage:
+                    continue
+                values = model._default_manager.exclude(**{field.attname: ""}).values_list(field.attname, flat=True)
+                names.update(name for name in values.iterator(chunk_size=5000) if name)
+        return names
+
+    def walk(self, storage, path):
+        try:
+            directories, files = storage.listdir(path)
+        except FileNotFoundError:
+            return
+        for filename in files:
+            yield posixpath.join(path, filename) if path else filename
+        for directory in directories:
+            yield from self.walk(storage, posixpath.join(path, directory) if path else directory)
@@ -0,0 +1,78 @@
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from core.tasks import claim, execute, purge_finished
+
+
+class Command(BaseCommand):
+    """
+    Воркер фоновых задач из таблицы core_task.
+
+    Основной поток забирает готовые задачи пачкой (core.tasks.claim) и
+    раздает их пулу потоков; побочные эффекты задач - почта, HTTP,
+    запись событий - в основном ждут сети, поэтому потоков достаточно.
+    Несколько воркеров (процессов или хостов) можно запускать
+    одновременно: одна задача достается только одному из них.
+
+    SIGTERM/SIGINT останавливают воркер после текущей пачки.
+
+    Пример:
+        python manage.py run_worker --concurrency 4
+        python manage.py run_worker --once    # выполнить готовые задачи и выйти
+    """
+
+    help = "Выполняет фоновые задачи из очереди"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=4, help="Количество потоков")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Пауза при пустой очереди, с")
+        parser.add_argument("--once", action="store_true", help="Выполнить готовые задачи и завершиться")
+
+    def handle(self, *args, **options):
+        autodiscover_modules("tasks")
+        self.stopping = threading.Event()
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+
+        worker = f"{socket.gethostname()}:{os.getpid()}"
+        concurrency = options["concurrency"]
+        done = failed = 0
+        next_purge = 0.0
+        with ThreadPoolExecutor(concurrency, thread_name_prefix="task-worker") as pool:
+            while not self.stopping.is_set():
+                close_old_connections()
+                tasks = claim(worker, concurrency * 2)
+                if tasks:
+                    for ok in pool.map(self.run, tasks):
+                        done, failed = (done + 1, failed) if ok else (done, failed + 1)
+                    continue
+                if options["once"]:
+                    break
+                if time.monotonic() >= next_purge:
+                    purge_finished(timezone.now() - timedelta(days=settings.TASKS_KEEP_DAYS))
+                    next_purge = time.monotonic() + 3600
+                self.stopping.wait(options["poll_interval"])
+
+        self.stdout.write(self.style.SUCCESS(f"Worker {worker}: {done} done, {failed} failed"))
+
+    def stop(self, signum, frame):
+        self.stopping.set()
+
+    @staticmethod
+    def run(task):
+        try:
+            return execute(task)
+        finally:
+            close_old_connections()
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.templates import warm_templates
+
+
+class Command(BaseCommand):
+    """
+    Компилирует все шаблоны проекта и сообщает о самых медленных.
+
+    Команда работает в отдельном процессе, поэтому полезна как проверка
+    при деплое: ошибки синтаксиса в любом шаблоне завершают ее с ошибкой.
+    Прогрев самих воркеров выполняется при их старте, если включен
+    TEMPLATE_WARMUP.
+    """
+
+    help = "Предварительно загружает и компилирует все шаблоны"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=5, help="Сколько самых медленных шаблонов показать")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        loaded, failed = warm_templates()
+        elapsed = time.perf_counter() - started
+
+        for name, seconds in sorted(loaded, key=lambda item: item[1], reverse=True)[: options["top"]]:
+            self.stdout.write(f"  {seconds * 1000:7.2f} ms  {name}")
+        for name, exc in failed:
+            self.stderr.write(f"  {name}: {exc}")
+
+        self.stdout.write(f"Compiled {len(loaded)} templates in {elapsed:.2f}s")
+        if failed:
+            raise CommandError(f"{len(failed)} templates failed to compile")
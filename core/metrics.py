@@ -0,0 +1,155 @@
+import bisect
+import itertools
+import threading
+from collections import defaultdict
+
+
+class Counter:
+    """
+    Монотонный счетчик с метками, живущий в памяти процесса.
+
+    Значения хранятся отдельно для каждого набора меток, например
+    counter.inc(view="account:index").
+    """
+
+    def __init__(self, name, description=""):
+        self.name = name
+        self.description = description
+        self._values = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] += amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def samples(self):
+        """Возвращает список пар (метки, значение)."""
+        with self._lock:
+            return [(dict(key), value) for key, value in self._values.items()]
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    """
+    Гистограмма длительностей с фиксированными границами корзин (в секундах).
+
+    Для каждого набора меток хранит количество наблюдений в корзинах,
+    их сумму и общее число, как гистограммы Prometheus.
+    """
+
+    DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+    def __init__(self, name, description="", buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Последняя корзина соответствует +Inf.
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels):
+        state = self._values.get(tuple(sorted(labels.items())))
+        return state[2] if state else 0
+
+    def samples(self):
+        """
+        Возвращает список кортежей (метки, накопленные корзины, сумма, количество).
+
+        Накопленные корзины - пары (граница, число наблюдений <= границы),
+        последней идет граница float("inf").
+        """
+        bounds = self.buckets + (float("inf"),)
+        result = []
+        with self._lock:
+            for key, (counts, total, count) in self._values.items():
+                cumulative = list(zip(bounds, itertools.accumulate(counts)))
+                result.append((dict(key), cumulative, total, count))
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+# Все метрики процесса по имени.
+registry = {}
+_registry_lock = threading.Lock()
+
+
+def counter(name, description=""):
+    """Возвращает счетчик с указанным именем, создавая его при первом обращении."""
+    with _registry_lock:
+        metric = registry.get(name)
+        if metric is None:
+            metric = registry[name] = Counter(name, description)
+        return metric
+
+
+def histogram(name, description="", buckets=Histogram.DEFAULT_BUCKETS):
+    """Возвращает гистограмму с указанным именем, создавая ее при первом обращении."""
+    with _registry_lock:
+        metric = registry.get(name)
+        if metric is None:
+            metric = registry[name] = Histogram(name, description, buckets)
+        return metric
+
+
+def _format_labels(labels, **extra):
+    labels = {**labels, **extra}
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in sorted(labels.items()):
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+def render_prometheus():
+    """
+    Выводит все метрики реестра в текстовом формате Prometheus 0.0.4.
+
+    Метрики живут в памяти процесса, поэтому при нескольких воркерах
+    каждый отдает свои значения, а суммирует их сервер мониторинга.
+    """
+    lines = []
+    with _registry_lock:
+        metrics = sorted(registry.values(), key=lambda metric: metric.name)
+    for metric in metrics:
+        kind = "counter" if isinstance(metric, Counter) else "histogram"
+        if metric.description:
+            lines.append(f"# HELP {metric.name} {metric.description}")
+        lines.append(f"# TYPE {metric.name} {kind}")
+        if kind == "counter":
+            for labels, value in metric.samples():
+                lines.append(f"{metric.name}{_format_labels(labels)} {value}")
+            continue
+        for labels, buckets, total, count in metric.samples():
+            for bound, cumulative in buckets:
+                le = _format_labels(labels, le=_format_bound(bound))
+                lines.append(f"{metric.name}_bucket{le} {cumulative}")
+            lines.append(f"{metric.name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{metric.name}_count{_format_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,62 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """
+    Фоновая задача в очереди (см. core.tasks).
+
+    Задача добавляется в той же транзакции, что и данные, из-за которых
+    она появилась, поэтому воркер не увидит задачу для откатившейся
+    регистрации и не потеряет задачу для сохраненной.
+
+    Attributes:
+        name (CharField): Имя зарегистрированной функции задачи.
+        args (JSONField): Позиционные аргументы.
+        kwargs (JSONField): Именованные аргументы.
+        key (CharField): Ключ идемпотентности: задача с тем же ключом
+            ставится в очередь только один раз.
+        status (CharField): Состояние задачи.
+        attempts (PositiveSmallIntegerField): Сколько раз задача была взята
+            воркером.
+        max_attempts (PositiveSmallIntegerField): После стольких неудач
+            задача помечается failed.
+        run_at (DateTimeField): Не раньше этого времени задача будет взята.
+        locked_by (CharField): Метка воркера, который выполняет задачу.
+        locked_at (DateTimeField): Когда задача была взята.
+        last_error (TextField): Traceback последней ошибки.
+        created_at (DateTimeField): Дата постановки в очередь.
+        finished_at (DateTimeField): Дата успешного или окончательно
+            неуспешного завершения.
+
+    Meta:
+        idx_task_due: Выборка готовых к запуску задач по (status, run_at).
+    """
+
+    class Status(models.TextChoices):
+        QUEUED = "queued"
+        RUNNING = "running"
+        DONE = "done"
+        FAILED = "failed"
+
+    name = models.CharField(max_length=200)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    key = models.CharField(max_length=200, unique=True, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=64, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "run_at"], name="idx_task_due"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} [{self.status}]"
@@ -0,0 +1,176 @@
+import base64
+import binascii
+import hashlib
+import json
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+
+class InvalidCursor(ValueError):
+    """Курсор поврежден или не соответствует порядку сортировки."""
+
+
+@dataclass
+class KeysetPage:
+    """
+    Страница keyset-пагинации.
+
+    Attributes:
+        object_list (list): Объекты страницы.
+        next_cursor (str | None): Курсор следующей (более старой) страницы.
+        previous_cursor (str | None): Курсор предыдущей (более новой) страницы.
+    """
+
+    object_list: list
+    next_cursor: str | None = None
+    previous_cursor: str | None = None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class KeysetPaginator:
+    """
+    Пагинация по курсору (keyset) вместо OFFSET.
+
+    Страница выбирается условием "строго после последней строки предыдущей
+    страницы" по ключу сортировки, поэтому база читает из индекса только
+    per_page + 1 строк на любой глубине архива, а не пропускает все
+    предыдущие. Сортировка - по убыванию двух полей: основного (например,
+    даты) и уникального поля-разрешителя (id), для которых должен быть
+    составной индекс.
+
+    Условие записывается как field <= value AND (field < value OR id < last_id):
+    первая часть дает базе диапазон по индексу, вторая отсекает уже
+    показанные строки с тем же значением field.
+
+    Args:
+        queryset (QuerySet): Отфильтрованный queryset без сортировки.
+        per_page (int): Размер страницы.
+        field (str): Основное поле сортировки.
+        tiebreaker (str): Уникальное поле для строк с равным field.
+    """
+
+    def __init__(self, queryset, per_page, field, tiebreaker="id"):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.field = field
+        self.tiebreaker = tiebreaker
+
+    def encode_cursor(self, obj, direction):
+        value = getattr(obj, self.field)
+        payload = [direction, value.isoformat() if hasattr(value, "isoformat") else value,
+                   getattr(obj, self.tiebreaker)]
+        return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            direction, value, key = json.loads(base64.urlsafe_b64decode(padded))
+        except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as exc:
+            raise InvalidCursor(cursor) from exc
+        if direction not in ("next", "prev") or isinstance(key, (list, dict)):
+            raise InvalidCursor(cursor)
+        if isinstance(value, str):
+            value = parse_datetime(value) or value
+        return direction, value, key
+
+    def page(self, cursor=None):
+        """
+        Возвращает страницу после (или перед) курсором.
+
+        Args:
+            cursor (str, optional): Курсор из KeysetPage; None - первая страница.
+
+        Raises:
+            InvalidCursor: Если курсор не удалось разобрать.
+        """
+        field, tiebreaker = self.field, self.tiebreaker
+        if cursor is None:
+            rows = list(self.queryset.order_by(f"-{field}", f"-{tiebreaker}")[: self.per_page + 1])
+            return self._build(rows[: self.per_page], has_more=len(rows) > self.per_page, has_before=False)
+
+        direction, value, key = self.decode_cursor(cursor)
+        try:
+            if direction == "next":
+                rows = self.queryset.filter(
+                    Q(**{f"{field}__lte": value}),
+                    Q(**{f"{field}__lt": value}) | Q(**{f"{tiebreaker}__lt": key}),
+                ).order_by(f"-{field}", f"-{tiebreaker}")
+            else:
+                # Назад: читаем строки после курсора в обратном порядке и разворачиваем.
+                rows = self.queryset.filter(
+                    Q(**{f"{field}__gte": value}),
+                    Q(**{f"{field}__gt": value}) | Q(**{f"{tiebreaker}__gt": key}),
+                ).order_by(field, tiebreaker)
+        except (ValidationError, TypeError, ValueError) as exc:
+            raise InvalidCursor(cursor) from exc
+
+        rows = list(rows[: self.per_page + 1])
+        if direction == "next":
+            return self._build(rows[: self.per_page], has_more=len(rows) > self.per_page, has_before=True)
+        return self._build(rows[: self.per_page][::-1], has_more=True, has_before=len(rows) > self.per_page)
+
+    def _build(self, object_list, has_more, has_before):
+        page = KeysetPage(object_list)
+        if object_list and has_more:
+            page.next_cursor = self.encode_cursor(object_list[-1], "next")
+        if object_list and has_before:
+            page.previous_cursor = self.encode_cursor(object_list[0], "prev")
+        return page
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator без точного COUNT(*) по большим таблицам.
+
+    На PostgreSQL число строк берется из оценки планировщика
+    (EXPLAIN запроса списка, без чтения таблицы); если оценка меньше
+    ADMIN_EXACT_COUNT_LIMIT, выполняется точный COUNT - на малых
+    выборках он дешев, а оценка там заметно врет. На остальных базах
+    (SQLite) оценки нет, поэтому точный COUNT кешируется на
+    ADMIN_COUNT_CACHE_TIMEOUT секунд по тексту запроса: число страниц
+    может отставать на это время.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+        queryset = queryset.order_by()
+        if connections[queryset.db].vendor == "postgresql":
+            estimate = self.planner_estimate(queryset)
+            if estimate >= settings.ADMIN_EXACT_COUNT_LIMIT:
+                return estimate
+            return queryset.count()
+        source = f"{queryset.db}|{queryset.query}"
+        key = f"count:{hashlib.md5(source.encode(), usedforsecurity=False).hexdigest()}"
+        return cache.get_or_set(key, queryset.count, settings.ADMIN_COUNT_CACHE_TIMEOUT)
+
+    @staticmethod
+    def planner_estimate(queryset):
+        """Число строк queryset по оценке планировщика PostgreSQL."""
+        plan = json.loads(queryset.explain(format="json"))
+        if isinstance(plan, list):
+            plan = plan[0]
+        return int(plan["Plan"]["Plan Rows"])
@@ -0,0 +1,43 @@
+import ipaddress
+from functools import lru_cache
+
+from django.conf import settings
+
+
+@lru_cache(maxsize=8)
+def _networks(proxies):
+    return tuple(ipaddress.ip_network(proxy.strip(), strict=False) for proxy in proxies if proxy.strip())
+
+
+def _is_trusted(addr, networks):
+    try:
+        ip = ipaddress.ip_address(addr)
+    except ValueError:
+        return False
+    return any(ip in network for network in networks)
+
+
+def get_client_ip(request):
+    """
+    Адрес клиента с учетом доверенных прокси.
+
+    Если запрос пришел от адреса из settings.THROTTLE_TRUSTED_PROXIES
+    (адреса и подсети, например nginx на том же хосте), адрес клиента
+    берется из X-Forwarded-For: справа налево пропускаются доверенные
+    прокси, и возвращается первый недоверенный адрес. Левые записи
+    заголовка клиент может подделать, поэтому им не верим. Без
+    доверенных прокси возвращается REMOTE_ADDR.
+
+    Returns:
+        str: IP-адрес клиента или пустая строка.
+    """
+    addr = request.META.get("REMOTE_ADDR", "")
+    networks = _networks(tuple(settings.THROTTLE_TRUSTED_PROXIES))
+    if not networks or not _is_trusted(addr, networks):
+        return addr
+    forwarded = request.META.get("HTTP_X_FORWARDED_FOR", "")
+    for hop in reversed([hop.strip() for hop in forwarded.split(",") if hop.strip()]):
+        addr = hop
+        if not _is_trusted(hop, networks):
+            break
+    return addr
@@ -0,0 +1,127 @@
+from django.http import Http404
+from django.urls import reverse
+from django.views import View
+
+from .streaming import ConditionalStreamMixin, stream_xml
+
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+
+class Sitemap:
+    """
+    Раздел карты сайта.
+
+    Раздел делится на страницы, каждая страница - отдельный файл
+    sitemap-<раздел>-<номер>.xml не больше 50 000 адресов, а индекс
+    sitemap.xml перечисляет все страницы всех разделов.
+    """
+
+    def last_modified(self):
+        """Дата последнего изменения раздела или None."""
+        return None
+
+    def pages(self):
+        """Номера страниц раздела и даты их последнего изменения: [(номер, datetime | None)]."""
+        return [(1, None)]
+
+    def has_page(self, page):
+        """Есть ли у раздела страница с таким номером (одна из pages())."""
+        return any(number == page for number, _lastmod in self.pages())
+
+    def items(self, page):
+        """Адреса страницы: итератор пар (путь, datetime | None)."""
+        raise NotImplementedError
+
+
+class StaticSitemap(Sitemap):
+    """
+    Раздел из страниц без данных, заданных именами URL.
+
+    Args:
+        url_names (Iterable[str]): Имена URL, например "account:index".
+    """
+
+    def __init__(self, url_names):
+        self.url_names = list(url_names)
+
+    def items(self, page):
+        return ((reverse(name), None) for name in self.url_names)
+
+
+def write_lastmod(handler, lastmod):
+    if lastmod is not None:
+        handler.addQuickElement("lastmod", lastmod.isoformat(timespec="seconds"))
+
+
+class SitemapIndexView(ConditionalStreamMixin, View):
+    """
+    Индекс карты сайта (sitemap.xml) со ссылками на страницы разделов.
+
+    Разделы передаются в as_view(sitemaps={"имя": Sitemap, ...}).
+    """
+
+    sitemaps = {}
+
+    def get_last_modified(self):
+        dates = [sitemap.last_modified() for sitemap in self.sitemaps.values()]
+        return max(filter(None, dates), default=None)
+
+    def stream_content(self):
+        def entries():
+            for name, sitemap in self.sitemaps.items():
+                for page, lastmod in sitemap.pages():
+                    yield reverse("sitemap-section", kwargs={"section": name, "page": page}), lastmod
+
+        def write_entry(handler, entry):
+            path, lastmod = entry
+            handler.startElement("sitemap", {})
+            handler.addQuickElement("loc", self.request.build_absolute_uri(path))
+            write_lastmod(handler, lastmod)
+            handler.endElement("sitemap")
+
+        return stream_xml(
+            lambda handler: handler.startElement("sitemapindex", {"xmlns": SITEMAP_NS}),
+            entries(),
+            write_entry,
+            lambda handler: handler.endElement("sitemapindex"),
+        )
+
+
+class SitemapSectionView(ConditionalStreamMixin, View):
+    """Страница раздела карты сайта (sitemap-<раздел>-<номер>.xml)."""
+
+    sitemaps = {}
+
+    def get(self, request, *args, **kwargs):
+        # Проверка до условного ответа и кеша: несуществующей странице
+        # не отдаются ни 304, ни пустой urlset.
+        if not self.get_sitemap().has_page(self.kwargs["page"]):
+            raise Http404("Invalid page")
+        return super().get(request, *args, **kwargs)
+
+    def get_last_modified(self):
+        return self.get_sitemap().last_modified()
+
+    def get_sitemap(self):
+        try:
+            return self.sitemaps[self.kwargs["section"]]
+        except KeyError:
+            raise Http404("Unknown sitemap section")
+
+    def stream_content(self):
+        sitemap = self.get_sitemap()
+        page = self.kwargs["page"]
+
+        def write_url(handler, item):
+            path, lastmod = item
+            handler.startElement("url", {})
+            handler.addQuickElement("loc", self.request.build_absolute_uri(path))
+            write_lastmod(handler, lastmod)
+            handler.endElement("url")
+
+        return stream_xml(
+            lambda handler: handler.startElement("urlset", {"xmlns": SITEMAP_NS}),
+            sitemap.items(page),
+            write_url,
+            lambda handler: handler.endElement("urlset"),
+        )
@@ -0,0 +1,222 @@
+import gzip
+import io
+import logging
+import os
+import posixpath
+import re
+import string
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.template.utils import get_app_template_dirs
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    from fontTools import subset as font_subset
+except ImportError:  # pragma: no cover
+    font_subset = None
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+CSS_URL_RE = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+TTF_SRC_RE = re.compile(r"""url\(\s*(['"]?)([^'")]+)\.ttf\1\s*\)(?!\s*format)""")
+# Фон из растровой картинки в минифицированном CSS.
+RASTER_BACKGROUND_RE = re.compile(
+    r"""background-image:url\((['"]?)([^'")]+)\.(png|jpe?g)\1\)"""
+)
+
+RASTER_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+# Расширения файлов, для которых создаются сжатые копии .gz и .br.
+COMPRESSIBLE_EXTENSIONS = (".css", ".js", ".svg", ".txt", ".xml", ".json", ".html")
+
+
+def minify_css(css):
+    """Удаляет из CSS комментарии и лишние пробелы."""
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};,])\s*", r"\1", css)
+    css = re.sub(r":\s+", ":", css)
+    return css.replace(";}", "}").strip()
+
+
+def rebase_css_urls(css, source_name, target_name):
+    """
+    Переписывает относительные url() так, чтобы они работали из target_name.
+
+    Нужно при склейке файлов из разных каталогов в один бандл.
+    """
+    source_dir = posixpath.dirname(source_name)
+    target_dir = posixpath.dirname(target_name) or "."
+
+    def rebase(match):
+        quote, url = match.groups()
+        if url.startswith(("data:", "http:", "https:", "//", "/", "#")):
+            return match.group(0)
+        absolute = posixpath.normpath(posixpath.join(source_dir, url))
+        return f"url({quote}{posixpath.relpath(absolute, target_dir)}{quote})"
+
+    return CSS_URL_RE.sub(rebase, css)
+
+
+def template_characters():
+    """Символы, которые встречаются в шаблонах проекта, плюс печатный ASCII."""
+    chars = set(string.printable)
+    dirs = []
+    for engine in settings.TEMPLATES:
+        dirs.extend(engine.get("DIRS", []))
+    project_root = str(settings.BASE_DIR)
+    dirs.extend(d for d in get_app_template_dirs("templates") if str(d).startswith(project_root))
+    for template_dir in dirs:
+        for root, _dirs, files in os.walk(template_dir):
+            for filename in files:
+                with open(os.path.join(root, filename), encoding="utf-8", errors="ignore") as f:
+                    chars.update(f.read())
+    return "".join(sorted(chars))
+
+
+class OptimizedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Хранилище статики с дополнительной сборкой при collectstatic.
+
+    Перед хешированием файлов:
+        * TTF-шрифты конвертируются в WOFF2 и урезаются до символов,
+          которые используются в шаблонах (нужен fontTools с brotli);
+        * PNG и JPEG получают WebP-копию, если она меньше (нужен Pillow);
+        * CSS-файлы из settings.STATIC_BUNDLES склеиваются и минифицируются
+          в один бандл, ссылки на TTF дополняются WOFF2-вариантом, а фоны
+          из PNG/JPEG - вариантом image-set() с WebP.
+
+    После хеширования для текстовых файлов рядом создаются сжатые копии
+    .gz и .br (если установлен brotli), которые веб-сервер может отдавать
+    без сжатия на лету.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        if dry_run:
+            return
+        paths = dict(paths)
+        for name in self.build_fonts(paths):
+            paths[name] = (self, name)
+        for name in self.build_images(paths):
+            paths[name] = (self, name)
+        for name in self.build_bundles(paths):
+            paths[name] = (self, name)
+
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                self.precompress(hashed_name)
+            yield name, hashed_name, processed
+
+    def build_fonts(self, paths):
+        if font_subset is None or brotli is None:
+            logger.warning("fontTools or brotli is not installed, skipping WOFF2 conversion")
+            return []
+        text = template_characters()
+        built = []
+        for name in paths:
+            if not name.endswith(".ttf"):
+                continue
+            woff2_name = name[: -len(".ttf")] + ".woff2"
+            options = font_subset.Options()
+            options.flavor = "woff2"
+            with self.open(name) as f:
+                font = font_subset.load_font(io.BytesIO(f.read()), options)
+            subsetter = font_subset.Subsetter(options)
+            subsetter.populate(text=text)
+            subsetter.subset(font)
+            output = io.BytesIO()
+            font_subset.save_font(font, output, options)
+            self._replace(woff2_name, output.getvalue())
+            built.append(woff2_name)
+        return built
+
+    def build_bundles(self, paths):
+        built = []
+        for bundle_name, sources in getattr(settings, "STATIC_BUNDLES", {}).items():
+            parts = []
+            for source in sources:
+                with self.open(source) as f:
+                    css = f.read().decode("utf-8")
+                parts.append(rebase_css_urls(css, source, bundle_name))
+            css = minify_css("\n".join(parts))
+            css = TTF_SRC_RE.sub(
+                lambda m: self._woff2_src(m, bundle_name, paths), css
+            )
+            css = RASTER_BACKGROUND_RE.sub(
+                lambda m: self._webp_background(m, bundle_name, paths), css
+            )
+            self._replace(bundle_name, css.encode("utf-8"))
+            built.append(bundle_name)
+        return built
+
+    def _woff2_src(self, match, bundle_name, paths):
+        quote, stem = match.groups()
+        font_name = posixpath.normpath(posixpath.join(posixpath.dirname(bundle_name), stem))
+        if font_name + ".woff2" not in paths:
+            return match.group(0)
+        return (
+            f'url({quote}{stem}.woff2{quote}) format("woff2"),'
+            f'url({quote}{stem}.ttf{quote}) format("truetype")'
+        )
+
+    def build_images(self, paths):
+        if Image is None:
+            logger.warning("Pillow is not installed, skipping WebP conversion")
+            return []
+        built = []
+        for name in paths:
+            if not name.lower().endswith(RASTER_EXTENSIONS):
+                continue
+            with self.open(name) as f:
+                original = f.read()
+            with Image.open(io.BytesIO(original)) as image:
+                output = io.BytesIO()
+                image.save(output, "WEBP", quality=80, method=6)
+            if output.tell() >= len(original):
+                continue
+            webp_name = posixpath.splitext(name)[0] + ".webp"
+            self._replace(webp_name, output.getvalue())
+            built.append(webp_name)
+        return built
+
+    def _webp_background(self, match, bundle_name, paths):
+        quote, stem, ext = match.groups()
+        image_name = posixpath.normpath(posixpath.join(posixpath.dirname(bundle_name), stem))
+        if image_name + ".webp" not in paths:
+            return match.group(0)
+        mime = "image/png" if ext == "png" else "image/jpeg"
+        # Первое объявление - для браузеров без image-set(), они пропустят второе.
+        return (
+            f"{match.group(0)};background-image:image-set("
+            f'url({quote}{stem}.webp{quote}) type("image/webp"),'
+            f'url({quote}{stem}.{ext}{quote}) type("{mime}"))'
+        )
+
+    def precompress(self, name):
+        if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+            return
+        with self.open(name) as f:
+            content = f.read()
+        gzipped = gzip.compress(content, compresslevel=9, mtime=0)
+        if len(gzipped) < len(content):
+            self._replace(name + ".gz", gzipped)
+        if brotli is not None:
+            compressed = brotli.compress(content)
+            if len(compressed) < len(content):
+                self._replace(name + ".br", compressed)
+
+    def _replace(self, name, content):
+        if self.exists(name):
+            self.delete(name)
+        self.save(name, ContentFile(content))
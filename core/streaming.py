@@ -0,0 +1,166 @@
+import csv
+import hashlib
+import io
+
+from django.core.cache import caches
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+from django.utils.xmlutils import SimplerXMLGenerator
+
+from .cache import view_cache_hits, view_cache_misses
+
+
+def stream_xml(start, items, write_item, end, chunk_size=200):
+    """
+    Пишет XML-документ частями, не собирая его в памяти целиком.
+
+    Элементы берутся из items по одному (например, из QuerySet.iterator()),
+    и каждые chunk_size элементов накопленный текст отдается наружу.
+
+    Args:
+        start (Callable[[SimplerXMLGenerator], None]): Пишет корневой
+            элемент и все, что идет до элементов.
+        items (Iterable): Элементы документа.
+        write_item (Callable[[SimplerXMLGenerator, Any], None]): Пишет
+            один элемент.
+        end (Callable[[SimplerXMLGenerator], None]): Закрывает документ.
+        chunk_size (int): Сколько элементов отдавать одним куском.
+
+    Yields:
+        str: Очередной кусок документа.
+    """
+    buffer = io.StringIO()
+    handler = SimplerXMLGenerator(buffer, "utf-8", short_empty_elements=True)
+
+    def flush():
+        chunk = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return chunk
+
+    handler.startDocument()
+    start(handler)
+    for number, item in enumerate(items, start=1):
+        write_item(handler, item)
+        if number % chunk_size == 0:
+            yield flush()
+    end(handler)
+    handler.endDocument()
+    yield flush()
+
+
+# Начала ячеек, которые табличные редакторы считают формулой.
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def escape_csv_formula(value):
+    """Делает строку, похожую на формулу, обычным текстом (префикс ')."""
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def stream_csv(header, rows, chunk_size=500):
+    """
+    Пишет CSV частями, не собирая его в памяти целиком.
+
+    Строковые ячейки, которые начинаются с =, +, -, @, табуляции или
+    возврата каретки, получают префикс ': иначе данные пользователей
+    (например, имя "=HYPERLINK(...)") выполнятся как формула при
+    открытии файла в табличном редакторе.
+
+    Args:
+        header (Sequence[str]): Заголовки столбцов.
+        rows (Iterable[Sequence]): Строки (например, из
+            QuerySet.values_list().iterator()).
+        chunk_size (int): Сколько строк отдавать одним куском.
+
+    Yields:
+        str: Очередной кусок документа.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        chunk = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return chunk
+
+    writer.writerow(header)
+    for number, row in enumerate(rows, start=1):
+        writer.writerow([escape_csv_formula(value) for value in row])
+        if number % chunk_size == 0:
+            yield flush()
+    yield flush()
+
+
+class ConditionalStreamMixin:
+    """
+    Условный GET и кеш вывода для представлений, которые отдают документ потоком.
+
+    Версия документа - дата последнего изменения его данных
+    (get_last_modified()). По ней строятся ETag и Last-Modified, и
+    опрос без изменений получает 304 без запросов за содержимым. Первый
+    ответ после изменения отдается потоком (StreamingHttpResponse) и
+    одновременно сохраняется в кеш под ключом с этой версией; следующие
+    ответы до изменения берутся из кеша целиком. Оборванная на середине
+    отдача в кеш не попадает.
+
+    Подкласс определяет get_last_modified() и stream_content().
+
+    Attributes:
+        content_type (str): Тип содержимого ответа.
+        cache_timeout (int): Время жизни готового вывода в секундах;
+            устаревший вывод не читается, потому что версия входит в ключ.
+        cache_alias (str): Псевдоним кеша из settings.CACHES.
+    """
+
+    content_type = "application/xml; charset=utf-8"
+    cache_timeout = 60 * 60
+    cache_alias = "default"
+
+    def get_last_modified(self):
+        """Дата последнего изменения данных документа или None, если неизвестна."""
+        return None
+
+    def stream_content(self):
+        """Итератор кусков документа (str); дата изменения уже в self.last_modified."""
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        self.last_modified = last_modified = self.get_last_modified()
+        version = last_modified.isoformat() if last_modified else "-"
+        # Ссылки в документах абсолютные, поэтому в ключе - полный адрес с хостом.
+        path_hash = hashlib.md5(request.build_absolute_uri().encode(), usedforsecurity=False).hexdigest()
+        # В ETag - время с микросекундами: Last-Modified точен только до секунды.
+        etag = quote_etag(hashlib.md5(f"{path_hash}:{version}".encode(), usedforsecurity=False).hexdigest())
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = self.build_response(request, f"stream:{path_hash}:{version}")
+        response["ETag"] = etag
+        if timestamp is not None:
+            response["Last-Modified"] = http_date(timestamp)
+        return response
+
+    def build_response(self, request, key):
+        view_name = request.resolver_match.view_name if request.resolver_match else type(self).__name__
+        if request.method == "HEAD":
+            return HttpResponse(content_type=self.content_type)
+        cache = caches[self.cache_alias]
+        content = cache.get(key)
+        if content is not None:
+            view_cache_hits.inc(view=view_name)
+            return HttpResponse(content, content_type=self.content_type)
+        view_cache_misses.inc(view=view_name)
+        return StreamingHttpResponse(self.store(cache, key, self.stream_content()), content_type=self.content_type)
+
+    def store(self, cache, key, chunks):
+        parts = []
+        for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+        cache.set(key, "".join(parts), self.cache_timeout)
@@ -0,0 +1,182 @@
+import logging
+import random
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+# Зарегистрированные задачи по имени; воркер находит функцию по Task.name.
+registry = {}
+
+
+class TaskFunction:
+    """
+    Функция, которую можно поставить в очередь.
+
+    Создается декоратором task(); прямой вызов выполняет функцию сразу,
+    enqueue() - через очередь.
+    """
+
+    def __init__(self, func, name, max_attempts):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, *args, key=None, delay=0, **kwargs):
+        """
+        Ставит задачу в очередь в текущей транзакции.
+
+        Аргументы должны сериализоваться в JSON. При settings.TASKS_EAGER
+        задача выполняется сразу, в этом же процессе (так работают тесты).
+
+        Args:
+            key (str, optional): Ключ идемпотентности. Повторная постановка
+                с тем же ключом ничего не делает, в том числе после
+                выполнения задачи.
+            delay (float): Через сколько секунд задачу можно запускать.
+        """
+        task = Task(
+            name=self.name,
+            args=list(args),
+            kwargs=kwargs,
+            key=key,
+            max_attempts=self.max_attempts,
+            run_at=timezone.now() + timedelta(seconds=delay),
+        )
+        if settings.TASKS_EAGER:
+            task.status, task.attempts, task.locked_by = Task.Status.RUNNING, 1, "eager"
+        if key is None:
+            task.save()
+        else:
+            # Один INSERT без предварительного SELECT; конфликт по ключу
+            # означает, что задача уже стоит в очереди или выполнена.
+            Task.objects.bulk_create([task], ignore_conflicts=True)
+            if settings.TASKS_EAGER:
+                task = Task.objects.filter(key=key, locked_by="eager", status=Task.Status.RUNNING).first()
+        if settings.TASKS_EAGER and task is not None:
+            execute(task, propagate=True)
+
+
+def task(name=None, max_attempts=5):
+    """
+    Декоратор, регистрирующий функцию как фоновую задачу.
+
+    Пример:
+        @task(max_attempts=3)
+        def send_welcome_email(user_id):
+            ...
+
+        send_welcome_email.enqueue(user.pk, key=f"welcome-email:{user.pk}")
+
+    Args:
+        name (str, optional): Имя задачи, по умолчанию "<модуль>.<функция>".
+        max_attempts (int): Число попыток до статуса failed.
+    """
+
+    def decorator(func):
+        task_name = name or f"{func.__module__}.{func.__qualname__}"
+        registry[task_name] = TaskFunction(func, task_name, max_attempts)
+        return registry[task_name]
+
+    return decorator
+
+
+def backoff_delay(attempts):
+    """
+    Пауза перед повтором после attempts неудачных попыток.
+
+    Экспоненциальная (TASKS_BACKOFF * 2^(attempts-1), но не больше
+    TASKS_MAX_BACKOFF) со случайной добавкой до 10%, чтобы задачи,
+    упавшие одновременно, не повторялись одновременно.
+    """
+    delay = min(settings.TASKS_MAX_BACKOFF, settings.TASKS_BACKOFF * 2 ** (attempts - 1))
+    return delay * (1 + random.random() / 10)
+
+
+def claim(worker, limit):
+    """
+    Забирает до limit готовых к запуску задач для воркера.
+
+    Задача считается готовой, если она в очереди и run_at наступил, или
+    если она выполняется дольше TASKS_LOCK_TIMEOUT (воркер упал).
+    Захват - условный UPDATE, поэтому два воркера не возьмут одну задачу
+    ни в SQLite, ни в PostgreSQL.
+
+    Returns:
+        list[Task]: Захваченные задачи.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.TASKS_LOCK_TIMEOUT)
+    due = Task.objects.filter(
+        Q(status=Task.Status.QUEUED, run_at__lte=now) | Q(status=Task.Status.RUNNING, locked_at__lt=stale)
+    )
+    ids = list(due.order_by("run_at").values_list("id", flat=True)[:limit])
+    if not ids:
+        return []
+    token = f"{worker}:{uuid.uuid4().hex[:8]}"
+    due.filter(id__in=ids).update(
+        status=Task.Status.RUNNING, locked_by=token, locked_at=now, attempts=F("attempts") + 1
+    )
+    return list(Task.objects.filter(id__in=ids, locked_by=token).order_by("run_at"))
+
+
+def execute(task, propagate=False):
+    """
+    Выполняет захваченную задачу и записывает результат.
+
+    При ошибке задача возвращается в очередь с экспоненциальной паузой,
+    а после max_attempts попыток помечается failed.
+
+    Returns:
+        bool: True, если задача выполнена успешно.
+    """
+    locked = Task.objects.filter(pk=task.pk, locked_by=task.locked_by)
+    function = registry.get(task.name)
+    try:
+        if function is None:
+            raise LookupError(f"Unknown task {task.name!r}")
+        function(*task.args, **task.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        if function is None or task.attempts >= task.max_attempts:
+            logger.error("Task %s #%s failed after %s attempts", task.name, task.pk, task.attempts)
+            locked.update(status=Task.Status.FAILED, last_error=error, finished_at=timezone.now())
+        else:
+            logger.warning("Task %s #%s failed, attempt %s", task.name, task.pk, task.attempts)
+            locked.update(
+                status=Task.Status.QUEUED,
+                last_error=error,
+                run_at=timezone.now() + timedelta(seconds=backoff_delay(task.attempts)),
+            )
+        if propagate:
+            raise
+        return False
+    locked.update(status=Task.Status.DONE, finished_at=timezone.now())
+    return True
+
+
+def purge_finished(older_than, batch_size=1000):
+    """
+    Удаляет выполненные задачи, поставленные раньше older_than, пачками.
+
+    Вместе с задачей удаляется и ее ключ идемпотентности.
+
+    Returns:
+        int: Число удаленных задач.
+    """
+    done = Task.objects.filter(status=Task.Status.DONE, run_at__lt=older_than)
+    removed = 0
+    while ids := list(done.values_list("id", flat=True)[:batch_size]):
+        removed += done.filter(id__in=ids).delete()[0]
+    return removed
@@ -0,0 +1,87 @@
+import os
+import time
+
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates, Template, reraise
+from django.template.utils import get_app_template_dirs
+
+from .instrumentation import record_template_time
+from .metrics import histogram
+
+template_render_seconds = histogram(
+    "template_render_seconds", "Время рендеринга шаблона верхнего уровня"
+)
+
+
+class InstrumentedTemplate(Template):
+    """Шаблон, замеряющий время рендеринга в гистограмму по имени шаблона."""
+
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            seconds = time.perf_counter() - started
+            template_render_seconds.observe(seconds, template=self.origin.template_name or "<string>")
+            record_template_time(seconds)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """
+    Бэкенд DjangoTemplates с замером времени рендеринга.
+
+    Время учитывается для шаблона, который рендерит представление;
+    родительские шаблоны из {% extends %} и {% include %} входят в него.
+    """
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return InstrumentedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+def iter_template_names(backend):
+    """Перечисляет имена всех шаблонов в каталогах движка и приложений."""
+    dirs = list(backend.engine.dirs) + list(get_app_template_dirs(backend.app_dirname))
+    seen = set()
+    for template_dir in dirs:
+        for root, _dirs, files in os.walk(template_dir):
+            for filename in files:
+                if filename.startswith("."):
+                    continue
+                name = os.path.relpath(os.path.join(root, filename), template_dir)
+                name = name.replace(os.sep, "/")
+                if name not in seen:
+                    seen.add(name)
+                    yield name
+
+
+def warm_templates():
+    """
+    Заранее загружает и компилирует все шаблоны Django-движков.
+
+    С кеширующим загрузчиком скомпилированные шаблоны остаются в памяти
+    процесса, поэтому функцию нужно вызывать в самом воркере при старте
+    (см. TEMPLATE_WARMUP в wsgi.py/asgi.py).
+
+    Returns:
+        tuple[list, list]: Пары (имя, секунды) для загруженных шаблонов и
+            пары (имя, исключение) для шаблонов с ошибками.
+    """
+    loaded, failed = [], []
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+        for name in iter_template_names(backend):
+            started = time.perf_counter()
+            try:
+                backend.engine.get_template(name)
+            except (TemplateDoesNotExist, TemplateSyntaxError, UnicodeDecodeError) as exc:
+                failed.append((name, exc))
+            else:
+                loaded.append((name, time.perf_counter() - started))
+    return loaded, failed
@@ -0,0 +1,77 @@
+from django import template
+from django.conf import settings
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from core.images import variant_name
+
+register = template.Library()
+
+
+@register.simple_tag
+def stylesheet_bundle(name):
+    """
+    Подключает CSS-бандл из settings.STATIC_BUNDLES.
+
+    При включенной сборке статики выводит одну ссылку на собранный бандл,
+    иначе - ссылки на все исходные файлы по отдельности.
+    """
+    if settings.STATIC_PIPELINE:
+        names = [name]
+    else:
+        names = settings.STATIC_BUNDLES[name]
+    return format_html_join(
+        "\n", '<link rel="stylesheet" href="{}">', ((static(n),) for n in names)
+    )
+
+
+@register.simple_tag
+def preload_fonts():
+    """Выводит <link rel="preload"> для шрифтов из settings.STATIC_PRELOAD_FONTS."""
+    if not settings.STATIC_PIPELINE:
+        return ""
+    return format_html_join(
+        "\n",
+        '<link rel="preload" href="{}" as="font" type="font/woff2" crossorigin>',
+        ((static(n),) for n in settings.STATIC_PRELOAD_FONTS),
+    )
+
+
+@register.simple_tag
+def responsive_image(file, variants, alt="", sizes="100vw", css_class="", width=None, height=None):
+    """
+    Выводит <img> с srcset из WebP-вариантов изображения.
+
+    Пока фоновый пул не построил варианты (variants пуст или относится к
+    другому файлу), выводится оригинал. Картинки грузятся лениво.
+
+    Пример:
+        {% responsive_image image.image image.variants alt=image.alt sizes="(max-width: 700px) 100vw, 700px" %}
+
+    Args:
+        file (FieldFile): Поле с оригиналом.
+        variants (dict): Состояние вариантов {"source": ..., "widths": [...]}.
+        width, height (int, optional): Размеры оригинала, чтобы браузер
+            заранее зарезервировал место.
+    """
+    if not file:
+        return ""
+    state = variants or {}
+    widths = state.get("widths", []) if state.get("source") == file.name else []
+    if not widths:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="lazy" decoding="async"{}>',
+            file.url, alt, css_class, _dimensions(width, height),
+        )
+    srcset = ", ".join(f"{file.storage.url(variant_name(file.name, w))} {w}w" for w in widths)
+    return format_html(
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" loading="lazy" decoding="async"{}>',
+        file.storage.url(variant_name(file.name, widths[-1])), srcset, sizes, alt, css_class,
+        _dimensions(width, height),
+    )
+
+
+def _dimensions(width, height):
+    if not (width and height):
+        return ""
+    return format_html(' width="{}" height="{}"', width, height)
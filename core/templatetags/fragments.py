@@ -0,0 +1,64 @@
+from django import template
+from django.template.base import token_kwargs
+
+from core.fragments import cached_fragment, resolve_models
+
+register = template.Library()
+
+
+class FragmentNode(template.Node):
+    def __init__(self, nodelist, name, parts, options):
+        self.nodelist = nodelist
+        self.name = name
+        self.parts = parts
+        self.options = options
+
+    def render(self, context):
+        options = {key: value.resolve(context) for key, value in self.options.items()}
+        timeout = options.get("timeout")
+        return cached_fragment(
+            str(self.name.resolve(context)),
+            lambda: self.nodelist.render(context),
+            parts=[part.resolve(context) for part in self.parts],
+            models=resolve_models(options.get("models") or ()),
+            timeout=int(timeout) if timeout is not None else None,
+        )
+
+
+@register.tag
+def fragment(parser, token):
+    """
+    Кеширует часть шаблона до изменения объектов, от которых она зависит.
+
+    Ключ фрагмента складывается из версий объектов моделей, переданных
+    аргументами, и остальных аргументов как есть. Версии меняются при
+    сохранении и удалении объектов (core.fragments.track_fragments), так
+    что устаревший фрагмент не выводится, а фрагменты других объектов
+    остаются в кеше.
+
+    Пример:
+        {% load fragments %}
+        {% fragment "user-header" user %}...{% endfragment %}
+        {% fragment "blog-recent" models="blog.Post" timeout=3600 %}...{% endfragment %}
+
+    Args:
+        name: Имя фрагмента; по нему считаются попадания в кеш.
+        *parts: Объекты моделей и другие значения ключа.
+        models (str): Метки моделей через пробел: фрагмент сбрасывается
+            при изменении любого их объекта.
+        timeout (int): Время жизни, по умолчанию FRAGMENT_CACHE_TIMEOUT.
+    """
+    bits = token.split_contents()
+    tag_name, bits = bits[0], bits[1:]
+    if not bits:
+        raise template.TemplateSyntaxError(f"'{tag_name}' tag requires a fragment name")
+    name = parser.compile_filter(bits.pop(0))
+    parts = []
+    while bits and not token_kwargs(bits[:1], parser):
+        parts.append(parser.compile_filter(bits.pop(0)))
+    options = token_kwargs(bits, parser)
+    if bits or set(options) - {"models", "timeout"}:
+        raise template.TemplateSyntaxError(f"'{tag_name}' accepts only the models and timeout options")
+    nodelist = parser.parse((f"end{tag_name}",))
+    parser.delete_first_token()
+    return FragmentNode(nodelist, name, parts, options)
@@ -0,0 +1,121 @@
+import io
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudget(CaptureQueriesContext):
+    """
+    Проверяет, что блок кода выполняет не больше заданного числа SQL-запросов.
+
+    В отличие от assertNumQueries, допускает меньшее число запросов, поэтому
+    тест не ломается от оптимизаций, но падает при появлении N+1. В сообщении
+    об ошибке перечисляются все выполненные запросы.
+
+    Пример:
+        with QueryBudget(self, 3):
+            self.client.get(reverse("account:index"))
+
+    Args:
+        testcase (unittest.TestCase): Тест, через который сообщается об ошибке.
+        max_queries (int): Допустимое число запросов.
+        using (str): Псевдоним базы данных.
+    """
+
+    def __init__(self, testcase, max_queries, using=DEFAULT_DB_ALIAS):
+        super().__init__(connections[using])
+        self.testcase = testcase
+        self.max_queries = max_queries
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        super().__exit__(exc_type, exc_value, traceback)
+        if exc_type is not None:
+            return
+        executed = len(self)
+        if executed > self.max_queries:
+            queries = "\n".join(
+                f"{number}. {query['sql']}" for number, query in enumerate(self.captured_queries, start=1)
+            )
+            self.testcase.fail(
+                f"{executed} queries executed, budget is {self.max_queries}:\n{queries}"
+            )
+
+
+def make_image(width, height, name="image.png", format="PNG", color=(45, 90, 95)):
+    """
+    Создает загружаемый файл с однотонной картинкой заданного размера.
+
+    Returns:
+        SimpleUploadedFile: Файл, пригодный для POST через тестовый клиент.
+    """
+    output = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(output, format)
+    return SimpleUploadedFile(name, output.getvalue(), content_type=f"image/{format.lower()}")
+
+
+def create_users(usernames, password="ComplexPass123!", **fields):
+    """
+    Создает пользователей одним bulk_create для данных теста.
+
+    Пароль хешируется один раз на всех, email строится из имени
+    (<имя>@example.com). Сигналы post_save не отправляются, поэтому
+    задачи регистрации не ставятся; тестам регистрации нужен create_user().
+
+    Пример:
+        @classmethod
+        def setUpTestData(cls):
+            cls.alice, cls.bob = create_users(["alice", "bob"])
+
+    Args:
+        usernames (Iterable[str]): Имена пользователей.
+        password (str): Общий пароль.
+        **fields: Значения остальных полей (is_staff=True и т. п.).
+
+    Returns:
+        list[User]: Созданные пользователи с первичными ключами.
+    """
+    User = get_user_model()
+    password = make_password(password)
+    return User.objects.bulk_create(
+        User(email=f"{username}@example.com", username=username, password=password, **fields)
+        for username in usernames
+    )
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Тестовый раннер проекта: фоновая работа выполняется сразу.
+
+    С TASKS_EAGER задача выполняется при постановке в очередь, и тест
+    видит ее результат (например, письмо в mail.outbox) без воркера;
+    с COUNTERS_FLUSH_INTERVAL = 0 счетчики пишутся в базу без фонового
+    потока, который не видел бы данных тестовой транзакции.
+
+    Число процессов по умолчанию (без --parallel) берется из
+    settings.TEST_PARALLEL: "auto" - по процессу на ядро.
+    """
+
+    overrides = {"TASKS_EAGER": True, "COUNTERS_FLUSH_INTERVAL": 0}
+
+    @classmethod
+    def add_arguments(cls, parser):
+        super().add_arguments(parser)
+        parser.set_defaults(parallel=getattr(settings, "TEST_PARALLEL", 0))
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._saved_settings = {name: getattr(settings, name) for name in self.overrides}
+        for name, value in self.overrides.items():
+            setattr(settings, name, value)
+
+    def teardown_test_environment(self, **kwargs):
+        for name, value in self._saved_settings.items():
+            setattr(settings, name, value)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,525 @@
+import os
+import posixpath
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from PIL import Image
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.management import call_command
+from django.db.models import F, Value
+from django.db.models.functions import Concat
+from django.template import Context, Template, TemplateSyntaxError
+from django.template.loader import render_to_string
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from benchmarks import load
+
+from .fragments import fragment_cache_hits, fragment_cache_misses, get_stamps, hit_rates, stamp_key
+from .images import generate_variants, variant_name
+from .instrumentation import http_request_db_queries, http_requests
+from .metrics import Counter, Histogram, render_prometheus
+from .models import Task
+from .storage import minify_css, rebase_css_urls
+from .tasks import claim, execute, task
+from .templates import template_render_seconds, warm_templates
+from .testing import make_image
+
+
+class HistogramTests(SimpleTestCase):
+    """Тесты гистограммы длительностей"""
+
+    def test_observations_counted_in_cumulative_buckets(self):
+        """Тест: наблюдения попадают в накопленные корзины"""
+        metric = Histogram("test_seconds", buckets=(0.1, 1.0))
+        metric.observe(0.05, view="a")
+        metric.observe(0.5, view="a")
+        metric.observe(5, view="a")
+
+        [(labels, buckets, total, count)] = metric.samples()
+        self.assertEqual(labels, {"view": "a"})
+        self.assertEqual(buckets, [(0.1, 1), (1.0, 2), (float("inf"), 3)])
+        self.assertAlmostEqual(total, 5.55)
+        self.assertEqual(count, 3)
+
+
+class TemplateWarmupTests(SimpleTestCase):
+    """Тесты прогрева и замера шаблонов"""
+
+    def test_warm_templates_compiles_project_templates(self):
+        """Тест: прогрев компилирует шаблоны проекта без ошибок"""
+        loaded, failed = warm_templates()
+        names = {name for name, _seconds in loaded}
+        self.assertIn("base.html", names)
+        self.assertIn("account/register.html", names)
+        self.assertEqual(failed, [])
+
+    def test_warm_templates_command(self):
+        """Тест: команда warm_templates сообщает количество шаблонов"""
+        out = StringIO()
+        call_command("warm_templates", stdout=out)
+        self.assertIn("Compiled", out.getvalue())
+
+    def test_render_time_recorded_per_template(self):
+        """Тест: время рендеринга записывается по имени шаблона"""
+        before = template_render_seconds.count(template="account/index.html")
+        render_to_string("account/index.html")
+        self.assertEqual(
+            template_render_seconds.count(template="account/index.html"), before + 1
+        )
+
+
+class StaticPipelineTests(SimpleTestCase):
+    """Тесты сборки статики"""
+
+    def test_minify_css(self):
+        """Тест: минификация удаляет комментарии и пробелы"""
+        css = "/* comment */\n.a:hover ,\n.b {\n  color: red;\n}\n"
+        self.assertEqual(minify_css(css), ".a:hover,.b{color:red}")
+
+    def test_rebase_css_urls(self):
+        """Тест: относительные url() пересчитываются для бандла"""
+        css = 'a{background:url("../../img/a.png")} b{background:url(data:x)}'
+        self.assertEqual(
+            rebase_css_urls(css, "css/account/style.css", "css/site.css"),
+            'a{background:url("../img/a.png")} b{background:url(data:x)}',
+        )
+
+    @override_settings(STATIC_PIPELINE=False)
+    def test_bundle_tag_links_sources_without_pipeline(self):
+        """Тест: без сборки подключаются исходные CSS-файлы"""
+        html = Template("{% load assets %}{% stylesheet_bundle 'css/site.css' %}").render(Context())
+        self.assertEqual(html.count("<link"), len(settings.STATIC_BUNDLES["css/site.css"]))
+
+    def test_collectstatic_builds_bundle_and_compressed_copies(self):
+        """Тест: collectstatic собирает бандл, WOFF2 и сжатые копии"""
+        storages = dict(settings.STORAGES, staticfiles={
+            "BACKEND": "core.storage.OptimizedManifestStaticFilesStorage",
+        })
+        # Полный набор символов из шаблонов заметно замедляет subsetting.
+        with tempfile.TemporaryDirectory() as root, override_settings(
+            STATIC_ROOT=root, STORAGES=storages, STATIC_PIPELINE=True
+        ), mock.patch("core.storage.template_characters", return_value="Register"):
+            call_command("collectstatic", interactive=False, verbosity=0)
+            from django.contrib.staticfiles.storage import staticfiles_storage
+
+            bundle = staticfiles_storage.stored_name("css/site.css")
+            self.assertTrue(os.path.exists(os.path.join(root, bundle + ".gz")))
+            with open(os.path.join(root, bundle)) as f:
+                css = f.read()
+            self.assertIn('woff2") format("woff2")', css)
+            self.assertTrue(staticfiles_storage.exists(
+                staticfiles_storage.stored_name("font/Bayon-Regular.woff2")
+            ))
+            webp = staticfiles_storage.stored_name("img/account_img.webp")
+            self.assertIn(f'{posixpath.basename(webp)}") type("image/webp")', css)
+            self.assertLess(
+                staticfiles_storage.size(webp),
+                staticfiles_storage.size(staticfiles_storage.stored_name("img/account_img.png")),
+            )
+
+
+class PrometheusFormatTests(SimpleTestCase):
+    """Тесты вывода метрик в формате Prometheus"""
+
+    def test_counter_and_histogram(self):
+        """Тест: счетчик и гистограмма выводятся с метками и корзинами"""
+        from . import metrics
+
+        requests_metric = Counter("test_requests_total", "Запросы")
+        latency = Histogram("test_latency_seconds", buckets=(0.1,))
+        requests_metric.inc(view='a"b')
+        latency.observe(0.05, view="a")
+        with mock.patch.dict(metrics.registry, {"r": requests_metric, "l": latency}, clear=True):
+            text = render_prometheus()
+
+        self.assertIn("# TYPE test_requests_total counter", text)
+        self.assertIn('test_requests_total{view="a\\"b"} 1', text)
+        self.assertIn('test_latency_seconds_bucket{le="0.1",view="a"} 1', text)
+        self.assertIn('test_latency_seconds_bucket{le="+Inf",view="a"} 1', text)
+        self.assertIn('test_latency_seconds_count{view="a"} 1', text)
+
+
+class InstrumentationMiddlewareTests(TestCase):
+    """Тесты middleware с метриками запросов"""
+
+    def setUp(self):
+        http_requests.reset()
+        http_request_db_queries.reset()
+
+    @override_settings(SERVER_TIMING=True)
+    def test_server_timing_and_metrics(self):
+        """Тест: запрос попадает в метрики и заголовок Server-Timing"""
+        self.client.post(reverse("account:logout"))
+        response = self.client.get(reverse("account:index"))
+
+        self.assertRegex(response.headers["Server-Timing"], r'db;dur=[\d.]+;desc="0 queries", tpl;dur=')
+        self.assertEqual(http_requests.value(view="account:index", method="GET", status=200), 1)
+        self.assertEqual(http_request_db_queries.count(view="account:logout"), 1)
+
+    @override_settings(SERVER_TIMING=False)
+    def test_server_timing_disabled(self):
+        """Тест: без SERVER_TIMING заголовок не добавляется"""
+        response = self.client.get(reverse("account:index"))
+        self.assertNotIn("Server-Timing", response.headers)
+
+    @override_settings(SERVER_TIMING=True, ACCOUNT_THROTTLE_RATES={})
+    async def test_async_view_queries_counted(self):
+        """Тест: запросы асинхронного представления тоже учитываются"""
+        with override_settings(ROOT_URLCONF="benchmarks.urls_async"):
+            response = await AsyncClient().post("/login/", {"username": "nobody@example.com", "password": "x"})
+        self.assertIn('desc="1 queries"', response.headers["Server-Timing"])
+
+    @override_settings(METRICS_ALLOWED_IPS=["127.0.0.1"])
+    def test_metrics_endpoint(self):
+        """Тест: /metrics доступна только с разрешенных адресов"""
+        self.client.get(reverse("account:index"))
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('http_requests_total{method="GET",status="200",view="account:index"}', response.content.decode())
+
+        response = self.client.get(reverse("metrics"), REMOTE_ADDR="10.0.0.1")
+        self.assertEqual(response.status_code, 404)
+
+    def test_metrics_closed_by_default(self):
+        """Тест: по умолчанию /metrics закрыта и для локальных адресов"""
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 404)
+
+    @override_settings(METRICS_ALLOWED_IPS=["127.0.0.1"], THROTTLE_TRUSTED_PROXIES=["127.0.0.1"])
+    def test_metrics_behind_proxy(self):
+        """Тест: за локальным прокси /metrics проверяет адрес клиента, а не прокси"""
+        response = self.client.get(reverse("metrics"), HTTP_X_FORWARDED_FOR="203.0.113.5")
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(reverse("metrics"), HTTP_X_FORWARDED_FOR="127.0.0.1, 203.0.113.5")
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 200)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics_token(self):
+        """Тест: /metrics доступна по токену из заголовка Authorization"""
+        response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer wrong")
+        self.assertEqual(response.status_code, 404)
+
+
+class ImageVariantTests(SimpleTestCase):
+    """Тесты WebP-вариантов изображений"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.storage = FileSystemStorage(location=self.root, base_url="/media/")
+
+    def test_generate_variants_skips_upscaling(self):
+        """Тест: варианты строятся только не шире оригинала"""
+        name = self.storage.save("photo.png", make_image(1000, 500))
+
+        widths = generate_variants(self.storage, name, widths=(320, 640, 1280))
+
+        self.assertEqual(widths, [320, 640, 1000])
+        with self.storage.open(variant_name(name, 320)) as f, Image.open(f) as variant:
+            self.assertEqual((variant.format, variant.size), ("WEBP", (320, 160)))
+
+    def test_responsive_image_tag(self):
+        """Тест: srcset выводится только для вариантов текущего файла"""
+        name = self.storage.save("photo.png", make_image(10, 10))
+        file = mock.Mock(storage=self.storage, url=self.storage.url(name))
+        file.name = name
+        template = Template("{% load assets %}{% responsive_image file variants alt='Photo' %}")
+
+        html = template.render(Context({"file": file, "variants": {"source": "old.png", "widths": [320]}}))
+        self.assertIn('src="/media/photo.png"', html)
+        self.assertNotIn("srcset", html)
+
+        html = template.render(Context({"file": file, "variants": {"source": name, "widths": [320, 640]}}))
+        self.assertIn('srcset="/media/photo.w320.webp 320w, /media/photo.w640.webp 640w"', html)
+        self.assertIn('src="/media/photo.w640.webp"', html)
+
+
+class CleanupMediaTests(TestCase):
+    """Тесты очистки медиа"""
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        media = override_settings(MEDIA_ROOT=root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def test_removes_only_orphans(self):
+        """Тест: удаляются файлы без ссылок, варианты используемых файлов остаются"""
+        used = default_storage.save("avatars/used.png", make_image(4, 4))
+        for name in (variant_name(used, 320), "avatars/orphan.png", "avatars/orphan.w320.webp"):
+            default_storage.save(name, make_image(4, 4))
+        get_user_model().objects.create_user(
+            email="user@example.com", username="user", password="ComplexPass123!", avatar=used
+        )
+
+        out = StringIO()
+        call_command("cleanup_media", "--min-age", "0", "--dry-run", stdout=out)
+        self.assertIn("Would remove 2 files", out.getvalue())
+        self.assertTrue(default_storage.exists("avatars/orphan.png"))
+
+        call_command("cleanup_media", "--min-age", "1", stdout=StringIO())
+        self.assertTrue(default_storage.exists("avatars/orphan.png"))
+
+        call_command("cleanup_media", "--min-age", "0", stdout=StringIO())
+        self.assertEqual(
+            sorted(default_storage.listdir("avatars")[1]),
+            sorted(posixpath.basename(name) for name in (used, variant_name(used, 320))),
+        )
+
+
+calls = []
+
+
+@task(name="core.tests.record")
+def record(value):
+    calls.append(value)
+
+
+@task(name="core.tests.fail", max_attempts=2)
+def fail():
+    raise ConnectionError("SMTP is down")
+
+
+@override_settings(TASKS_EAGER=False, TASKS_BACKOFF=10)
+class TaskQueueTests(TestCase):
+    """Тесты очереди фоновых задач"""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_idempotency_key(self):
+        """Тест: задача с тем же ключом ставится в очередь один раз"""
+        record.enqueue(1, key="record:1")
+        record.enqueue(1, key="record:1")
+        record.enqueue(2)
+        self.assertEqual(Task.objects.count(), 2)
+
+    def test_claim_and_execute(self):
+        """Тест: воркер забирает только готовые задачи и помечает выполненные"""
+        record.enqueue("now")
+        record.enqueue("later", delay=60)
+
+        [claimed] = claim("test", 10)
+        self.assertEqual(claim("other", 10), [])
+        self.assertTrue(execute(claimed))
+
+        self.assertEqual(calls, ["now"])
+        claimed.refresh_from_db()
+        self.assertEqual((claimed.status, claimed.attempts), (Task.Status.DONE, 1))
+
+    def test_retry_with_backoff_then_fail(self):
+        """Тест: ошибка возвращает задачу в очередь с паузой, после max_attempts - failed"""
+        fail.enqueue()
+        [claimed] = claim("test", 10)
+        with self.assertLogs("core.tasks", "WARNING"):
+            self.assertFalse(execute(claimed))
+
+        claimed.refresh_from_db()
+        self.assertEqual(claimed.status, Task.Status.QUEUED)
+        self.assertIn("SMTP is down", claimed.last_error)
+        self.assertGreaterEqual(claimed.run_at, timezone.now() + timedelta(seconds=9))
+        self.assertEqual(claim("test", 10), [])
+
+        Task.objects.update(run_at=timezone.now())
+        [claimed] = claim("test", 10)
+        with self.assertLogs("core.tasks", "ERROR"):
+            execute(claimed)
+        claimed.refresh_from_db()
+        self.assertEqual((claimed.status, claimed.attempts), (Task.Status.FAILED, 2))
+
+    @override_settings(TASKS_LOCK_TIMEOUT=60)
+    def test_stale_running_task_reclaimed(self):
+        """Тест: задачу упавшего воркера берет другой воркер после TASKS_LOCK_TIMEOUT"""
+        record.enqueue("lost")
+        claim("crashed", 10)
+        self.assertEqual(claim("other", 10), [])
+
+        Task.objects.update(locked_at=timezone.now() - timedelta(minutes=5))
+        [claimed] = claim("other", 10)
+        self.assertEqual(claimed.attempts, 2)
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager_mode(self):
+        """Тест: в режиме TASKS_EAGER задача выполняется сразу, ошибка не скрывается"""
+        record.enqueue("eager", key="record:eager")
+        record.enqueue("eager", key="record:eager")
+        self.assertEqual(calls, ["eager"])
+        with self.assertRaises(ConnectionError), self.assertLogs("core.tasks", "WARNING"):
+            fail.enqueue()
+
+
+@override_settings(TASKS_EAGER=False)
+class RunWorkerTests(TransactionTestCase):
+    """Тесты команды run_worker (потоки пула работают со своими соединениями)"""
+
+    def test_run_worker_once(self):
+        """Тест: run_worker --once выполняет готовые задачи и завершается"""
+        calls.clear()
+        for n in range(5):
+            record.enqueue(n)
+        fail.enqueue()
+
+        out = StringIO()
+        with self.assertLogs("core.tasks", "WARNING"):
+            call_command("run_worker", "--once", "--concurrency", "2", stdout=out)
+
+        self.assertIn("5 done, 1 failed", out.getvalue())
+        self.assertEqual(sorted(calls), [0, 1, 2, 3, 4])
+        self.assertEqual(Task.objects.filter(status=Task.Status.QUEUED).count(), 1)
+
+
+class BenchSuiteTests(TransactionTestCase):
+    """Тесты нагрузочного прогона (benchmarks.load), запросы идут из потоков пула"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_all_scenarios_on_both_servers(self):
+        """Тест: каждый сценарий отвечает ожидаемым кодом через WSGI и ASGI"""
+        data = load.seed(users=5, posts=3, comments=4)
+        # База тестов в памяти не допускает одновременной записи из разных
+        # потоков, поэтому клиент один; manage.py bench работает с файлом.
+        results = load.run_suite(data, requests=4, concurrency=1, warmup=1)
+
+        self.assertEqual(set(results), {f"{server}:{name}" for server in load.RUNNERS for name in load.scenarios})
+        for key, result in results.items():
+            self.assertEqual(result["errors"], 0, key)
+            self.assertEqual(result["requests"], 4, key)
+            self.assertLessEqual(result["p50_ms"], result["p99_ms"], key)
+
+    def test_compare_with_baseline(self):
+        """Тест: регрессия - падение пропускной способности или рост p95 выше порога"""
+        baseline = {"wsgi:index": {"rps": 1000, "p95_ms": 10.0}, "asgi:index": {"rps": 500, "p95_ms": 20.0}}
+        results = {
+            "wsgi:index": {"rps": 900, "p95_ms": 11.0},
+            "asgi:index": {"rps": 300, "p95_ms": 30.0},
+            "wsgi:login": {"rps": 1, "p95_ms": 900.0},
+        }
+
+        regressions = load.compare(baseline, results, 0.2)
+
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(all(line.startswith("asgi:index") for line in regressions))
+
+
+class FragmentCacheTests(TestCase):
+    """Тесты кеша фрагментов шаблонов с версиями объектов"""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.alice = User.objects.create_user(email="alice@example.com", username="alice", password="ComplexPass123!")
+        cls.bob = User.objects.create_user(email="bob@example.com", username="bob", password="ComplexPass123!")
+
+    def setUp(self):
+        cache.clear()
+        fragment_cache_hits.reset()
+        fragment_cache_misses.reset()
+
+    def render(self, source, **context):
+        return Template("{% load fragments %}" + source).render(Context(context)).strip()
+
+    def card(self, user, n):
+        return self.render('{% fragment "card" user %}{{ user.username }}:{{ n }}{% endfragment %}', user=user, n=n)
+
+    def test_object_change_resets_only_its_fragments(self):
+        """Тест: сохранение пользователя сбрасывает только его фрагменты"""
+        self.assertEqual(self.card(self.alice, 1), "alice:1")
+        self.assertEqual(self.card(self.bob, 1), "bob:1")
+        self.assertEqual(self.card(self.alice, 2), "alice:1")
+
+        self.alice.username = "alice2"
+        self.alice.save()
+
+        self.assertEqual(self.card(self.alice, 3), "alice2:3")
+        self.assertEqual(self.card(self.bob, 3), "bob:1")
+        self.assertEqual(hit_rates(), {"card": (2, 3, 2 / 5)})
+        self.assertEqual(fragment_cache_hits.value(fragment="card"), 2)
+
+    def test_model_dependency_and_delete(self):
+        """Тест: фрагмент с models= сбрасывается при изменении и удалении любого объекта модели"""
+        from blog.models import Post, Tag
+
+        source = '{% fragment "recent" models="blog.Post" %}{{ n }}{% endfragment %}'
+        post = Post.objects.create(author=self.alice, title="Post", body="text", is_published=True)
+        self.assertEqual(self.render(source, n=1), "1")
+        self.assertEqual(self.render(source, n=2), "1")
+        post.delete()
+        self.assertEqual(self.render(source, n=3), "3")
+
+        post = Post.objects.create(author=self.alice, title="Post", body="text", is_published=True)
+        self.assertEqual(self.render('{% fragment "post" post %}{{ n }}{% endfragment %}', post=post, n=1), "1")
+        post.tags.add(Tag.objects.create(name="Python", slug="python"))
+        self.assertEqual(self.render('{% fragment "post" post %}{{ n }}{% endfragment %}', post=post, n=2), "2")
+
+    def test_version_bumped_again_after_commit(self):
+        """Тест: версия меняется и после коммита, отрисованное до коммита не переживает его"""
+        key = stamp_key(get_user_model(), self.alice.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.alice.save()
+            before_commit = get_stamps([key])[key]
+        self.assertNotEqual(get_stamps([key])[key], before_commit)
+
+    def test_plain_values_and_disabled_cache(self):
+        """Тест: обычные значения входят в ключ, timeout=0 отключает кеш, ошибки синтаксиса"""
+        source = '{% fragment "greeting" lang %}{{ n }}{% endfragment %}'
+        self.assertEqual(self.render(source, lang="en", n=1), "1")
+        self.assertEqual(self.render(source, lang="ru", n=2), "2")
+        self.assertEqual(self.render(source, lang="en", n=3), "1")
+        self.assertEqual(self.render('{% fragment "off" timeout=0 %}{{ n }}{% endfragment %}', n=4), "4")
+
+        with self.assertRaises(TemplateSyntaxError):
+            self.render("{% fragment %}{% endfragment %}")
+        with self.assertRaises(TemplateSyntaxError):
+            self.render('{% fragment "x" vary=1 %}{% endfragment %}')
+
+    def test_user_header_reused_between_pages(self):
+        """Тест: шапка пользователя берется из кеша на следующих страницах и обновляется после изменения"""
+        self.client.force_login(self.alice)
+        self.assertContains(self.client.get(reverse("account:avatar")), "alice")
+        self.client.get(reverse("blog:index"))
+        self.assertEqual(fragment_cache_hits.value(fragment="user-header"), 1)
+
+        self.alice.username = "alice-renamed"
+        self.alice.save()
+        self.assertContains(self.client.get(reverse("blog:index")), "alice-renamed")
+
+    def test_user_header_reset_by_queryset_update(self):
+        """Тест: QuerySet.update() пользователей тоже обновляет шапку, сразу и после коммита"""
+        self.client.force_login(self.alice)
+        self.assertContains(self.client.get(reverse("blog:index")), "alice")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            get_user_model().objects.filter(pk=self.alice.pk).update(username="alice-updated")
+            self.assertContains(self.client.get(reverse("blog:index")), "alice-updated")
+        self.assertContains(self.client.get(reverse("blog:index")), "alice-updated")
+
+    def test_user_header_reset_by_distinct_and_annotated_update(self):
+        """Тест: update() выборок с distinct() и annotate() тоже меняет версии фрагментов пользователей"""
+        User = get_user_model()
+        key = stamp_key(User, self.alice.pk)
+        before = get_stamps([key])[key]
+        User.objects.filter(pk=self.alice.pk).distinct().update(username="alice-distinct")
+        after_distinct = get_stamps([key])[key]
+        self.assertNotEqual(after_distinct, before)
+
+        User.objects.filter(pk=self.alice.pk).annotate(
+            new_name=Concat(F("username"), Value("-annotated"))
+        ).update(username=F("new_name"))
+        self.alice.refresh_from_db()
+        self.assertEqual(self.alice.username, "alice-distinct-annotated")
+        self.assertNotEqual(get_stamps([key])[key], after_distinct)
+        self.client.force_login(self.alice)
+        self.assertContains(self.client.get(reverse("blog:index")), "alice-distinct-annotated")
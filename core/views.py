@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+
+from .metrics import render_prometheus
+from .proxies import get_client_ip
+
+
+def metrics_allowed(request):
+    """
+    Разрешен ли запросу доступ к /metrics.
+
+    Доступ дает токен settings.METRICS_TOKEN в заголовке
+    "Authorization: Bearer <токен>" или адрес клиента из
+    settings.METRICS_ALLOWED_IPS. Адрес определяется get_client_ip(),
+    то есть за доверенным прокси - по X-Forwarded-For, а не по адресу
+    самого прокси.
+    """
+    token = settings.METRICS_TOKEN
+    scheme, _, credentials = request.headers.get("Authorization", "").partition(" ")
+    if token and scheme.lower() == "bearer" and constant_time_compare(credentials.strip(), token):
+        return True
+    return get_client_ip(request) in settings.METRICS_ALLOWED_IPS
+
+
+def metrics_view(request):
+    """
+    Отдает метрики процесса в текстовом формате Prometheus.
+
+    Доступно только по metrics_allowed(), для остальных страница не
+    существует.
+    """
+    if not metrics_allowed(request):
+        raise Http404
+    return HttpResponse(render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
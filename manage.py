@@ -6,6 +6,9 @@ import sys
 
 def main():
     """Run administrative tasks."""
+    # Тесты по умолчанию идут на быстром профиле (blog_gomer_lisa/settings_test.py).
+    if sys.argv[1:2] == ['test']:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blog_gomer_lisa.settings_test')
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blog_gomer_lisa.settings')
     try:
         from django.core.management import execute_from_command_line